@@ -1,15 +1,15 @@
 import os
 import sys
-import joblib
-import numpy as np
 from utils.general_utils import load_config
-from utils.custom_exception import CustomException
-from flask import Flask, render_template, request
-from pathlib import Path
-import pandas as pd
+from utils.custom_exception import CustomException, InputValidationError
+from utils.inference_utils import records_to_frame, parse_booking_form
+from utils.traffic_recorder import TrafficRecorder
+from utils.metrics import REGISTRY, PROMETHEUS_CONTENT_TYPE, configure_metrics, stage_timer, request_timer, count_request
+from flask import Flask, render_template, request, jsonify, g
+from time import perf_counter_ns
 from dotenv import load_dotenv
 from loguru import logger
-from utils.s3_utils import load_s3_file
+from src.inference import InferenceService
 
 load_dotenv()
 
@@ -18,38 +18,36 @@ app = Flask(__name__)
 try:
     logger.info("Loading configuration")
     config = load_config("config.yaml")
+    configure_metrics(config)
 
-    bucket_name = config["training"]["bucket_name"]
-    num_cols = config["data_processing"]["numerical_columns"]
-
-    logger.info("Loading processor from S3 using load_s3_file")
-    processor_key = config["training"]["processor_key"]
-    local_processor_path = Path("artifacts/processors/proc_01.pkl")
-    local_processor_path = load_s3_file(bucket_name, processor_key, local_processor_path)
-    logger.info(f"Loading processor from disk at {local_processor_path}")
-    loaded_processor = joblib.load(local_processor_path)
-    logger.success("Processor loaded successfully")
-
-    logger.info("Loading selected features from S3 using load_s3_file")
-    selected_features_key = config["training"]["selected_features_key"]
-    local_selected_features_path = Path("artifacts/processors/selected_features.pkl")
-    local_selected_features_path = load_s3_file(bucket_name, selected_features_key, local_selected_features_path)
-    logger.info(f"Loading selected features from disk at {local_selected_features_path}")
-    selected_indices = joblib.load(local_selected_features_path)
-    logger.success("Selected features loaded successfully")
-
-    logger.info("Loading model from S3 using load_s3_file")
-    model_key = config["training"]["model_key"]
-    local_model_path = Path(config["training"]["model_output_path"])
-    local_model_path = load_s3_file(bucket_name, model_key, local_model_path)
-    logger.info(f"Loading model from disk at {local_model_path}")
-    loaded_model = joblib.load(local_model_path)
-    logger.success("Model loaded successfully")
+    serving_config = config.get("serving", {})
+    max_batch_size = serving_config.get("max_batch_size", 10000)
+
+    service = InferenceService(config)
+    recorder = TrafficRecorder.from_config(config)
+    if serving_config.get("hot_reload", {}).get("enabled", False):
+        service.start_watcher()
 
 except Exception as e:
     logger.exception("Error during application initialization")
     raise CustomException(e, sys)
 
+FORM_PARSE_TIMER = stage_timer("form_parse")
+VALIDATE_TIMER = stage_timer("validate")
+
+
+@app.before_request
+def start_timer():
+    g.request_start = perf_counter_ns()
+
+
+@app.after_request
+def record_request(response):
+    route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+    request_timer(route).observe_raw(perf_counter_ns() - g.request_start)
+    count_request(route, response.status_code)
+    return response
+
 
 @app.route("/", methods=['GET','POST'])
 def index():
@@ -57,51 +55,17 @@ def index():
         if request.method=='POST':
             logger.info("Received prediction request")
             logger.debug(f"Form data: {request.form}")
+            if recorder is not None:
+                recorder.record("/", "form", request.form.to_dict())
 
             try:
-                lead_time = int(request.form['lead_time'])
-                no_of_special_requests = int(request.form['no_of_special_requests'])
-                avg_price_per_room = float(request.form['avg_price_per_room'])
-                
-                arrival_month = int(request.form['arrival_month'])
-                arrival_date = int(request.form['arrival_date'])
-                market_segment_type = str(request.form['market_segment_type'])
-                
-                no_of_week_nights = int(request.form['no_of_week_nights'])
-                no_of_weekend_nights = int(request.form['no_of_weekend_nights'])
-                type_of_meal_plan = str(request.form['type_of_meal_plan'])
-                room_type_reserved = str(request.form['room_type_reserved'])
-
-                features = pd.DataFrame(
-                    [
-                        {
-                            "lead_time": lead_time,
-                            "no_of_special_requests": no_of_special_requests,
-                            "avg_price_per_room": avg_price_per_room,
-                            "arrival_month": arrival_month,
-                            "arrival_date": arrival_date,
-                            "market_segment_type": market_segment_type,
-                            "no_of_week_nights": no_of_week_nights,
-                            "no_of_weekend_nights": no_of_weekend_nights,
-                            "type_of_meal_plan": type_of_meal_plan,
-                            "room_type_reserved": room_type_reserved,
-                        }
-                    ]
-                )
-
-                logger.info("Processing input features")
-                # Ensure all numeric columns expected by the preprocessor exist
-                for col in num_cols:
-                    if col not in features.columns:
-                        features[col] = 0
-                
-                X_transformed = loaded_processor.transform(features)
-                X_transformed = pd.DataFrame(X_transformed)
-                X_processed = X_transformed.iloc[:, selected_indices]
-                logger.success("Features processed successfully")
-                
+                start = perf_counter_ns()
+                record = parse_booking_form(request.form)
+                FORM_PARSE_TIMER.observe_raw(perf_counter_ns() - start)
+
                 logger.info("Making prediction")
-                prediction = loaded_model.predict(X_processed)
+                # Repeated bookings are answered from the prediction cache without preprocessing
+                prediction, _, _ = service.predict_records([record])
                 logger.success(f"Prediction: {prediction[0]}")
 
                 return render_template('index.html', prediction=prediction[0])
@@ -121,40 +85,51 @@ def index():
         logger.exception("Error in index route")
         raise CustomException(e, sys)
 
-if __name__=="__main__":
-    app.run(host='0.0.0.0', port=5000, debug=False)
-if __name__=="__main__":
+@app.route("/predict/batch", methods=["POST"])
+def predict_batch():
+    """Score N bookings sent as JSON: {"reservations": [{...}, ...]} or a bare list."""
     try:
-        logger.info("Loading configuration")
-        config = load_config("config.yaml")
-
-        bucket_name = config["training"]["bucket_name"]
-        num_cols = config["data_processing"]["numerical_columns"]
-
-        logger.info("Loading processor from S3 using load_s3_file")
-        processor_key = config["training"]["processor_key"]
-        local_processor_path = Path("artifacts/processors/proc_01.pkl")
-        local_processor_path = load_s3_file(bucket_name, processor_key, local_processor_path)
-        logger.info(f"Loading processor from disk at {local_processor_path}")
-        loaded_processor = joblib.load(local_processor_path)
-        logger.success("Processor loaded successfully")
-
-        logger.info("Loading selected features from S3 using load_s3_file")
-        selected_features_key = config["training"]["selected_features_key"]
-        local_selected_features_path = Path("artifacts/processors/selected_features.pkl")
-        local_selected_features_path = load_s3_file(bucket_name, selected_features_key, local_selected_features_path)
-        logger.info(f"Loading selected features from disk at {local_selected_features_path}")
-        selected_indices = joblib.load(local_selected_features_path)
-        logger.success("Selected features loaded successfully")
-
-        logger.info("Loading model from S3 using load_s3_file")
-        model_key = config["training"]["model_key"]
-        local_model_path = Path(config["training"]["model_output_path"])
-        local_model_path = load_s3_file(bucket_name, model_key, local_model_path)
-        logger.info(f"Loading model from disk at {local_model_path}")
-        loaded_model = joblib.load(local_model_path)
-        logger.success("Model loaded successfully")
-
+        payload = request.get_json(silent=True)
+        if payload is None:
+            return jsonify({"error": "Request body must be JSON"}), 400
+
+        records = payload.get("reservations") if isinstance(payload, dict) else payload
+        logger.info("Received batch prediction request")
+        if recorder is not None:
+            recorder.record("/predict/batch", "json", payload)
+
+        start = perf_counter_ns()
+        features = records_to_frame(records, [], max_batch_size=max_batch_size)
+        VALIDATE_TIMER.observe_raw(perf_counter_ns() - start)
+        predictions, cancel_proba, version = service.predict_records(features.to_dict("records"))
+        logger.success(f"Scored batch of {len(features)} bookings")
+
+        return jsonify(
+            {
+                "count": len(features),
+                "predictions": predictions.tolist(),
+                "cancellation_probability": cancel_proba.tolist(),
+                "model_version": version,
+            }
+        )
+
+    except InputValidationError as e:
+        logger.error(f"Invalid batch payload: {e}")
+        return jsonify({"error": "Invalid input", "details": e.errors}), 400
     except Exception as e:
-        logger.exception("Error during application initialization")
-        raise CustomException(e, sys)
+        logger.exception("Error processing batch prediction request")
+        return jsonify({"error": "An error occurred processing your request"}), 500
+
+
+@app.route("/status", methods=["GET"])
+def status():
+    return jsonify(service.status())
+
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    return REGISTRY.render(), 200, {"Content-Type": PROMETHEUS_CONTENT_TYPE}
+
+
+if __name__=="__main__":
+    app.run(host='0.0.0.0', port=5000, debug=False)
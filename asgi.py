@@ -0,0 +1,162 @@
+import sys
+from time import perf_counter_ns
+from contextlib import asynccontextmanager
+from urllib.parse import parse_qs
+
+import uvicorn
+from dotenv import load_dotenv
+from fastapi import FastAPI, Request
+from fastapi.responses import HTMLResponse, JSONResponse, Response
+from fastapi.staticfiles import StaticFiles
+from starlette.concurrency import run_in_threadpool
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+from loguru import logger
+
+from src.inference import InferenceService
+from utils.batching import MicroBatcher
+from utils.custom_exception import CustomException, InputValidationError
+from utils.general_utils import load_config
+from utils.inference_utils import records_to_frame, parse_booking_form
+from utils.traffic_recorder import TrafficRecorder
+from utils.metrics import REGISTRY, PROMETHEUS_CONTENT_TYPE, configure_metrics, stage_timer, request_timer, count_request
+
+load_dotenv()
+
+try:
+    logger.info("Loading configuration")
+    config = load_config("config.yaml")
+    configure_metrics(config)
+
+    serving_config = config.get("serving", {})
+    batching_config = serving_config.get("micro_batching", {})
+    max_batch_size = serving_config.get("max_batch_size", 10000)
+
+    service = InferenceService(config)
+    recorder = TrafficRecorder.from_config(config)
+    batcher = MicroBatcher(
+        service.predict_records,
+        max_batch_size=batching_config.get("max_batch_size", 64),
+        max_wait_ms=batching_config.get("max_wait_ms", 2),
+    )
+
+    # Same templates as the Flask app, with a url_for that resolves the /static mount
+    templates = Environment(loader=FileSystemLoader("templates"), autoescape=select_autoescape())
+    templates.globals["url_for"] = lambda endpoint, filename: f"/{endpoint}/{filename}"
+
+except Exception as e:
+    logger.exception("Error during application initialization")
+    raise CustomException(e, sys)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    await batcher.start()
+    if serving_config.get("hot_reload", {}).get("enabled", False):
+        service.start_watcher()
+    yield
+    service.stop_watcher()
+    await batcher.stop()
+
+
+app = FastAPI(title="Hotel reservation prediction", lifespan=lifespan)
+app.mount("/static", StaticFiles(directory="static"), name="static")
+
+FORM_PARSE_TIMER = stage_timer("form_parse")
+VALIDATE_TIMER = stage_timer("validate")
+
+
+@app.middleware("http")
+async def record_request(request: Request, call_next):
+    start = perf_counter_ns()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    route = route.path if route is not None else "unmatched"
+    request_timer(route).observe_raw(perf_counter_ns() - start)
+    count_request(route, response.status_code)
+    return response
+
+
+def render(prediction=None, error=None):
+    return HTMLResponse(templates.get_template("index.html").render(prediction=prediction, error=error))
+
+
+@app.get("/", response_class=HTMLResponse)
+async def index_form():
+    return render()
+
+
+@app.post("/", response_class=HTMLResponse)
+async def index(request: Request):
+    logger.info("Received prediction request")
+    # The form posts application/x-www-form-urlencoded; parse it without python-multipart
+    body = (await request.body()).decode()
+    form = {key: values[0] for key, values in parse_qs(body).items()}
+    if recorder is not None:
+        recorder.record("/", "form", form)
+
+    try:
+        start = perf_counter_ns()
+        record = parse_booking_form(form)
+        FORM_PARSE_TIMER.observe_raw(perf_counter_ns() - start)
+        predictions, _, _ = await batcher.predict([record])
+        logger.success(f"Prediction: {predictions[0]}")
+        return render(prediction=predictions[0])
+    except KeyError as e:
+        logger.error(f"Missing form field: {e}")
+        return render(error=f"Missing required field: {e}")
+    except ValueError as e:
+        logger.error(f"Invalid input value: {e}")
+        return render(error=f"Invalid input: {e}")
+    except Exception:
+        logger.exception("Error processing prediction request")
+        return render(error="An error occurred processing your request")
+
+
+@app.post("/predict/batch")
+async def predict_batch(request: Request):
+    """Score N bookings sent as JSON: {"reservations": [{...}, ...]} or a bare list."""
+    try:
+        try:
+            payload = await request.json()
+        except ValueError:
+            return JSONResponse({"error": "Request body must be JSON"}, status_code=400)
+
+        records = payload.get("reservations") if isinstance(payload, dict) else payload
+        logger.info("Received batch prediction request")
+        if recorder is not None:
+            recorder.record("/predict/batch", "json", payload)
+
+        # Column-wise validation is pandas work; keep it off the event loop
+        start = perf_counter_ns()
+        features = await run_in_threadpool(records_to_frame, records, [], max_batch_size=max_batch_size)
+        VALIDATE_TIMER.observe_raw(perf_counter_ns() - start)
+        predictions, cancel_proba, version = await batcher.predict(features.to_dict("records"))
+        logger.success(f"Scored batch of {len(features)} bookings")
+
+        return {
+            "count": len(features),
+            "predictions": predictions.tolist(),
+            "cancellation_probability": cancel_proba.tolist(),
+            "model_version": version,
+        }
+
+    except InputValidationError as e:
+        logger.error(f"Invalid batch payload: {e}")
+        return JSONResponse({"error": "Invalid input", "details": e.errors}, status_code=400)
+    except Exception:
+        logger.exception("Error processing batch prediction request")
+        return JSONResponse({"error": "An error occurred processing your request"}, status_code=500)
+
+
+@app.get("/status")
+async def status():
+    return {**service.status(), "micro_batching": batcher.stats()}
+
+
+@app.get("/metrics")
+async def metrics():
+    return Response(REGISTRY.render(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+
+if __name__ == "__main__":
+    uvicorn.run(app, host="0.0.0.0", port=5000)
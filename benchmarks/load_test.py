@@ -0,0 +1,389 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import itertools
+import threading
+import subprocess
+import http.client
+from datetime import datetime
+from urllib.parse import urlsplit, urlencode
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from utils.custom_exception import CustomException
+from utils.general_utils import load_config
+from utils.inference_utils import BOOKING_FIELDS
+
+
+PERCENTILES = (50, 95, 99, 99.9)
+# Latency percentiles compared against a baseline; higher is worse for all of them
+COMPARED_LATENCIES = ("p50", "p95", "p99")
+
+
+def load_requests(path):
+    with open(path) as f:
+        requests = [json.loads(line) for line in f if line.strip()]
+    if not requests:
+        raise ValueError(f"No requests to replay in {path}")
+    return requests
+
+
+def requests_from_csv(csv_path, output_path, n_requests=1000, batch_fraction=0.0, batch_size=32, seed=42):
+    """Build replayable form / batch payloads from real bookings when no traffic has been recorded yet."""
+    try:
+        df = pd.read_csv(csv_path, usecols=list(BOOKING_FIELDS))
+        rng = random.Random(seed)
+        rows = df.sample(frac=1.0, random_state=seed)
+        bookings = [{col: dtype(row[col]) for col, dtype in BOOKING_FIELDS.items()} for row in rows.to_dict("records")]
+
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+        with open(output_path, "w") as f:
+            for i in range(n_requests):
+                if rng.random() < batch_fraction:
+                    body = {"reservations": rng.sample(bookings, min(batch_size, len(bookings)))}
+                    request = {"method": "POST", "path": "/predict/batch", "content_type": "json", "body": body}
+                else:
+                    form = {col: str(value) for col, value in bookings[i % len(bookings)].items()}
+                    request = {"method": "POST", "path": "/", "content_type": "form", "body": form}
+                f.write(json.dumps(request) + "\n")
+
+        logger.success(f"Wrote {n_requests} requests from {csv_path} to {output_path}")
+        return output_path
+
+    except Exception as e:
+        logger.exception("Error while building requests from CSV")
+        raise CustomException(e, sys)
+
+
+class _Client:
+    """One keep-alive connection per worker thread; reconnects once if the server closed it."""
+
+    def __init__(self, base_url, timeout_s):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.timeout_s = timeout_s
+        self.conn = None
+
+    def _encode(self, request):
+        if request["content_type"] == "form":
+            return urlencode(request["body"]), {"Content-Type": "application/x-www-form-urlencoded"}
+        return json.dumps(request["body"]), {"Content-Type": "application/json"}
+
+    def send(self, request):
+        body, headers = self._encode(request)
+        for attempt in range(2):
+            try:
+                if self.conn is None:
+                    self.conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout_s)
+                self.conn.request(request.get("method", "POST"), request["path"], body=body, headers=headers)
+                response = self.conn.getresponse()
+                response.read()
+                return response.status
+            except (http.client.HTTPException, OSError):
+                if self.conn is not None:
+                    self.conn.close()
+                self.conn = None
+                if attempt == 1:
+                    raise
+
+
+class LoadTester:
+    """Replay recorded requests against a server and summarise throughput and tail latency.
+
+    Closed loop: `concurrency` workers send back to back. Open loop: requests
+    arrive as a Poisson process at `rate` per second and latency is measured
+    from the scheduled arrival, so a slow server cannot hide its queueing delay.
+    Requests started during the first `warmup_s` seconds are discarded.
+    """
+
+    def __init__(self, config, requests_path=None, base_url=None):
+        self.load_config = config.get("load_test", {})
+        self.base_url = base_url or self.load_config.get("base_url", "http://127.0.0.1:5000")
+        self.requests_path = requests_path or self.load_config.get("requests_path", "benchmarks/requests.jsonl")
+        self.results_dir = self.load_config.get("results_dir", "benchmarks/results")
+        self.timeout_s = self.load_config.get("timeout_s", 10)
+        self.requests = load_requests(self.requests_path)
+        logger.info(f"Loaded {len(self.requests)} requests from {self.requests_path}")
+
+    def _send(self, client, request, scheduled_at, started, samples):
+        try:
+            status = client.send(request)
+        except Exception as e:
+            status = f"error:{type(e).__name__}"
+        samples.append((scheduled_at - started, time.perf_counter() - scheduled_at, status))
+
+    def run_closed_loop(self, concurrency, duration_s, warmup_s):
+        samples = []
+        cursor = itertools.count()
+        started = time.perf_counter()
+        deadline = started + warmup_s + duration_s
+
+        def worker():
+            client = _Client(self.base_url, self.timeout_s)
+            while True:
+                sent_at = time.perf_counter()
+                if sent_at >= deadline:
+                    return
+                request = self.requests[next(cursor) % len(self.requests)]
+                self._send(client, request, sent_at, started, samples)
+
+        threads = [threading.Thread(target=worker, daemon=True) for _ in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return samples
+
+    def run_open_loop(self, rate, duration_s, warmup_s, max_workers=256, seed=42):
+        samples = []
+        local = threading.local()
+        rng = np.random.default_rng(seed)
+
+        total_s = warmup_s + duration_s
+        arrivals = np.cumsum(rng.exponential(1.0 / rate, size=int(rate * total_s * 1.2) + 10))
+        arrivals = arrivals[arrivals < total_s]
+
+        def fire(request, scheduled_at):
+            if not hasattr(local, "client"):
+                local.client = _Client(self.base_url, self.timeout_s)
+            self._send(local.client, request, scheduled_at, started, samples)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            started = time.perf_counter()
+            for i, offset in enumerate(arrivals):
+                scheduled_at = started + offset
+                delay = scheduled_at - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                pool.submit(fire, self.requests[i % len(self.requests)], scheduled_at)
+        return samples
+
+    @staticmethod
+    def summarize(samples, warmup_s, duration_s):
+        measured = [(latency, status) for offset, latency, status in samples if offset >= warmup_s]
+        latencies_ms = np.array([latency * 1000 for latency, _ in measured])
+
+        status_counts = {}
+        for _, status in measured:
+            status_counts[str(status)] = status_counts.get(str(status), 0) + 1
+        errors = sum(count for status, count in status_counts.items() if not status.isdigit() or int(status) >= 500)
+
+        summary = {
+            "requests": len(measured),
+            "warmup_requests": len(samples) - len(measured),
+            "errors": errors,
+            "error_rate": round(errors / len(measured), 6) if measured else None,
+            "status_counts": status_counts,
+            "throughput_rps": round(len(measured) / duration_s, 3),
+            "latency_ms": {},
+        }
+        if len(latencies_ms):
+            summary["latency_ms"] = {
+                "mean": round(float(latencies_ms.mean()), 4),
+                **{f"p{p:g}": round(float(np.percentile(latencies_ms, p)), 4) for p in PERCENTILES},
+                "max": round(float(latencies_ms.max()), 4),
+            }
+        return summary
+
+    def run(self, concurrency=None, rate=None, duration_s=None, warmup_s=None, label=None):
+        """Run one closed-loop (default) or open-loop (`rate` given) test and return the results dict."""
+        try:
+            duration_s = duration_s if duration_s is not None else self.load_config.get("duration_s", 30)
+            warmup_s = warmup_s if warmup_s is not None else self.load_config.get("warmup_s", 5)
+
+            if rate:
+                mode = "open_loop"
+                logger.info(f"Open loop at {rate} req/s for {warmup_s}s warmup + {duration_s}s against {self.base_url}")
+                samples = self.run_open_loop(rate, duration_s, warmup_s)
+            else:
+                mode = "closed_loop"
+                concurrency = concurrency or self.load_config.get("concurrency", 8)
+                logger.info(f"Closed loop with {concurrency} workers for {warmup_s}s warmup + {duration_s}s against {self.base_url}")
+                samples = self.run_closed_loop(concurrency, duration_s, warmup_s)
+
+            results = {
+                "label": label,
+                "timestamp": datetime.now().isoformat(timespec="seconds"),
+                "git_commit": _git_commit(),
+                "mode": mode,
+                "base_url": self.base_url,
+                "requests_path": self.requests_path,
+                "concurrency": concurrency if mode == "closed_loop" else None,
+                "rate_rps": rate,
+                "duration_s": duration_s,
+                "warmup_s": warmup_s,
+                **self.summarize(samples, warmup_s, duration_s),
+            }
+
+            latency = results["latency_ms"]
+            logger.success(
+                f"{results['requests']} requests, {results['throughput_rps']:.1f} req/s, "
+                f"p50 {latency.get('p50')} ms, p95 {latency.get('p95')} ms, p99 {latency.get('p99')} ms, "
+                f"p99.9 {latency.get('p99.9')} ms, {results['errors']} errors"
+            )
+            return results
+
+        except Exception as e:
+            logger.exception("Error during load test")
+            raise CustomException(e, sys)
+
+    def save(self, results, output_path=None):
+        if output_path is None:
+            stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            output_path = os.path.join(self.results_dir, f"load_test_{results['mode']}_{stamp}.json")
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+        with open(output_path, "w") as f:
+            json.dump(results, f, indent=2)
+        logger.info(f"Results saved to {output_path}")
+        return output_path
+
+
+def compare_results(current, baseline, max_regression=0.10):
+    """List the metrics where `current` is more than `max_regression` worse than `baseline`."""
+    regressions = []
+    if current.get("mode") != baseline.get("mode"):
+        logger.warning(f"Comparing a {current.get('mode')} run with a {baseline.get('mode')} baseline; throughput is skipped")
+
+    # Open-loop throughput is set by the arrival rate, so only closed-loop runs compare it
+    same_closed_loop = current.get("mode") == baseline.get("mode") == "closed_loop"
+    base_rps, cur_rps = baseline.get("throughput_rps"), current.get("throughput_rps")
+    if same_closed_loop and base_rps and cur_rps is not None and cur_rps < base_rps * (1 - max_regression):
+        regressions.append(f"throughput {cur_rps:.1f} req/s vs baseline {base_rps:.1f} req/s")
+
+    for name in COMPARED_LATENCIES:
+        base_ms = baseline.get("latency_ms", {}).get(name)
+        cur_ms = current.get("latency_ms", {}).get(name)
+        if base_ms and cur_ms is not None and cur_ms > base_ms * (1 + max_regression):
+            regressions.append(f"{name} {cur_ms:.3f} ms vs baseline {base_ms:.3f} ms")
+
+    if current.get("error_rate") and current["error_rate"] > (baseline.get("error_rate") or 0):
+        regressions.append(f"error rate {current['error_rate']:.4f} vs baseline {baseline.get('error_rate') or 0:.4f}")
+
+    return regressions
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def start_server(command, base_url, ready_path="/status", timeout_s=180):
+    """Start the app as a subprocess and wait until `ready_path` answers 200."""
+    logger.info(f"Starting server: {command}")
+    process = subprocess.Popen(command, shell=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    parts = urlsplit(base_url)
+    deadline = time.time() + timeout_s
+
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with code {process.returncode} before becoming ready")
+        try:
+            conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=2)
+            conn.request("GET", ready_path)
+            if conn.getresponse().status == 200:
+                logger.success(f"Server ready at {base_url}")
+                return process
+        except (http.client.HTTPException, OSError):
+            pass
+        time.sleep(0.5)
+
+    stop_server(process)
+    raise TimeoutError(f"Server at {base_url} not ready after {timeout_s}s")
+
+
+def stop_server(process):
+    process.terminate()
+    try:
+        process.wait(timeout=15)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def main():
+    config = load_config("config.yaml")
+    load_config_section = config.get("load_test", {})
+
+    parser = argparse.ArgumentParser(description="Replay recorded prediction traffic and report throughput / tail latency")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="Replay requests against a server")
+    run_parser.add_argument("--requests", help="JSONL of recorded requests")
+    run_parser.add_argument("--base-url")
+    run_parser.add_argument("--concurrency", type=int, help="Closed-loop workers")
+    run_parser.add_argument("--rate", type=float, help="Open-loop arrival rate in req/s (overrides --concurrency)")
+    run_parser.add_argument("--duration", type=float)
+    run_parser.add_argument("--warmup", type=float)
+    run_parser.add_argument("--label", help="Name stored with the results, e.g. a build id")
+    run_parser.add_argument("--output", help="Results JSON path (default: timestamped file in results_dir)")
+    run_parser.add_argument("--baseline", help="Results JSON to compare against; exits 1 on a regression")
+    run_parser.add_argument("--max-regression", type=float, default=load_config_section.get("max_regression", 0.10))
+    run_parser.add_argument("--start-server", action="store_true", help="Start server_command and stop it afterwards")
+
+    csv_parser = subparsers.add_parser("from-csv", help="Generate replayable requests from a bookings CSV")
+    csv_parser.add_argument("--csv", default=load_config_section.get("source_csv", "data/raw/test_Hotel_Reservations.csv"))
+    csv_parser.add_argument("--output", default=load_config_section.get("requests_path", "benchmarks/requests.jsonl"))
+    csv_parser.add_argument("--n", type=int, default=1000)
+    csv_parser.add_argument("--batch-fraction", type=float, default=0.0, help="Share of /predict/batch requests")
+    csv_parser.add_argument("--batch-size", type=int, default=32)
+
+    compare_parser = subparsers.add_parser("compare", help="Compare two results files")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("--max-regression", type=float, default=load_config_section.get("max_regression", 0.10))
+
+    args = parser.parse_args()
+
+    if args.command == "from-csv":
+        requests_from_csv(args.csv, args.output, args.n, args.batch_fraction, args.batch_size)
+        return 0
+
+    if args.command == "compare":
+        with open(args.current) as f:
+            current = json.load(f)
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare_results(current, baseline, args.max_regression)
+    else:
+        tester = LoadTester(config, requests_path=args.requests, base_url=args.base_url)
+        server = None
+        if args.start_server:
+            server = start_server(
+                load_config_section.get("server_command", "python application.py"),
+                tester.base_url,
+                load_config_section.get("ready_path", "/status"),
+            )
+        try:
+            results = tester.run(args.concurrency, args.rate, args.duration, args.warmup, args.label)
+        finally:
+            if server is not None:
+                stop_server(server)
+
+        regressions = []
+        if args.baseline:
+            with open(args.baseline) as f:
+                regressions = compare_results(results, json.load(f), args.max_regression)
+            results["baseline"] = args.baseline
+            results["regressions"] = regressions
+        tester.save(results, args.output)
+
+    for regression in regressions:
+        logger.error(f"Regression: {regression}")
+    if regressions:
+        return 1
+    logger.success("No regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
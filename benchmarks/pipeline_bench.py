@@ -0,0 +1,300 @@
+import os
+import sys
+import copy
+import json
+import time
+import socket
+import argparse
+import tempfile
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.model_selection import cross_val_score
+
+from utils.custom_exception import CustomException
+from utils.general_utils import load_config, load_data, build_dtype_plan
+from utils.processing_utils import RareCategoryGrouper, TopNEncoder, SkewHandler
+from src.data_processing import DataProcessor
+from utils.storage_utils import DatasetStorage, RESERVATION_SCHEMA
+
+
+# Mid-range point of the Optuna search space in ModelTraining._optimize_model
+CV_TRIAL_PARAMS = {
+    "n_estimators": 300,
+    "max_depth": 30,
+    "min_samples_split": 6,
+    "min_samples_leaf": 3,
+    "bootstrap": True,
+    "random_state": 42,
+    "n_jobs": -1,
+}
+# Benchmarks compared against the baseline; a slowdown or memory growth beyond the threshold fails the run
+COMPARED_METRICS = ("wall_s", "peak_mb")
+# Absolute differences below these are timer / allocator noise and never count as regressions
+NOISE_FLOOR = {"wall_s": 0.0005, "peak_mb": 0.5}
+
+
+def machine_id():
+    return f"{socket.gethostname()}-{os.cpu_count()}cpu"
+
+
+class PipelineBenchmark:
+    """Time fit / transform of each preprocessing step, feature selection and one CV trial at several data scales.
+
+    Each benchmark reports the median wall time over `repeats` runs, rows per
+    second, and peak traced memory from a separate tracemalloc run, so tracing
+    overhead does not leak into the timings. Memory held by joblib worker
+    processes (cv_trial) is not traced.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self.bench_config = config.get("benchmarks", {})
+        self.scales = self.bench_config.get("scales", [1000, 10000, 50000])
+        self.repeats = self.bench_config.get("repeats", 3)
+        self.heavy_max_rows = self.bench_config.get("heavy_max_rows", 20000)
+        self.source_csv = self.bench_config.get("source_csv", "data/raw/train_Hotel_Reservations.csv")
+
+        self.processor = DataProcessor(config)
+        # Same compact dtypes DataProcessor.run loads the raw splits with
+        self.source = self.processor._prepare_data(
+            load_data(self.source_csv, dtype_plan=build_dtype_plan(config), engine=self.processor.storage.csv_engine)
+        )
+        logger.info(f"Benchmark source: {len(self.source)} rows from {self.source_csv}")
+
+        self.benchmarks = {
+            "rare_grouper.fit": (self._rare_grouper_fit, False),
+            "rare_grouper.transform": (self._rare_grouper_transform, False),
+            "topn_encoder.fit": (self._topn_fit, False),
+            "topn_encoder.transform": (self._topn_transform, False),
+            "skew_handler.fit": (self._skew_fit, False),
+            "skew_handler.transform": (self._skew_transform, False),
+            "column_transformer.fit": (self._column_transformer_fit, False),
+            "column_transformer.transform": (self._column_transformer_transform, False),
+            "feature_selection": (self._feature_selection, True),
+            "cv_trial": (self._cv_trial, True),
+            "data_processor.run": (self._data_processor_run, True),
+        }
+
+    def _frame(self, n_rows, seed=42):
+        """`n_rows` bookings resampled from the source data, so every scale has the real column distributions."""
+        df = self.source.sample(n=n_rows, replace=n_rows > len(self.source), random_state=seed).reset_index(drop=True)
+        X = df.drop(columns="booking_status")
+        y = df["booking_status"].map({"Not_Canceled": 0, "Canceled": 1})
+        return X, y
+
+    # Each builder does its setup untimed and returns the callable to time
+
+    def _rare_grouper_fit(self, X, y):
+        cols = self.processor.rare_cols
+        return lambda: RareCategoryGrouper(threshold=500).fit(X[cols])
+
+    def _rare_grouper_transform(self, X, y):
+        cols = self.processor.rare_cols
+        grouper = RareCategoryGrouper(threshold=500).fit(X[cols])
+        return lambda: grouper.transform(X[cols])
+
+    def _topn_fit(self, X, y):
+        return lambda: TopNEncoder(n=3, prefix="meal").fit(X[["type_of_meal_plan"]])
+
+    def _topn_transform(self, X, y):
+        encoder = TopNEncoder(n=3, prefix="meal").fit(X[["type_of_meal_plan"]])
+        return lambda: encoder.transform(X[["type_of_meal_plan"]])
+
+    def _skew_fit(self, X, y):
+        cols = self.processor.num_cols
+        return lambda: SkewHandler(skew_threshold=self.processor.skew_threshold).fit(X[cols])
+
+    def _skew_transform(self, X, y):
+        cols = self.processor.num_cols
+        handler = SkewHandler(skew_threshold=self.processor.skew_threshold).fit(X[cols])
+        return lambda: handler.transform(X[cols])
+
+    def _column_transformer_fit(self, X, y):
+        return lambda: self.processor._build_preprocessor().fit(X, y)
+
+    def _column_transformer_transform(self, X, y):
+        preprocessor = self.processor._build_preprocessor().fit(X, y)
+        return lambda: preprocessor.transform(X)
+
+    def _feature_selection(self, X, y):
+        X_transformed = pd.DataFrame(self.processor._build_preprocessor().fit(X, y).transform(X))
+        processor = DataProcessor(self.config)
+        processor.proc_artifacts_dir = self._tmp_dir
+        # Time the ranking itself, not a cache hit from the previous repeat
+        processor.ranking_cache.enabled = False
+        return lambda: processor._select_features(X_transformed, y, X_transformed)
+
+    def _cv_trial(self, X, y):
+        X_transformed = pd.DataFrame(self.processor._build_preprocessor().fit(X, y).transform(X))
+        model = RandomForestClassifier(**CV_TRIAL_PARAMS)
+        return lambda: cross_val_score(model, X_transformed, y, cv=5, scoring="accuracy", n_jobs=-1).mean()
+
+    def _data_processor_run(self, X, y):
+        # DataProcessor.run end to end (dataset IO in the configured storage format, fit, transform, selection)
+        # against scratch directories
+        raw_dir = os.path.join(self._tmp_dir, "raw")
+        storage = DatasetStorage.from_config(self.config)
+        schema = None if storage.file_format == "csv" else RESERVATION_SCHEMA
+        df = X.assign(booking_status=y.map({0: "Not_Canceled", 1: "Canceled"}))
+        split = int(len(df) * 0.8)
+        storage.write(df.iloc[:split], storage.path(os.path.join(raw_dir, "train_Hotel_Reservations.csv")), schema=schema)
+        storage.write(df.iloc[split:], storage.path(os.path.join(raw_dir, "test_Hotel_Reservations.csv")), schema=schema)
+
+        config = copy.deepcopy(self.config)
+        config["data_ingestion"]["raw_data_dir"] = raw_dir
+        config["data_processing"]["proc_train_file"] = os.path.join(self._tmp_dir, "processed", "train.csv")
+        config["data_processing"]["proc_test_file"] = os.path.join(self._tmp_dir, "processed", "test.csv")
+        config["data_processing"]["proc_artifacts_dir"] = os.path.join(self._tmp_dir, "artifacts")
+        config["data_processing"].setdefault("feature_selection", {})["cache"] = False
+        return lambda: DataProcessor(config).run()
+
+    def _measure(self, build, X, y):
+        timings = []
+        for _ in range(self.repeats):
+            fn = build(X, y)
+            started = time.perf_counter()
+            fn()
+            timings.append(time.perf_counter() - started)
+
+        fn = build(X, y)
+        tracemalloc.start()
+        try:
+            fn()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        wall_s = float(np.median(timings))
+        return {
+            "rows": len(X),
+            "wall_s": round(wall_s, 6),
+            "min_s": round(min(timings), 6),
+            "rows_per_s": round(len(X) / wall_s, 1),
+            "peak_mb": round(peak / (1024 * 1024), 3),
+        }
+
+    def run(self, scales=None, only=None):
+        try:
+            scales = scales or self.scales
+            names = [name for name in self.benchmarks if not only or any(name.startswith(prefix) for prefix in only)]
+            results = {}
+
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                self._tmp_dir = tmp_dir
+                for n_rows in scales:
+                    X, y = self._frame(n_rows)
+                    for name in names:
+                        build, heavy = self.benchmarks[name]
+                        if heavy and n_rows > self.heavy_max_rows:
+                            continue
+                        result = self._measure(build, X, y)
+                        results[f"{name}@{n_rows}"] = result
+                        logger.success(
+                            f"{name:<30} {n_rows:>8} rows  {result['wall_s'] * 1000:>10.2f} ms  "
+                            f"{result['rows_per_s']:>12,.0f} rows/s  {result['peak_mb']:>8.1f} MB"
+                        )
+
+            return {
+                "timestamp": datetime.now().isoformat(timespec="seconds"),
+                "machine": machine_id(),
+                "repeats": self.repeats,
+                "results": results,
+            }
+
+        except Exception as e:
+            logger.exception("Error while running pipeline benchmarks")
+            raise CustomException(e, sys)
+
+
+def load_baselines(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_baseline(run, path):
+    """Store this run's results as the baseline for the machine it ran on."""
+    baselines = load_baselines(path)
+    baselines[run["machine"]] = {"timestamp": run["timestamp"], "results": run["results"]}
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(baselines, f, indent=2, sort_keys=True)
+    logger.info(f"Baseline for {run['machine']} saved to {path}")
+
+
+def check_regressions(run, baselines, max_regression):
+    baseline = baselines.get(run["machine"])
+    if baseline is None:
+        logger.warning(f"No baseline for machine {run['machine']}; nothing to compare")
+        return []
+
+    regressions = []
+    for key, result in run["results"].items():
+        base = baseline["results"].get(key)
+        if base is None:
+            continue
+        for metric in COMPARED_METRICS:
+            if result[metric] - base[metric] < NOISE_FLOOR[metric]:
+                continue
+            if result[metric] > base[metric] * (1 + max_regression):
+                regressions.append(f"{key} {metric}: {result[metric]} vs baseline {base[metric]}")
+    return regressions
+
+
+def main():
+    config = load_config("config.yaml")
+    bench_config = config.get("benchmarks", {})
+
+    parser = argparse.ArgumentParser(description="Benchmark the preprocessing transformers and training stages")
+    parser.add_argument("--scales", type=int, nargs="+", help="Row counts to benchmark at")
+    parser.add_argument("--only", nargs="+", help="Benchmark name prefixes, e.g. skew_handler column_transformer")
+    parser.add_argument("--save-baseline", action="store_true", help="Record this run as the machine's baseline")
+    parser.add_argument("--check", action="store_true", help="Exit 1 if any benchmark regressed past the threshold")
+    parser.add_argument("--max-regression", type=float, default=bench_config.get("max_regression", 0.25))
+    parser.add_argument("--output", help="Results JSON path (default: timestamped file in results_dir)")
+    parser.add_argument("--verbose", action="store_true", help="Keep the pipeline's own INFO logs")
+    args = parser.parse_args()
+
+    if not args.verbose:
+        logger.remove()
+        logger.add(
+            sys.stderr,
+            level="SUCCESS",
+            format="{time:HH:mm:ss} | {level} | {message}",
+            filter=lambda record: record["name"] == __name__ or record["level"].no >= logger.level("WARNING").no,
+        )
+
+    run = PipelineBenchmark(config).run(args.scales, args.only)
+
+    output = args.output or os.path.join(
+        bench_config.get("results_dir", "benchmarks/results"),
+        f"pipeline_bench_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
+    )
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(run, f, indent=2)
+    logger.success(f"Results saved to {output}")
+
+    baselines_path = bench_config.get("baselines_path", "benchmarks/baselines.json")
+    exit_code = 0
+    if args.check:
+        regressions = check_regressions(run, load_baselines(baselines_path), args.max_regression)
+        for regression in regressions:
+            logger.error(f"Regression: {regression}")
+        exit_code = 1 if regressions else 0
+        if not regressions:
+            logger.success("No regressions against baseline")
+
+    if args.save_baseline:
+        save_baseline(run, baselines_path)
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,7 +2,12 @@ from src.data_ingestion import DataIngestion
 from src.data_processing import DataProcessor
 from src.training import ModelTraining
 from utils.general_utils import load_config
+from utils.s3_utils import get_s3_client
+from utils.stage_dag import Stage, StageCache, run_stages
 from loguru import logger
+from pathlib import Path
+import argparse
+import sklearn
 import sys
 
 logger.remove()
@@ -22,13 +27,87 @@ logger.add(
 )
 
 
-if __name__=="__main__":
-    config = load_config('config.yaml')
-    data_ingestion = DataIngestion(config)
-    data_ingestion.run()
+def _source_version(ingestion, cache):
+    # The S3 object's ETag, or the downloaded copy's contents when S3 cannot be reached
+    try:
+        return get_s3_client().head_object(Bucket=ingestion.bucket, Key=ingestion.key)["ETag"]
+    except Exception as e:
+        logger.warning(f"Cannot read the ETag of s3://{ingestion.bucket}/{ingestion.key} ({e}), fingerprinting the local copy")
+        return cache.file_digest(str(ingestion.raw_data_file)) if cache else None
 
-    processor = DataProcessor(config)
-    processor.run()
 
+def build_stages(config, cache=None):
+    """Ingestion -> processing -> training, each with the files, config sections and code its result depends on."""
+    ingestion = DataIngestion(config)
+    processor = DataProcessor(config)
     trainer = ModelTraining(config)
-    trainer.run()
\ No newline at end of file
+    artifacts_dir = Path(processor.proc_artifacts_dir)
+
+    return [
+        Stage(
+            "ingestion",
+            ingestion.run,
+            outputs=[ingestion.train_data_file, ingestion.test_data_file],
+            config_sections=["data_ingestion", "storage"],
+            code=["src/data_ingestion.py", "utils/s3_utils.py", "utils/storage_utils.py", "utils/general_utils.py"],
+            extra={"source": lambda: _source_version(ingestion, cache)},
+        ),
+        Stage(
+            "processing",
+            processor.run,
+            inputs=[processor.ing_train_path, processor.ing_test_path],
+            outputs=[
+                processor.proc_train_path,
+                processor.proc_test_path,
+                artifacts_dir / "proc_01.pkl",
+                artifacts_dir / "feature_plan.pkl",
+                artifacts_dir / "selected_features.pkl",
+            ],
+            config_sections=["data_processing", "storage"],
+            code=[
+                "src/data_processing.py",
+                "utils/processing_utils.py",
+                "utils/feature_plan.py",
+                "utils/feature_selection.py",
+                "utils/parallel_transform.py",
+                "utils/storage_utils.py",
+                "utils/general_utils.py",
+                "utils/s3_utils.py",
+                "utils/metrics.py",
+            ],
+            # The pickled preprocessor is only valid for the scikit-learn that wrote it
+            extra={"sklearn": lambda: sklearn.__version__},
+            deps=["ingestion"],
+        ),
+        Stage(
+            "training",
+            trainer.run,
+            inputs=[trainer.train_path, trainer.test_path],
+            outputs=[trainer.model_output_dir / trainer.model_name],
+            config_sections=["training"],
+            code=[
+                "src/training.py",
+                "utils/model_backends.py",
+                "utils/tuning.py",
+                "utils/storage_utils.py",
+                "utils/general_utils.py",
+                "utils/s3_utils.py",
+            ],
+            extra={"sklearn": lambda: sklearn.__version__},
+            deps=["processing"],
+        ),
+    ]
+
+
+if __name__=="__main__":
+    parser = argparse.ArgumentParser(description="Run the ingestion -> processing -> training pipeline, reusing cached stages")
+    parser.add_argument("--force", nargs="+", default=[], metavar="STAGE", help="Stages to re-run even when cached, e.g. training")
+    parser.add_argument("--no-cache", action="store_true", help="Run every stage and leave the stage cache untouched")
+    args = parser.parse_args()
+
+    config = load_config('config.yaml')
+    pipeline_config = config.get("pipeline", {})
+    use_cache = pipeline_config.get("cache", True) and not args.no_cache
+    cache = StageCache(pipeline_config.get("cache_dir", "artifacts/.cache/pipeline")) if use_cache else None
+
+    run_stages(build_stages(config, cache), config, cache=cache, force=args.force)
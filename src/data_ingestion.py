@@ -1,15 +1,25 @@
 import os
+import sys
+import csv
+from itertools import islice, compress
 import pandas as pd
-import boto3
+import fsspec
 from dotenv import load_dotenv
 from loguru import logger
 from pathlib import Path
 from utils.custom_exception import CustomException
 from utils.general_utils import load_config
+from utils.s3_utils import get_s3_client, download_ranged, S3Progress, md5_file
+from utils.storage_utils import DatasetStorage, DictionaryEncoder, RESERVATION_SCHEMA
+import pyarrow as pa
 from sklearn.model_selection import train_test_split
 
 load_dotenv()
 
+# pandas' default key, pinned so Booking_ID -> split assignment never changes between runs
+SPLIT_HASH_KEY = "0123456789123456"
+SPLIT_BUCKETS = 10_000
+
 class DataIngestion:
     def __init__(self, config):
 
@@ -21,18 +31,49 @@ class DataIngestion:
 
         self.raw_data_dir = Path(self.config["raw_data_dir"])
         self.raw_data_file = self.raw_data_dir / "Hotel_Reservations.csv"
+        # ETag of the object the raw file was downloaded from
+        self.etag_file = self.raw_data_dir / "Hotel_Reservations.csv.etag"
+        self.storage = DatasetStorage.from_config(config)
+        self.train_data_file = self.storage.path(self.raw_data_dir / "train_Hotel_Reservations.csv")
+        self.test_data_file = self.storage.path(self.raw_data_dir / "test_Hotel_Reservations.csv")
+
+        self.split_method = self.config.get("split_method", "random")
+        self.chunk_rows = self.config.get("chunk_rows", 200000)
+        self.id_column = self.config.get("id_column", "Booking_ID")
+
+        download_config = self.config.get("download", {})
+        self.part_size = int(download_config.get("part_size_mb", 16) * 1024 * 1024)
+        self.max_workers = download_config.get("max_workers", 16)
+        self.retries = download_config.get("retries", 3)
+        self.verify_etag = download_config.get("verify_etag", True)
+        self.stream_from_s3 = download_config.get("stream", False)
 
     def download_from_s3(self) -> str:
         try:
+            s3 = get_s3_client()
+            try:
+                head = s3.head_object(Bucket=self.bucket, Key=self.key)
+            except Exception as e:
+                if os.path.exists(self.raw_data_file):
+                    logger.warning(f"Cannot reach s3://{self.bucket}/{self.key} ({e}), using cached file: {self.raw_data_file}")
+                    return self.raw_data_file
+                raise
+
+            size = head["ContentLength"]
+            etag = head["ETag"].strip('"')
             if os.path.exists(self.raw_data_file):
-                logger.info(f"Using cached file: {self.raw_data_file}")
-                return self.raw_data_file
+                if self._cached_copy_matches(etag, size):
+                    logger.info(f"Using cached file: {self.raw_data_file}")
+                    return self.raw_data_file
+                logger.warning(f"Cached {self.raw_data_file} is not the current object (ETag {etag}), downloading again")
 
-            logger.info(f"Downloading from S3: s3://{self.bucket}/{self.key}")
             os.makedirs(os.path.dirname(self.raw_data_file), exist_ok=True)
-
-            s3 = boto3.client("s3")
-            s3.download_file(self.bucket, self.key, self.raw_data_file)
+            download_ranged(
+                s3, self.bucket, self.key, self.raw_data_file, size, self.part_size,
+                max_workers=self.max_workers, etag=etag, retries=self.retries,
+                verify_etag=self.verify_etag, resume=True, callback=S3Progress(),
+            )
+            self.etag_file.write_text(etag)
 
             logger.success(f"Downloaded file to {self.raw_data_file}")
             return self.raw_data_file
@@ -40,39 +81,142 @@ class DataIngestion:
         except Exception as e:
             logger.error("Failed during S3 download")
             raise CustomException(e)
+
+    def _cached_copy_matches(self, etag, size):
+        # The ETag recorded next to the file by the download that wrote it; a copy from before that record
+        # existed is accepted only if its MD5 equals a single-part ETag
+        if os.path.getsize(self.raw_data_file) != size:
+            return False
+        if self.etag_file.exists():
+            return self.etag_file.read_text().strip() == etag
+        if "-" not in etag and md5_file(self.raw_data_file) == etag:
+            self.etag_file.write_text(etag)
+            return True
+        return False
+
+    def _open_raw(self, mode="rb"):
+        """The raw CSV, read from the local copy or, with `download.stream`, straight from S3."""
+        kwargs = {"newline": ""} if "t" in mode else {}
+        if not self.stream_from_s3:
+            return open(self.raw_data_file, mode, **kwargs)
+
+        # LOCAL_S3_ROOT serves the same <root>/<bucket>/<key> layout as LocalS3Client
+        local_root = os.getenv("LOCAL_S3_ROOT")
+        if local_root:
+            url = f"file://{Path(local_root).absolute() / self.bucket / self.key}"
+        else:
+            url = f"s3://{self.bucket}/{self.key}"
+            kwargs["block_size"] = self.part_size
+        logger.info(f"Streaming {url} without staging it on disk")
+        return fsspec.open(url, mode, **kwargs).open()
         
     def split_data(self):
         try:
             logger.info("Starting the splitting process")
-            data = pd.read_csv(self.raw_data_file)
+            with self._open_raw() as src:
+                data = pd.read_csv(src)
             train_data , test_data = train_test_split(data , test_size=1-self.train_test_ratio , random_state=42)
 
-            train_data_file = self.raw_data_dir / "train_Hotel_Reservations.csv"
-            test_data_file = self.raw_data_dir / "test_Hotel_Reservations.csv"
-
-            train_data.to_csv(train_data_file)
-            test_data.to_csv(test_data_file)
+            schema = None if self.storage.file_format == "csv" else RESERVATION_SCHEMA
+            self.storage.write(train_data, self.train_data_file, schema=schema)
+            self.storage.write(test_data, self.test_data_file, schema=schema)
 
-            logger.info(f"Train data saved to {train_data_file}")
-            logger.info(f"Test data saved to {test_data_file}")
+            logger.info(f"Train data saved to {self.train_data_file}")
+            logger.info(f"Test data saved to {self.test_data_file}")
+            return len(train_data), len(test_data)
         
         except Exception as e:
             logger.error("Error while splitting data")
             raise CustomException("Failed to split data into training and test sets ", e)
-        
 
-    def run(self) -> pd.DataFrame:
+    def _is_test(self, ids):
+        hashes = pd.util.hash_pandas_object(ids, index=False, hash_key=SPLIT_HASH_KEY).to_numpy()
+        return hashes % SPLIT_BUCKETS >= round(self.train_test_ratio * SPLIT_BUCKETS)
+
+    def _ids(self, lines, id_idx):
+        ids = []
+        for line in lines:
+            if '"' in line:
+                # Quoted fields may contain commas; only those lines need the csv parser
+                ids.append(next(csv.reader([line]))[id_idx])
+            else:
+                ids.append(line.rstrip("\r\n").split(",")[id_idx])
+        return pd.Series(ids, dtype=str)
+
+    def split_data_streaming(self):
+        """Single pass over the raw CSV in chunks, routing each row by a hash of its Booking_ID.
+
+        The assignment depends only on the ID, so it is deterministic and
+        independent of row order and chunk size, and peak memory is one chunk.
+        Only the ID field is parsed; rows are copied to the outputs byte for byte.
+        Records are assumed to be one line each, which holds for this schema.
+        """
         try:
-            self.download_from_s3()
-            self.split_data()
+            if self.storage.file_format != "csv":
+                return self._split_to_columnar()
+
+            logger.info(f"Streaming the raw CSV in chunks of {self.chunk_rows:,} rows with a hash split")
+            n_train = n_test = 0
+
+            with self._open_raw("rt") as src, \
+                    open(self.train_data_file, "w", newline="") as train_out, \
+                    open(self.test_data_file, "w", newline="") as test_out:
+                header = src.readline()
+                id_idx = next(csv.reader([header])).index(self.id_column)
+                train_out.write(header)
+                test_out.write(header)
+
+                while True:
+                    lines = list(islice(src, self.chunk_rows))
+                    if not lines:
+                        break
+                    is_test = self._is_test(self._ids(lines, id_idx))
+                    train_out.writelines(compress(lines, ~is_test))
+                    test_out.writelines(compress(lines, is_test))
+                    n_test += int(is_test.sum())
+                    n_train += len(lines) - int(is_test.sum())
+
+            logger.info(f"Train data saved to {self.train_data_file} ({n_train:,} rows)")
+            logger.info(f"Test data saved to {self.test_data_file} ({n_test:,} rows)")
+            return n_train, n_test
 
-            logger.info("Loading data into pandas")
-            df = pd.read_csv(self.raw_data_file)
+        except Exception as e:
+            logger.exception("Error while streaming the hash split")
+            raise CustomException(e, sys)
+
+    def _split_to_columnar(self):
+        # Same hash routing, but the CSV is parsed into typed Arrow batches and written as Parquet / Feather
+        logger.info(f"Streaming the raw CSV into {self.storage.file_format} with a hash split")
+        n_train = n_test = 0
+
+        encoder = DictionaryEncoder(RESERVATION_SCHEMA)
+        with self._open_raw() as src, self.storage.open_writer(self.train_data_file, RESERVATION_SCHEMA) as train_writer, \
+                self.storage.open_writer(self.test_data_file, RESERVATION_SCHEMA) as test_writer:
+            # Roughly chunk_rows lines per block at ~150 bytes per reservation
+            reader = self.storage.raw_csv_reader(src, block_size=max(1 << 20, self.chunk_rows * 150))
+            for batch in reader:
+                table = encoder.encode(pa.Table.from_batches([batch]))
+                is_test = self._is_test(table.column(self.id_column).to_pandas())
+                train_writer.write_table(table.filter(pa.array(~is_test)))
+                test_writer.write_table(table.filter(pa.array(is_test)))
+                n_test += int(is_test.sum())
+                n_train += table.num_rows - int(is_test.sum())
+
+        logger.info(f"Train data saved to {self.train_data_file} ({n_train:,} rows)")
+        logger.info(f"Test data saved to {self.test_data_file} ({n_test:,} rows)")
+        return n_train, n_test
+
+    def run(self) -> dict:
+        try:
+            if not self.stream_from_s3:
+                self.download_from_s3()
+            if self.split_method == "hash":
+                n_train, n_test = self.split_data_streaming()
+            else:
+                n_train, n_test = self.split_data()
 
-            logger.success(
-                f"Loaded dataset with {len(df):,} rows and {len(df.columns)} columns"
-            )
-            return df
+            logger.success(f"Ingested {n_train + n_test:,} rows: {n_train:,} train, {n_test:,} test")
+            return {"train_rows": n_train, "test_rows": n_test}
 
         except Exception as e:
             logger.exception("Data ingestion failed")
@@ -82,4 +226,4 @@ class DataIngestion:
 if __name__ == "__main__":
     config = load_config('config.yaml')
     obj = DataIngestion(config)
-    df = obj.run()
+    obj.run()
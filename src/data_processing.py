@@ -1,20 +1,30 @@
 import os
 import sys
+import shutil
 import pandas as pd
 import numpy as np
 from loguru import logger
 import joblib
+import pyarrow as pa
 from utils.custom_exception import CustomException
-from utils.general_utils import load_config, load_data
+from utils.general_utils import load_config, load_data, build_dtype_plan
 from utils.processing_utils import RareCategoryGrouper, TopNEncoder, SkewHandler
+from utils.feature_plan import compile_processor
+from utils.parallel_transform import transform_to_memmap
+from utils.feature_selection import rank_features, FeatureRankingCache
 from pathlib import Path
-from utils.s3_utils import load_s3_file
+from utils.s3_utils import load_s3_file, ArtifactCache
+from utils.storage_utils import DatasetStorage, processed_schema, iter_dataset
 from utils.general_utils import load_config
 
+from sklearn.base import clone
 from sklearn.compose import ColumnTransformer
 from sklearn.pipeline import Pipeline
 from sklearn.preprocessing import OneHotEncoder
-from sklearn.ensemble import RandomForestClassifier
+
+
+# map + astype keeps an integer target; replace() leaves object dtype on pandas' string columns
+TARGET_MAP = {"Not_Canceled": 0, "Canceled": 1}
 
 
 class DataProcessor:
@@ -22,19 +32,27 @@ class DataProcessor:
         self.proc_config = config["data_processing"]
         self.ing_config = config["data_ingestion"]
 
+        self.storage = DatasetStorage.from_config(config)
         raw_data_dir = self.ing_config["raw_data_dir"]
-        self.ing_train_path = os.path.join(raw_data_dir, "train_Hotel_Reservations.csv")
-        self.ing_test_path = os.path.join(raw_data_dir, "test_Hotel_Reservations.csv")
+        self.ing_train_path = self.storage.path(os.path.join(raw_data_dir, "train_Hotel_Reservations.csv"))
+        self.ing_test_path = self.storage.path(os.path.join(raw_data_dir, "test_Hotel_Reservations.csv"))
 
-        self.proc_train_path = self.proc_config["proc_train_file"]
-        self.proc_test_path = self.proc_config["proc_test_file"]
+        self.proc_train_path = self.storage.path(self.proc_config["proc_train_file"])
+        self.proc_test_path = self.storage.path(self.proc_config["proc_test_file"])
         self.proc_artifacts_dir = self.proc_config["proc_artifacts_dir"]
+        # Memory-mapped transform outputs of the parallel mode, removed once the processed files are written
+        self.transform_buffers_dir = Path(self.proc_config["proc_data_dir"]) / ".transform"
+        self.dtype_plan = build_dtype_plan(config)
 
         self.preprocessor = None
 
         self.rare_cols = ["market_segment_type", "room_type_reserved"]
         self.num_cols = self.proc_config["numerical_columns"]
         self.skew_threshold = self.proc_config.get("skewness_threshold", 1.0)
+        self.incremental_fit = self.proc_config.get("incremental_fit", {})
+        self.parallel_transform = self.proc_config.get("parallel_transform", {})
+        self.selection_config = self.proc_config.get("feature_selection", {})
+        self.ranking_cache = FeatureRankingCache.from_config(config)
 
     def _prepare_data(self, df):
         df = df.copy()
@@ -63,29 +81,125 @@ class DataProcessor:
                     self.rare_cols,
                 ),
                 ("meal", TopNEncoder(n=3, prefix="meal"), ["type_of_meal_plan"]),
-                ("numeric", SkewHandler(skew_threshold=self.skew_threshold), self.num_cols),
+                (
+                    "numeric",
+                    SkewHandler(
+                        skew_threshold=self.skew_threshold,
+                        reservoir_size=self.incremental_fit.get("reservoir_size", 100_000),
+                    ),
+                    self.num_cols,
+                ),
             ]
         )
         return preprocessor
 
+    @staticmethod
+    def _row_hashes(df):
+        # Numbers as float64, so a chunk downcast to int8 hashes like one downcast to int16; categoricals hash by value
+        canonical = pd.DataFrame(
+            {col: df[col].astype("float64") if df[col].dtype.kind in "iufb" else df[col] for col in df.columns}
+        )
+        return pd.util.hash_pandas_object(canonical, index=False).to_numpy()
+
+    @staticmethod
+    def _first_seen(hashes, seen):
+        # One in-place pass over the hash set: True for rows whose hash neither `seen` nor an earlier row had
+        return np.fromiter(
+            (h not in seen and not seen.add(h) for h in hashes.tolist()), dtype=bool, count=len(hashes)
+        )
+
+    def _iter_unique_chunks(self, path, chunk_rows):
+        """Yield `path` in chunks without Booking_ID and with duplicate rows dropped across the whole file.
+
+        Rows are compared on the columns _prepare_data deduplicates on, target
+        included, by a 64-bit row hash kept in a set, so memory grows with the
+        number of unique rows (about 60 bytes each), never with the chunks' contents.
+        """
+        seen = set()
+        for chunk in iter_dataset(path, chunk_rows, dtype_plan=self.dtype_plan):
+            chunk = chunk.drop(columns=["Booking_ID"], errors="ignore")
+            chunk = chunk[self._first_seen(self._row_hashes(chunk), seen)]
+            if not chunk.empty:
+                yield chunk
+
+    def _fit_preprocessor_incremental(self):
+        """Fit the preprocessor over the raw training split chunk by chunk, never holding the whole split.
+
+        Duplicates are dropped across chunks by row hash, then each custom
+        transformer is partial_fit on every chunk. The one-hot encoder is fitted
+        last on the grouped categories, and the ColumnTransformer's bookkeeping
+        comes from a fit on the first chunk's head before the incrementally
+        fitted transformers are swapped in. The mappings match a full fit,
+        except for the tolerances documented on each partial_fit.
+        """
+        try:
+            chunk_rows = self.incremental_fit.get("chunk_rows", 200_000)
+            logger.info(f"Fitting the preprocessor incrementally in chunks of {chunk_rows} rows")
+
+            preprocessor = self._build_preprocessor()
+            fitted = {name: clone(transformer) for name, transformer, _ in preprocessor.transformers}
+            columns = {name: cols for name, _, cols in preprocessor.transformers}
+            grouper = fitted["rare_grouped"].named_steps["grouper"]
+
+            sample = None
+            rows = 0
+            for chunk in self._iter_unique_chunks(self.ing_train_path, chunk_rows):
+                chunk = chunk.drop(columns=["booking_status"], errors="ignore")
+                grouper.partial_fit(chunk[columns["rare_grouped"]])
+                fitted["meal"].partial_fit(chunk[columns["meal"]])
+                fitted["numeric"].partial_fit(chunk[columns["numeric"]])
+                if sample is None:
+                    sample = chunk.head(1000)
+                rows += len(chunk)
+
+            # The grouped values a full fit would one-hot encode: every category seen, rare ones as Other_<col>
+            grouped = {
+                col: [f"Other_{col}" if category in grouper.category_mappings_[col] else category for category in counts.index]
+                for col, counts in grouper.category_counts_.items()
+            }
+            longest = max(len(values) for values in grouped.values())
+            fitted["rare_grouped"].named_steps["ohe"].fit(
+                pd.DataFrame({col: np.resize(np.array(values, dtype=object), longest) for col, values in grouped.items()})
+            )
+
+            # Fitting on the sample sets the column bookkeeping (feature_names_in_, n_features_in_, the column
+            # selections), which depends only on the columns, not the rows. The sample-fitted transformers and
+            # their output slices (the public transformers_ / output_indices_) are then replaced by the
+            # incremental ones. tests/test_incremental_fit.py checks the result against a full fit.
+            preprocessor.fit(sample)
+            preprocessor.transformers_ = [
+                (name, fitted.get(name, transformer), cols) for name, transformer, cols in preprocessor.transformers_
+            ]
+            # The one-hot block can be wider than the sample alone would make it
+            start = 0
+            for name, transformer, cols in preprocessor.transformers_:
+                if name in fitted:
+                    width = transformer.transform(sample[cols]).shape[1]
+                    preprocessor.output_indices_[name] = slice(start, start + width)
+                    start += width
+            if preprocessor.transform(sample).shape[1] != start:
+                raise ValueError(f"Incrementally fitted preprocessor is {start} columns wide but transforms to a different width")
+
+            logger.info(f"Preprocessor fitted incrementally on {rows} unique rows")
+            return preprocessor, rows
+
+        except Exception as e:
+            logger.exception("Error during incremental preprocessor fit")
+            raise CustomException(e, sys)
+
     def _transform_features(self, X_train, X_test, y_train):
         try:
             logger.info("Building and fitting ColumnTransformer preprocessor")
-
             self.preprocessor = self._build_preprocessor()
-
             self.preprocessor.fit(X_train, y_train)
+            self._save_preprocessor()
 
-            artifacts_dir = Path(self.proc_artifacts_dir)
-            artifacts_dir.mkdir(parents=True, exist_ok=True)
-
-            joblib.dump(
-                self.preprocessor,
-                artifacts_dir / "proc_01.pkl"
-            )
-
-            X_train_transformed = pd.DataFrame(self.preprocessor.transform(X_train))
-            X_test_transformed = pd.DataFrame(self.preprocessor.transform(X_test))
+            if self.parallel_transform.get("enabled", False):
+                X_train_transformed = self._transform_parallel(X_train, "train")
+                X_test_transformed = self._transform_parallel(X_test, "test")
+            else:
+                X_train_transformed = pd.DataFrame(self.preprocessor.transform(X_train))
+                X_test_transformed = pd.DataFrame(self.preprocessor.transform(X_test))
 
             logger.info(
                 f"Transformed features - Train: {X_train_transformed.shape}, Test: {X_test_transformed.shape}"
@@ -97,12 +211,58 @@ class DataProcessor:
             logger.exception("Error during feature transformation")
             raise CustomException(e, sys)
 
-    def _select_features(self, X_train, y_train, X_test):
+    def _save_preprocessor(self):
+        artifacts_dir = Path(self.proc_artifacts_dir)
+        artifacts_dir.mkdir(parents=True, exist_ok=True)
+
+        joblib.dump(
+            self.preprocessor,
+            artifacts_dir / "proc_01.pkl"
+        )
+        compile_processor(self.preprocessor).save(artifacts_dir / "feature_plan.pkl")
+
+    def _transform_parallel(self, X, split):
+        # A frame over the memmap, not a copy: selection and the chunked writer read it straight from the file
+        buffer = transform_to_memmap(
+            self.preprocessor,
+            X,
+            self.transform_buffers_dir / f"{split}.npy",
+            chunk_rows=self.parallel_transform.get("chunk_rows", 100_000),
+            max_workers=self.parallel_transform.get("max_workers"),
+        )
+        return pd.DataFrame(buffer, copy=False)
+
+    def _rank_features(self, X_train, y_train):
         try:
-            logger.info("Selecting top features using RandomForest feature importance")
+            k = self.proc_config["no_of_top_features"]
+            # Defaults reproduce the original single 100-tree, unbounded-depth forest
+            settings = {
+                "engine": self.selection_config.get("engine", "random_forest"),
+                "seeds": self.selection_config.get("seeds", [42]),
+                "max_rows": self.selection_config.get("max_rows"),
+                "n_estimators": self.selection_config.get("n_estimators", 100),
+                "max_depth": self.selection_config.get("max_depth"),
+                "k": k,
+            }
+            cache_key = self.ranking_cache.key(X_train, y_train, settings)
+            cached = self.ranking_cache.get(cache_key)
+            if cached is not None:
+                importances, stability = cached
+                logger.info(f"Feature ranking cache hit ({cache_key[:12]}), skipping selection")
+            else:
+                logger.info(f"Selecting top features by {settings['engine']} feature importance")
+                importances, stability = rank_features(
+                    X_train,
+                    y_train,
+                    n_jobs=self.selection_config.get("n_jobs") or os.cpu_count(),
+                    **settings,
+                )
+                self.ranking_cache.put(cache_key, importances, stability)
 
-            model = RandomForestClassifier(random_state=42)
-            model.fit(X_train, y_train)
+            if stability < self.selection_config.get("min_stability", 0.0):
+                logger.warning(
+                    f"Top-{k} features overlap by only {stability:.2f} (Jaccard) across seeds {settings['seeds']}"
+                )
 
             feature_names = [f"feature_{i}" for i in range(X_train.shape[1])]
 
@@ -110,21 +270,17 @@ class DataProcessor:
                 pd.DataFrame(
                     {
                         "feature": feature_names,
-                        "importance": model.feature_importances_,
+                        "importance": importances,
                     }
                 )
                 .sort_values(by="importance", ascending=False)
             )
 
-            k = self.proc_config["no_of_top_features"]
             selected_indices = feature_importance.head(k).index.tolist()
             selected_features = feature_importance.head(k)["feature"].tolist()
 
             logger.info(f"Selected top {k} features: {selected_features}")
 
-            X_train_selected = X_train.iloc[:, selected_indices]
-            X_test_selected = X_test.iloc[:, selected_indices]
-
             artifacts_dir = Path(self.proc_artifacts_dir)
             artifacts_dir.mkdir(parents=True, exist_ok=True)
 
@@ -132,6 +288,18 @@ class DataProcessor:
                 selected_indices,
                 artifacts_dir / "selected_features.pkl"
             )
+            return selected_indices
+
+        except Exception as e:
+            logger.exception("Error during feature selection")
+            raise CustomException(e, sys)
+
+    def _select_features(self, X_train, y_train, X_test):
+        try:
+            selected_indices = self._rank_features(X_train, y_train)
+
+            X_train_selected = X_train.iloc[:, selected_indices]
+            X_test_selected = X_test.iloc[:, selected_indices]
             return X_train_selected, X_test_selected
 
         except Exception as e:
@@ -140,20 +308,116 @@ class DataProcessor:
 
     def save_data(self, df, file_path):
         try:
-            os.makedirs(os.path.dirname(file_path), exist_ok=True)
-            df.to_csv(file_path, index=False)
-            logger.success(f"Saved data to {file_path}")
+            schema = None if self.storage.file_format == "csv" else processed_schema(df.columns)
+            self.storage.write(df, file_path, schema=schema)
 
         except Exception as e:
             logger.exception("Error saving data")
             raise CustomException(e, sys)
 
+    def save_transformed(self, X, y, selected_indices, file_path):
+        """Write the selected columns of a (memory-mapped) transform output and the target to `file_path` chunk by chunk."""
+        values = X.to_numpy()
+        target = y.to_numpy()
+        chunk_rows = self.parallel_transform.get("chunk_rows", 100_000)
+        self._write_chunks(
+            ((values[start:start + chunk_rows], target[start:start + chunk_rows]) for start in range(0, len(values), chunk_rows)),
+            selected_indices,
+            file_path,
+        )
+
+    def _write_chunks(self, chunks, selected_indices, file_path):
+        # `chunks` yields (transformed values, target) pairs; only the selected columns are written
+        try:
+            columns = [str(i) for i in selected_indices]
+            schema = processed_schema(columns + ["booking_status"])
+            rows = 0
+            os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+
+            writer = None if self.storage.file_format == "csv" else self.storage.open_writer(file_path, schema)
+            try:
+                for values, target in chunks:
+                    chunk = pd.DataFrame(values[:, selected_indices], columns=columns)
+                    chunk["booking_status"] = target
+                    if writer is None:
+                        # pandas' CSV formatting, as save_data writes: Arrow's writer prints 1.0 as 1
+                        chunk.to_csv(file_path, mode="a" if rows else "w", header=not rows, index=False)
+                    else:
+                        writer.write_table(pa.Table.from_pandas(chunk, preserve_index=False).cast(schema))
+                    rows += len(chunk)
+            finally:
+                if writer is not None:
+                    writer.close()
+            logger.success(f"Saved {rows:,} rows to {file_path}")
+
+        except Exception as e:
+            logger.exception("Error saving transformed data")
+            raise CustomException(e, sys)
+
+    @staticmethod
+    def _split_target(chunk):
+        return chunk.drop(columns="booking_status"), chunk["booking_status"].map(TARGET_MAP).astype("int64").to_numpy()
+
+    def _run_incremental(self):
+        """Process splits larger than memory, holding at most one chunk of raw rows at a time.
+
+        After the incremental fit, a second pass transforms the unique training
+        rows chunk by chunk into a memory-mapped buffer, which feature ranking
+        and the chunked writer read as in the parallel mode. The test split is
+        deduplicated, transformed and written one chunk at a time. The output
+        is the same as the in-memory path's.
+        """
+        try:
+            chunk_rows = self.incremental_fit.get("chunk_rows", 200_000)
+            self.preprocessor, rows = self._fit_preprocessor_incremental()
+            self._save_preprocessor()
+
+            os.makedirs(self.transform_buffers_dir, exist_ok=True)
+            buffer = None
+            y_train = np.empty(rows, dtype="int64")
+            start = 0
+            for chunk in self._iter_unique_chunks(self.ing_train_path, chunk_rows):
+                X_chunk, y_chunk = self._split_target(chunk)
+                values = self.preprocessor.transform(X_chunk)
+                if buffer is None:
+                    buffer = np.lib.format.open_memmap(
+                        self.transform_buffers_dir / "train.npy", mode="w+", dtype=values.dtype, shape=(rows, values.shape[1])
+                    )
+                buffer[start:start + len(values)] = values
+                y_train[start:start + len(values)] = y_chunk
+                start += len(values)
+            buffer.flush()
+            logger.info(f"Transformed {rows:,} unique training rows into {self.transform_buffers_dir / 'train.npy'}")
+
+            X_train_transformed = pd.DataFrame(buffer, copy=False)
+            y_train = pd.Series(y_train, name="booking_status")
+            selected_indices = self._rank_features(X_train_transformed, y_train)
+            self.save_transformed(X_train_transformed, y_train, selected_indices, self.proc_train_path)
+
+            test_chunks = (
+                (self.preprocessor.transform(X_chunk), y_chunk)
+                for X_chunk, y_chunk in map(self._split_target, self._iter_unique_chunks(self.ing_test_path, chunk_rows))
+            )
+            self._write_chunks(test_chunks, selected_indices, self.proc_test_path)
+
+            del X_train_transformed, buffer
+            shutil.rmtree(self.transform_buffers_dir, ignore_errors=True)
+
+        except Exception as e:
+            logger.exception("Error during incremental data processing")
+            raise CustomException(e, sys)
+
     def run(self):
         try:
             logger.info("Starting data processing pipeline")
 
-            train_df = load_data(self.ing_train_path)
-            test_df = load_data(self.ing_test_path)
+            if self.incremental_fit.get("enabled", False):
+                self._run_incremental()
+                logger.success("Data processing pipeline completed")
+                return
+
+            train_df = load_data(self.ing_train_path, dtype_plan=self.dtype_plan, engine=self.storage.csv_engine)
+            test_df = load_data(self.ing_test_path, dtype_plan=self.dtype_plan, engine=self.storage.csv_engine)
 
             logger.info(f"Loaded train: {train_df.shape}, test: {test_df.shape}")
 
@@ -165,23 +429,32 @@ class DataProcessor:
             X_test = test_df.drop(columns="booking_status")
             y_test = test_df["booking_status"]
 
-            target_map = {"Not_Canceled": 0, "Canceled": 1}
-            y_train = y_train.replace(target_map)
-            y_test = y_test.replace(target_map)
+            y_train = y_train.map(TARGET_MAP).astype("int64")
+            y_test = y_test.map(TARGET_MAP).astype("int64")
 
             X_train_transformed, X_test_transformed = self._transform_features(
                 X_train, X_test, y_train
             )
 
+            if self.parallel_transform.get("enabled", False):
+                selected_indices = self._rank_features(X_train_transformed, y_train)
+                self.save_transformed(X_train_transformed, y_train, selected_indices, self.proc_train_path)
+                self.save_transformed(X_test_transformed, y_test, selected_indices, self.proc_test_path)
+                shutil.rmtree(self.transform_buffers_dir, ignore_errors=True)
+                logger.success("Data processing pipeline completed")
+                return
+
             X_train_selected, X_test_selected = self._select_features(
                 X_train_transformed, y_train, X_test_transformed
             )
 
+            # The transformed features carry a fresh RangeIndex while y keeps the gaps left by drop_duplicates,
+            # so align by position rather than by index
             train_processed = pd.concat(
-                [X_train_selected, pd.Series(y_train, name="booking_status")], axis=1
+                [X_train_selected, pd.Series(y_train.to_numpy(), name="booking_status")], axis=1
             )
             test_processed = pd.concat(
-                [X_test_selected, pd.Series(y_test, name="booking_status")], axis=1
+                [X_test_selected, pd.Series(y_test.to_numpy(), name="booking_status")], axis=1
             )
 
             self.save_data(train_processed, self.proc_train_path)
@@ -206,15 +479,16 @@ class DataProcessor:
 
             config = load_config("config.yaml")
             bucket_name = config["training"]["bucket_name"]
-            
+            artifact_cache = ArtifactCache.from_config(config)
+
             processor_key = config["training"]["processor_key"]
             local_processor_path = Path("artifacts/processors/proc_01.pkl")
-            local_processor_path = load_s3_file(bucket_name, processor_key, local_processor_path)
+            local_processor_path = load_s3_file(bucket_name, processor_key, local_processor_path, cache=artifact_cache)
             processor = joblib.load(local_processor_path)
             
             selected_features_key = config["training"]["selected_features_key"]
             local_selected_features_path = Path("artifacts/processors/selected_features.pkl")
-            local_selected_features_path = load_s3_file(bucket_name, selected_features_key, local_selected_features_path)
+            local_selected_features_path = load_s3_file(bucket_name, selected_features_key, local_selected_features_path, cache=artifact_cache)
             selected_indices = joblib.load(local_selected_features_path)
 
             X_transformed = processor.transform(features)
@@ -0,0 +1,288 @@
+import sys
+import time
+from time import perf_counter_ns
+import threading
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from utils.custom_exception import CustomException
+from utils.general_utils import load_config
+from utils.inference_utils import records_to_frame, SMOKE_BOOKING
+from utils.feature_plan import build_inference_plan
+from utils.forest_compiler import compile_forest
+from utils.s3_utils import ArtifactCache, get_s3_client
+from utils.artifact_loader import load_artifacts, serving_artifact_specs
+from utils.prediction_cache import PredictionCache, booking_key
+from utils.metrics import REGISTRY, BATCH_SIZE_BUCKETS, stage_timer
+
+
+CACHE_LOOKUP_TIMER = stage_timer("cache_lookup")
+FRAME_BUILD_TIMER = stage_timer("frame_build")
+TRANSFORM_TIMER = stage_timer("transform")
+SELECT_TIMER = stage_timer("select")
+PREDICT_TIMER = stage_timer("predict")
+BATCH_ROWS = REGISTRY.histogram(
+    "hotel_prediction_batch_rows", "Bookings per prediction call", BATCH_SIZE_BUCKETS
+)
+SCORED_ROWS = REGISTRY.histogram(
+    "hotel_scored_batch_rows", "Bookings per call that went through preprocessing and the model", BATCH_SIZE_BUCKETS
+)
+
+
+class ModelBundle:
+    """Processor, selected features and model that were loaded and validated together."""
+
+    def __init__(self, processor, selected_indices, model, versions, serving_config, num_cols, load_timings=None):
+        self.processor = processor
+        self.selected_indices = selected_indices
+        self.model = model
+        self.versions = versions
+        self.load_timings = load_timings or {}
+        self.loaded_at = time.time()
+
+        if serving_config.get("model_backend", "sklearn") == "compiled" and hasattr(model, "estimators_"):
+            logger.info("Compiling model into flat node arrays for low-latency scoring")
+            self.scoring_model = compile_forest(model)
+        else:
+            # Boosted models (training.model_backend) have no flattened evaluator; they score through predict_proba
+            self.scoring_model = model
+
+        if serving_config.get("preprocessor", "plan") == "plan":
+            logger.info("Building pruned inference plan from processor and selected features")
+            self.inference_plan = build_inference_plan(processor, selected_indices)
+            self.fill_cols = list(self.inference_plan.numeric_columns)
+        else:
+            self.inference_plan = None
+            self.fill_cols = num_cols
+
+        self.positive_idx = list(self.scoring_model.classes_).index(1)
+
+    @property
+    def version(self):
+        return "/".join(self.versions.get(name, "local")[:12] for name in ("processor", "selected_features", "model"))
+
+    def transform(self, features):
+        start = perf_counter_ns()
+        if self.inference_plan is not None:
+            # Only the branches feeding the selected columns are evaluated
+            X_selected = self.inference_plan.transform(features)
+            TRANSFORM_TIMER.observe_raw(perf_counter_ns() - start)
+            return X_selected
+
+        X_transformed = self.processor.transform(pd.DataFrame(features))
+        selected_at = perf_counter_ns()
+        TRANSFORM_TIMER.observe_raw(selected_at - start)
+
+        X_selected = pd.DataFrame(X_transformed).iloc[:, self.selected_indices]
+        SELECT_TIMER.observe_raw(perf_counter_ns() - selected_at)
+        return X_selected
+
+    def predict(self, features):
+        # One vectorized transform and one predict_proba for the whole batch, however many rows it has
+        X_processed = self.transform(features)
+
+        start = perf_counter_ns()
+        probabilities = self.scoring_model.predict_proba(X_processed)
+        predictions = self.scoring_model.classes_[np.argmax(probabilities, axis=1)]
+        PREDICT_TIMER.observe_raw(perf_counter_ns() - start)
+
+        return predictions, probabilities[:, self.positive_idx]
+
+
+class InferenceService:
+    """Owns the live ModelBundle and swaps in new artifact versions without a restart.
+
+    Requests read `self.bundle` once and keep using that object, so a reload
+    only replaces the reference and in-flight requests finish on the old bundle.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self.serving_config = config.get("serving", {})
+        self.reload_config = self.serving_config.get("hot_reload", {})
+
+        self.bucket_name = config["training"]["bucket_name"]
+        self.num_cols = config["data_processing"]["numerical_columns"]
+        self.artifact_cache = ArtifactCache.from_config(config)
+        self.prediction_cache = PredictionCache.from_config(config)
+        self.specs = serving_artifact_specs(config)
+
+        self._reload_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._watcher = None
+
+        self.reload_count = 0
+        self.last_reload_s = None
+        self.last_check_at = None
+        self.last_error = None
+
+        self.bundle = self._load_bundle()
+        self.startup_timings = self.bundle.load_timings
+        self._register_metrics()
+        if self.prediction_cache is not None:
+            self.prediction_cache.set_version(self.bundle.version)
+
+    def _register_metrics(self):
+        REGISTRY.callback("hotel_model_reloads_total", "Model bundles hot-swapped in", lambda: self.reload_count, "counter")
+        REGISTRY.callback("hotel_model_loaded_timestamp_seconds", "When the served bundle was loaded", lambda: self.bundle.loaded_at)
+
+        if self.prediction_cache is not None:
+            cache = self.prediction_cache
+            for stat, kind in (("hits", "counter"), ("shared_hits", "counter"), ("misses", "counter"),
+                               ("evictions", "counter"), ("entries", "gauge")):
+                name = f"hotel_prediction_cache_{stat}" + ("_total" if kind == "counter" else "")
+                REGISTRY.callback(name, f"Prediction cache {stat.replace('_', ' ')}", lambda stat=stat: cache.stats()[stat], kind)
+
+    def _remote_versions(self):
+        # Only decides whether to reload; the bundle's versions come from the objects load_artifacts fetched
+        s3 = get_s3_client()
+        versions = {}
+        for spec in self.specs:
+            head = s3.head_object(Bucket=self.bucket_name, Key=spec.key)
+            versions[spec.name] = head["ETag"].strip('"')
+        return versions
+
+    def _load_bundle(self):
+        logger.info("Loading processor, selected features and model from S3 concurrently")
+        artifacts, versions, timings = load_artifacts(
+            self.bucket_name,
+            self.specs,
+            cache=self.artifact_cache,
+            part_size=int(self.serving_config.get("download_part_size_mb", 8) * 1024 * 1024),
+            max_part_workers=self.serving_config.get("download_part_workers", 8),
+        )
+        bundle = ModelBundle(
+            artifacts["processor"],
+            artifacts["selected_features"],
+            artifacts["model"],
+            versions,
+            self.serving_config,
+            self.num_cols,
+            load_timings=timings,
+        )
+        self._smoke_test(bundle)
+        logger.success(f"Model bundle {bundle.version} loaded and validated")
+        return bundle
+
+    def _smoke_test(self, bundle):
+        features = records_to_frame([SMOKE_BOOKING], bundle.fill_cols)
+        predictions, probabilities = bundle.predict(features)
+        if len(predictions) != 1 or not np.all((probabilities >= 0) & (probabilities <= 1)):
+            raise ValueError(f"Smoke prediction returned invalid output: {predictions}, {probabilities}")
+
+    def check_for_update(self):
+        """Reload the bundle if any artifact's ETag changed; returns True when a new bundle was swapped in."""
+        with self._reload_lock:
+            self.last_check_at = time.time()
+            try:
+                versions = self._remote_versions()
+                if versions == self.bundle.versions:
+                    return False
+
+                changed = [name for name in versions if versions[name] != self.bundle.versions.get(name)]
+                logger.info(f"New artifact versions detected for {changed}, reloading model bundle")
+
+                started = time.perf_counter()
+                new_bundle = self._load_bundle()
+                self.last_reload_s = round(time.perf_counter() - started, 4)
+
+                old_version = self.bundle.version
+                self.bundle = new_bundle
+                if self.prediction_cache is not None:
+                    self.prediction_cache.set_version(new_bundle.version)
+                self.reload_count += 1
+                self.last_error = None
+                logger.success(f"Swapped model bundle {old_version} -> {new_bundle.version} in {self.last_reload_s:.3f}s")
+                return True
+
+            except Exception as e:
+                # Keep serving the current bundle; the next poll retries
+                self.last_error = str(e)
+                logger.exception("Model reload failed, keeping the current bundle")
+                return False
+
+    def _watch(self, interval):
+        while not self._stop.wait(interval):
+            self.check_for_update()
+
+    def start_watcher(self):
+        if self._watcher is not None:
+            return
+        interval = self.reload_config.get("poll_interval_s", 60)
+        self._watcher = threading.Thread(target=self._watch, args=(interval,), name="model-reload", daemon=True)
+        self._watcher.start()
+        logger.info(f"Watching artifacts for new versions every {interval}s")
+
+    def stop_watcher(self):
+        self._stop.set()
+
+    def predict(self, features):
+        return self.bundle.predict(features)
+
+    def _score_records(self, bundle, records):
+        start = perf_counter_ns()
+        features = pd.DataFrame.from_records(records)
+        for col in bundle.fill_cols:
+            if col not in features.columns:
+                features[col] = 0
+        FRAME_BUILD_TIMER.observe_raw(perf_counter_ns() - start)
+
+        SCORED_ROWS.observe_raw(len(records))
+        return bundle.predict(features)
+
+    def predict_records(self, records):
+        """Score already-validated booking dicts; returns (predictions, probabilities, version).
+
+        With the prediction cache enabled, only bookings not seen under the
+        current bundle version go through preprocessing and the model.
+        """
+        bundle = self.bundle
+        BATCH_ROWS.observe_raw(len(records))
+        if self.prediction_cache is None:
+            predictions, probabilities = self._score_records(bundle, records)
+            return predictions, probabilities, bundle.version
+
+        start = perf_counter_ns()
+        keys = [booking_key(record) for record in records]
+        cached = self.prediction_cache.get_many(bundle.version, keys)
+        missing = [i for i, value in enumerate(cached) if value is None]
+        CACHE_LOOKUP_TIMER.observe_raw(perf_counter_ns() - start)
+
+        predictions = np.empty(len(records), dtype=bundle.scoring_model.classes_.dtype)
+        probabilities = np.empty(len(records), dtype=float)
+        for i, value in enumerate(cached):
+            if value is not None:
+                predictions[i], probabilities[i] = value
+
+        if missing:
+            scored_pred, scored_proba = self._score_records(bundle, [records[i] for i in missing])
+            predictions[missing] = scored_pred
+            probabilities[missing] = scored_proba
+            self.prediction_cache.put_many(
+                bundle.version,
+                [(keys[i], (pred.item(), float(proba))) for i, pred, proba in zip(missing, scored_pred, scored_proba)],
+            )
+
+        return predictions, probabilities, bundle.version
+
+    def status(self):
+        bundle = self.bundle
+        return {
+            "version": bundle.version,
+            "versions": bundle.versions,
+            "loaded_at": bundle.loaded_at,
+            "reload_count": self.reload_count,
+            "last_reload_s": self.last_reload_s,
+            "last_check_at": self.last_check_at,
+            "last_error": self.last_error,
+            "hot_reload": self._watcher is not None,
+            "startup_timings": self.startup_timings,
+            "prediction_cache": self.prediction_cache.stats() if self.prediction_cache is not None else None,
+        }
+
+
+if __name__ == "__main__":
+    config = load_config("config.yaml")
+    service = InferenceService(config)
+    logger.info(service.status())
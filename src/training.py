@@ -1,17 +1,24 @@
 import os
 import sys
+import time
+import hashlib
+from functools import partial
 from pathlib import Path
-import boto3
 
 import joblib
+import numpy as np
 import pandas as pd
 from loguru import logger
 
 from utils.custom_exception import CustomException
 from utils.general_utils import load_config, load_data
+from utils.storage_utils import DatasetStorage
+from utils.s3_utils import get_s3_client
+from utils.tuning import plan_parallelism, run_study, build_pruner
+from utils.model_backends import get_backend
 
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.model_selection import cross_val_score
+from sklearn.model_selection import cross_val_score, StratifiedKFold
+from threadpoolctl import threadpool_limits
 from sklearn.metrics import (
     accuracy_score,
     precision_score,
@@ -27,14 +34,74 @@ from dotenv import load_dotenv
 load_dotenv()
 
 
+def _cv_accuracy(trial, X, y, backend, cv_folds, fold_jobs, tree_jobs):
+    # Module level so the tuning workers can unpickle it; fold_jobs x tree_jobs is this trial's share of the cores
+    model = backend.build(backend.suggest(trial), n_jobs=tree_jobs)
+    with threadpool_limits(limits=tree_jobs, user_api="openmp"):
+        return cross_val_score(
+            model,
+            X,
+            y,
+            cv=cv_folds,
+            scoring="accuracy",
+            n_jobs=fold_jobs,
+        ).mean()
+
+
+def _cv_accuracy_multi_fidelity(trial, X, y, backend, cv_folds, n_jobs, budgets):
+    """CV accuracy scored on growing budgets, reporting every fold to the pruner.
+
+    Each budget trains on that fraction of every fold's training rows with
+    that fraction of the trees / boosting rounds (at least 10) and scores on
+    the full fold. Step t reports the mean over the current budget's folds so
+    far, so a trial can be stopped after its first fold. The returned value
+    is the last (full) budget's mean: the same number cross_val_score gives.
+    """
+    params = backend.suggest(trial)
+    folds = list(StratifiedKFold(n_splits=cv_folds).split(X, y))
+    rng = np.random.default_rng(42)
+
+    step = 0
+    for budget in budgets:
+        scaled = max(10, round(params[backend.budget_param] * budget))
+        model = backend.build({**params, backend.budget_param: scaled}, n_jobs=n_jobs)
+        scores = []
+        for train_idx, valid_idx in folds:
+            if budget < 1:
+                train_idx = np.sort(rng.permutation(train_idx)[:max(1, int(len(train_idx) * budget))])
+            with threadpool_limits(limits=n_jobs, user_api="openmp"):
+                model.fit(X.iloc[train_idx], y.iloc[train_idx])
+                scores.append(accuracy_score(y.iloc[valid_idx], model.predict(X.iloc[valid_idx])))
+
+            step += 1
+            trial.report(float(np.mean(scores)), step)
+            if trial.should_prune():
+                raise optuna.TrialPruned()
+
+    return float(np.mean(scores))
+
+
+def _median_latency_ms(predict, X, repeats):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        predict(X)
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings)) * 1000
+
+
 class ModelTraining:
     def __init__(self, config):
         self.config = config
         self.train_config = self.config["training"]
         self.proc_config = self.config["data_processing"]
+        self.tuning_config = self.train_config.get("tuning", {})
+        self.backend = get_backend(self.train_config.get("model_backend", "random_forest"))
+        self.cpu_budget = self.tuning_config.get("cpu_budget") or os.cpu_count()
 
-        self.train_path = self.proc_config["proc_train_file"]
-        self.test_path = self.proc_config["proc_test_file"]
+        storage = DatasetStorage.from_config(config)
+        self.train_path = storage.path(self.proc_config["proc_train_file"])
+        self.test_path = storage.path(self.proc_config["proc_test_file"])
 
         model_output_path = Path(self.train_config["model_output_path"])
         self.model_output_dir = model_output_path.parent
@@ -63,40 +130,71 @@ class ModelTraining:
             logger.exception("Error while preparing data for training")
             raise CustomException(e, sys)
 
-    def _optimize_model(self, X_train, y_train, n_trials=25):
-        try:
-            logger.info(f"Starting Optuna hyperparameter search for RandomForest ({n_trials} trials)")
-
-            def objective(trial):
-                params = {
-                    "n_estimators": trial.suggest_int("n_estimators", 100, 500),
-                    "max_depth": trial.suggest_int("max_depth", 10, 50),
-                    "min_samples_split": trial.suggest_int("min_samples_split", 2, 10),
-                    "min_samples_leaf": trial.suggest_int("min_samples_leaf", 1, 5),
-                    "bootstrap": trial.suggest_categorical(
-                        "bootstrap", [True, False]
-                    ),
-                    "random_state": 42,
-                    "n_jobs": -1,
-                }
+    def _study_name(self, X_train, y_train, cv_folds):
+        # Resumed only while the training data and fold count are unchanged; anything else starts a fresh study
+        digest = hashlib.sha256()
+        digest.update(pd.util.hash_pandas_object(X_train, index=False).to_numpy().tobytes())
+        digest.update(pd.util.hash_pandas_object(y_train, index=False).to_numpy().tobytes())
+        digest.update(str(cv_folds).encode())
+        return f"{self.tuning_config.get('study_name') or self.backend.name}-{digest.hexdigest()[:12]}"
 
-                model = RandomForestClassifier(**params)
-                score = cross_val_score(
-                    model,
-                    X_train,
-                    y_train,
-                    cv=5,
-                    scoring="accuracy",
-                    n_jobs=-1,
-                ).mean()
+    def _optimize_model(self, X_train, y_train, n_trials=None):
+        try:
+            n_trials = n_trials or self.tuning_config.get("n_trials", 25)
+            cv_folds = self.tuning_config.get("cv_folds", 5)
+            cpu_budget = self.cpu_budget
+            n_workers, fold_jobs, tree_jobs = plan_parallelism(
+                cpu_budget, cv_folds, n_trials, self.tuning_config.get("n_workers")
+            )
+            logger.info(
+                f"Starting Optuna hyperparameter search for {self.backend.name} ({n_trials} trials): {cpu_budget} cores as "
+                f"{n_workers} concurrent trial(s) x {fold_jobs} fold job(s) x {tree_jobs} tree job(s)"
+            )
 
-                return score
+            multi_fidelity = self.tuning_config.get("multi_fidelity", {})
+            pruner = None
+            study_name = self._study_name(X_train, y_train, cv_folds)
+            if multi_fidelity.get("enabled", False):
+                budgets = multi_fidelity.get("budgets", [0.1, 0.3, 1.0])
+                # Folds run one after another so each can be reported; their cores go to the trees instead
+                objective = partial(
+                    _cv_accuracy_multi_fidelity,
+                    X=X_train,
+                    y=y_train,
+                    backend=self.backend,
+                    cv_folds=cv_folds,
+                    n_jobs=fold_jobs * tree_jobs,
+                    budgets=budgets,
+                )
+                pruner = build_pruner(
+                    multi_fidelity.get("pruner", "hyperband"),
+                    max_resource=len(budgets) * cv_folds,
+                    reduction_factor=multi_fidelity.get("reduction_factor", 3),
+                )
+                # Pruned trials are not comparable with full ones, so the two modes keep separate studies
+                study_name = f"{study_name}-mf"
+            else:
+                objective = partial(
+                    _cv_accuracy,
+                    X=X_train,
+                    y=y_train,
+                    backend=self.backend,
+                    cv_folds=cv_folds,
+                    fold_jobs=fold_jobs,
+                    tree_jobs=tree_jobs,
+                )
 
-            study = optuna.create_study(direction="maximize")
-            study.optimize(objective, n_trials=n_trials)
+            study = run_study(
+                objective,
+                self.tuning_config.get("storage", "sqlite:///artifacts/optuna/studies.db"),
+                study_name,
+                n_trials,
+                n_workers=n_workers,
+                pruner=pruner,
+            )
 
             logger.success(
-                f"Best RF params: {study.best_params}, CV accuracy={study.best_value:.4f}"
+                f"Best {self.backend.name} params: {study.best_params}, CV accuracy={study.best_value:.4f}"
             )
 
             return study.best_params
@@ -111,11 +209,16 @@ class ModelTraining:
 
             best_params = self._optimize_model(X_train, y_train)
 
-            logger.info("Training final RandomForest model with best parameters")
-            model = RandomForestClassifier(**best_params)
-            model.fit(X_train, y_train)
+            logger.info(f"Training final {self.backend.name} model with best parameters")
+            model = self.backend.build(best_params, n_jobs=self.cpu_budget)
+            start = time.perf_counter()
+            with threadpool_limits(limits=self.cpu_budget, user_api="openmp"):
+                model.fit(X_train, y_train)
+            training_time = time.perf_counter() - start
+            model = self.backend.for_serving(model)
 
             with mlflow.start_run():
+                mlflow.log_param("model_backend", self.backend.name)
                 mlflow.log_params(best_params)
 
                 y_pred = model.predict(X_test)
@@ -140,20 +243,40 @@ class ModelTraining:
                 joblib.dump(model, model_path)
                 logger.success(f"Saved trained model to {model_path}")
 
-                s3 = boto3.client("s3")
+                # Cost next to quality, so backends can be compared on speed too
+                speed = {
+                    "training_time_s": training_time,
+                    "model_size_mb": model_path.stat().st_size / 2**20,
+                    "latency_single_row_ms": _median_latency_ms(model.predict_proba, X_test.iloc[:1], repeats=200),
+                    "latency_batch_1000_ms": _median_latency_ms(model.predict_proba, X_test.iloc[:1000], repeats=20),
+                }
+                mlflow.log_metrics(speed)
+                logger.info(
+                    f"{self.backend.name}: trained in {speed['training_time_s']:.1f}s, "
+                    f"{speed['model_size_mb']:.2f} MB, {speed['latency_single_row_ms']:.3f} ms per row, "
+                    f"{speed['latency_batch_1000_ms']:.2f} ms per 1000-row batch"
+                )
+
+                s3 = get_s3_client()
 
                 bucket_name = self.config["training"]["bucket_name"]
                 s3_key = self.config["training"]["model_key"]
                 s3.upload_file(str(model_path), bucket_name, s3_key)
                 logger.success(f"Uploaded {model_path} to s3://{bucket_name}/{s3_key}")
 
-                mlflow.sklearn.log_model(model, artifact_path="model")
+                try:
+                    # MLflow 3 defaults to skops, which rejects the tree types every backend here produces
+                    mlflow.sklearn.log_model(model, artifact_path="model", serialization_format="cloudpickle")
+                except Exception as e:
+                    logger.warning(f"MLflow could not log the model ({e}), logging {model_path} as a run artifact instead")
+                    mlflow.log_artifact(str(model_path), artifact_path="model")
 
             return {
                 "accuracy": accuracy,
                 "precision": precision,
                 "recall": recall,
                 "f1": f1,
+                **speed,
                 "model_path": str(model_path),
             }
 
@@ -0,0 +1,41 @@
+import os
+import shutil
+import sys
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from utils.general_utils import load_config  # noqa: E402
+
+# A manual connectivity check against the real AWS account, not a unit test
+collect_ignore = ["test_s3_connection.py"]
+
+
+@pytest.fixture
+def config(tmp_path):
+    """The repo's config.yaml with CSV storage, every output under tmp_path and the feature ranking cache off."""
+    config = load_config(os.path.join(REPO_ROOT, "config.yaml"))
+    config["storage"]["format"] = "csv"
+    config["data_ingestion"]["raw_data_dir"] = f"{tmp_path / 'raw'}/"
+
+    proc_config = config["data_processing"]
+    proc_config["proc_data_dir"] = f"{tmp_path / 'processed'}/"
+    proc_config["proc_train_file"] = str(tmp_path / "processed" / "train.csv")
+    proc_config["proc_test_file"] = str(tmp_path / "processed" / "test.csv")
+    proc_config["proc_artifacts_dir"] = f"{tmp_path / 'processors'}/"
+    proc_config["feature_selection"]["cache"] = False
+
+    config["training"]["model_output_path"] = str(tmp_path / "models" / "model.pkl")
+    return config
+
+
+@pytest.fixture
+def raw_splits(config):
+    """The bundled raw train/test splits, copied to the config's raw_data_dir."""
+    raw_dir = config["data_ingestion"]["raw_data_dir"]
+    os.makedirs(raw_dir, exist_ok=True)
+    for name in ("train_Hotel_Reservations.csv", "test_Hotel_Reservations.csv"):
+        shutil.copy(os.path.join(REPO_ROOT, "data", "raw", name), raw_dir)
+    return raw_dir
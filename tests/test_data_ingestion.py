@@ -0,0 +1,71 @@
+import os
+
+import pandas as pd
+import pytest
+
+from conftest import REPO_ROOT
+from src.data_ingestion import DataIngestion
+
+
+@pytest.fixture
+def local_s3(config, tmp_path, monkeypatch):
+    """LOCAL_S3_ROOT serving the bundled raw CSV at the configured bucket / key; returns the object's path."""
+    root = tmp_path / "s3"
+    monkeypatch.setenv("LOCAL_S3_ROOT", str(root))
+    path = root / config["data_ingestion"]["bucket"] / config["data_ingestion"]["key"]
+    path.parent.mkdir(parents=True)
+    with open(os.path.join(REPO_ROOT, "data", "raw", "Hotel_Reservations.csv"), "rb") as f:
+        path.write_bytes(f.read())
+    return path
+
+
+def test_same_size_object_with_new_contents_is_downloaded_again(config, local_s3):
+    ingestion = DataIngestion(config)
+    ingestion.download_from_s3()
+    assert ingestion.raw_data_file.read_bytes() == local_s3.read_bytes()
+
+    # Same length, different bytes: only the ETag tells the copies apart
+    data = bytearray(local_s3.read_bytes())
+    data[-2:] = b"XY"
+    local_s3.write_bytes(bytes(data))
+    ingestion.download_from_s3()
+
+    assert ingestion.raw_data_file.read_bytes() == bytes(data)
+
+
+def test_copy_without_a_recorded_etag_is_reused_only_if_its_md5_matches(config, local_s3):
+    ingestion = DataIngestion(config)
+    ingestion.raw_data_dir.mkdir(parents=True)
+    ingestion.raw_data_file.write_bytes(local_s3.read_bytes())
+    before = ingestion.raw_data_file.stat().st_mtime_ns
+
+    ingestion.download_from_s3()
+
+    assert ingestion.raw_data_file.stat().st_mtime_ns == before
+    assert ingestion.etag_file.exists()
+
+
+def _split_ids(config, raw_csv, chunk_rows):
+    config["data_ingestion"].update(split_method="hash", chunk_rows=chunk_rows)
+    ingestion = DataIngestion(config)
+    ingestion.raw_data_dir.mkdir(parents=True, exist_ok=True)
+    raw_csv.to_csv(ingestion.raw_data_file, index=False)
+    ingestion.split_data_streaming()
+    train = pd.read_csv(ingestion.train_data_file)["Booking_ID"]
+    test = pd.read_csv(ingestion.test_data_file)["Booking_ID"]
+    return train, test
+
+
+def test_hash_split_is_repeatable_and_independent_of_row_order_and_chunk_size(config):
+    raw = pd.read_csv(os.path.join(REPO_ROOT, "data", "raw", "Hotel_Reservations.csv"))
+    train, test = _split_ids(config, raw, chunk_rows=5000)
+
+    assert len(train) + len(test) == len(raw)
+    assert set(train).isdisjoint(test)
+    assert len(train) / len(raw) == pytest.approx(config["data_ingestion"]["train_ratio"], abs=0.01)
+
+    again_train, again_test = _split_ids(config, raw, chunk_rows=5000)
+    assert again_train.tolist() == train.tolist() and again_test.tolist() == test.tolist()
+
+    shuffled_train, shuffled_test = _split_ids(config, raw.sample(frac=1, random_state=7), chunk_rows=3333)
+    assert set(shuffled_train) == set(train) and set(shuffled_test) == set(test)
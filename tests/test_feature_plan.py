@@ -0,0 +1,59 @@
+import os
+import warnings
+
+import joblib
+import numpy as np
+import pytest
+
+from conftest import REPO_ROOT
+from src.data_processing import DataProcessor
+from utils.feature_plan import FeaturePlan, build_inference_plan, check_plan_parity, compile_processor
+from utils.general_utils import load_data
+
+
+@pytest.fixture
+def fitted(config, raw_splits):
+    """The repo's ColumnTransformer fitted on the bundled train split, plus the prepared test features."""
+    processor = DataProcessor(config)
+    train = processor._prepare_data(load_data(processor.ing_train_path, dtype_plan=processor.dtype_plan))
+    test = processor._prepare_data(load_data(processor.ing_test_path, dtype_plan=processor.dtype_plan))
+    preprocessor = processor._build_preprocessor().fit(train.drop(columns="booking_status"))
+    return preprocessor, test.drop(columns="booking_status")
+
+
+def test_plan_matches_the_column_transformer(fitted):
+    preprocessor, X_test = fitted
+    plan = compile_processor(preprocessor)
+
+    assert plan.n_outputs == preprocessor.transform(X_test.head(1)).shape[1]
+    assert check_plan_parity(plan, preprocessor, X_test)
+
+    # The single-record path used for one-off requests gives the same rows
+    records = X_test.head(20).to_dict("records")
+    np.testing.assert_array_equal(plan.transform_records(records), plan.transform(X_test.head(20)))
+
+
+def test_pruned_plan_emits_only_the_selected_columns(fitted, tmp_path):
+    preprocessor, X_test = fitted
+    full = compile_processor(preprocessor)
+    rng = np.random.default_rng(0)
+    selected = rng.permutation(full.n_outputs)[: full.n_outputs // 2].tolist()
+
+    plan = build_inference_plan(preprocessor, selected)
+
+    assert plan.n_outputs == len(selected)
+    assert set(plan.required_columns) <= set(full.required_columns)
+    assert check_plan_parity(plan, preprocessor, X_test, selected)
+    # Pruned plans survive a save / load round trip unchanged
+    loaded = FeaturePlan.load(plan.save(tmp_path / "feature_plan.pkl"))
+    assert check_plan_parity(loaded, preprocessor, X_test, selected)
+
+
+def test_plan_matches_the_committed_processor(config, raw_splits):
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        preprocessor = joblib.load(os.path.join(REPO_ROOT, "artifacts", "processors", "proc_01.pkl"))
+    processor = DataProcessor(config)
+    X_test = processor._prepare_data(load_data(processor.ing_test_path)).drop(columns="booking_status")
+
+    assert check_plan_parity(compile_processor(preprocessor), preprocessor, X_test)
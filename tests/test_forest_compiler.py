@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+from sklearn.ensemble import ExtraTreesClassifier, RandomForestClassifier
+
+from utils.custom_exception import CustomException
+from utils.forest_compiler import CompiledForest, compile_forest
+
+
+@pytest.fixture(scope="module")
+def data():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(3000, 12))
+    # One-hot style columns, like the processed features, put many rows exactly on a split
+    X[:, :4] = rng.integers(0, 2, size=(3000, 4))
+    y = ((X[:, 0] + X[:, 4] - X[:, 5] ** 2 + rng.normal(scale=0.5, size=3000)) > 0).astype(int)
+    return X, y
+
+
+@pytest.mark.parametrize("model_cls", [RandomForestClassifier, ExtraTreesClassifier])
+@pytest.mark.parametrize("n_rows", [1, 64], ids=["single", "small-batch"])
+def test_small_batch_path_matches_predict_proba(data, model_cls, n_rows):
+    X, y = data
+    model = model_cls(n_estimators=25, min_samples_leaf=3, random_state=0).fit(X, y)
+    compiled = compile_forest(model)
+
+    assert n_rows <= compiled.small_batch_size
+    np.testing.assert_array_equal(compiled.predict_proba(X[:n_rows]), model.predict_proba(X[:n_rows]))
+
+
+@pytest.mark.parametrize("model_cls", [RandomForestClassifier, ExtraTreesClassifier])
+def test_dense_path_matches_predict_proba(data, model_cls):
+    X, y = data
+    model = model_cls(n_estimators=25, min_samples_leaf=3, random_state=0).fit(X, y)
+    compiled = compile_forest(model)
+    # Several chunks, the last one partial
+    compiled.chunk_size = 700
+
+    np.testing.assert_array_equal(compiled.predict_proba(X), model.predict_proba(X))
+    np.testing.assert_array_equal(compiled.predict(X), model.predict(X))
+
+
+def test_saved_forest_loads_with_the_same_predictions(data, tmp_path):
+    X, y = data
+    model = RandomForestClassifier(n_estimators=10, random_state=0).fit(X, y)
+    compiled = compile_forest(model)
+
+    loaded = CompiledForest.load(compiled.save(tmp_path / "forest.npz"))
+    np.testing.assert_array_equal(loaded.predict_proba(X), model.predict_proba(X))
+
+
+def test_models_without_decision_trees_are_rejected(data):
+    X, y = data
+    with pytest.raises(CustomException):
+        compile_forest(object())
+    with pytest.raises(ValueError, match="Expected input of shape"):
+        compile_forest(RandomForestClassifier(n_estimators=2, random_state=0).fit(X, y)).predict_proba(X[:, :5])
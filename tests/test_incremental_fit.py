@@ -0,0 +1,114 @@
+import filecmp
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.data_processing import DataProcessor
+from utils.general_utils import load_data
+from utils.processing_utils import RareCategoryGrouper, SkewHandler, TopNEncoder
+
+
+@pytest.fixture
+def train_with_duplicates(config, raw_splits):
+    """The bundled train split plus exact duplicates and duplicates whose label was flipped."""
+    path = DataProcessor(config).ing_train_path
+    train = pd.read_csv(path)
+    exact = train.head(300)
+    flipped = train.iloc[300:600].assign(
+        booking_status=lambda df: df["booking_status"].map({"Canceled": "Not_Canceled", "Not_Canceled": "Canceled"})
+    )
+    pd.concat([train, exact, flipped]).to_csv(path, index=False)
+    return path
+
+
+def _full_fit(config):
+    processor = DataProcessor(config)
+    train = processor._prepare_data(load_data(processor.ing_train_path, dtype_plan=processor.dtype_plan))
+    X_train = train.drop(columns="booking_status")
+    return processor._build_preprocessor().fit(X_train), X_train
+
+
+def test_incremental_fit_matches_a_full_fit(config, train_with_duplicates):
+    config["data_processing"]["incremental_fit"]["chunk_rows"] = 4000
+    incremental, rows = DataProcessor(config)._fit_preprocessor_incremental()
+    full, X_train = _full_fit(config)
+
+    # Flipped-label copies are distinct rows for _prepare_data, so they must be counted here too
+    assert rows == len(X_train)
+    assert list(incremental.feature_names_in_) == list(full.feature_names_in_)
+    assert incremental.n_features_in_ == full.n_features_in_
+    assert incremental.output_indices_ == full.output_indices_
+    np.testing.assert_array_equal(incremental.transform(X_train), full.transform(X_train))
+
+    grouper = incremental.named_transformers_["rare_grouped"].named_steps["grouper"]
+    full_grouper = full.named_transformers_["rare_grouped"].named_steps["grouper"]
+    assert grouper.category_mappings_ == full_grouper.category_mappings_
+    for col, counts in grouper.category_counts_.items():
+        assert counts.to_dict() == X_train[col].value_counts().to_dict()
+
+    skew, full_skew = incremental.named_transformers_["numeric"], full.named_transformers_["numeric"]
+    assert skew.transform_method_ == full_skew.transform_method_
+    for col, value in full_skew.skewness_.items():
+        assert skew.skewness_[col] == pytest.approx(value, rel=1e-9)
+
+
+def test_partial_fit_matches_fit_on_the_same_rows():
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(
+        {
+            "segment": rng.choice(["Online", "Offline", "Corporate", "Aviation"], size=9000, p=[0.6, 0.3, 0.07, 0.03]),
+            "meal": rng.choice(["Meal Plan 1", "Not Selected", "Meal Plan 2", "Meal Plan 3"], size=9000, p=[0.5, 0.3, 0.15, 0.05]),
+            "price": -rng.lognormal(0, 0.8, size=9000) + 10,
+            "lead_time": rng.lognormal(3, 1, size=9000),
+        }
+    )
+    chunks = [X.iloc[start:start + 2000] for start in range(0, len(X), 2000)]
+
+    grouper, full_grouper = RareCategoryGrouper(threshold=500), RareCategoryGrouper(threshold=500).fit(X[["segment"]])
+    meal, full_meal = TopNEncoder(n=3), TopNEncoder(n=3).fit(X[["meal"]])
+    skew, full_skew = SkewHandler(), SkewHandler().fit(X[["price", "lead_time"]])
+    for chunk in chunks:
+        grouper.partial_fit(chunk[["segment"]])
+        meal.partial_fit(chunk[["meal"]])
+        skew.partial_fit(chunk[["price", "lead_time"]])
+
+    assert grouper.category_mappings_ == full_grouper.category_mappings_
+    assert meal.top_categories_ == full_meal.top_categories_
+    assert skew.transform_method_ == full_skew.transform_method_ == {"price": "yeo-johnson", "lead_time": "log"}
+    # The reservoir holds every row while fewer than reservoir_size were seen, so the lambdas are the full fit's
+    np.testing.assert_allclose(
+        skew.power_transformers_["price"].lambdas_, full_skew.power_transformers_["price"].lambdas_, rtol=1e-9
+    )
+    numeric = X[["price", "lead_time"]]
+    np.testing.assert_allclose(skew.transform(numeric), full_skew.transform(numeric), rtol=1e-9)
+
+
+def test_a_small_reservoir_is_a_uniform_row_sample():
+    rng = np.random.default_rng(1)
+    X = pd.DataFrame({"price": -rng.lognormal(0, 0.8, size=50000) + 10})
+    full = SkewHandler().fit(X)
+
+    skew = SkewHandler(reservoir_size=5000)
+    for start in range(0, len(X), 7000):
+        skew.partial_fit(X.iloc[start:start + 7000])
+
+    assert len(skew.reservoir_["price"]) == 5000
+    assert np.isin(skew.reservoir_["price"], X["price"]).all()
+    assert skew.skewness_["price"] == pytest.approx(full.skewness_["price"], rel=1e-9)
+    assert skew.power_transformers_["price"].lambdas_[0] == pytest.approx(full.power_transformers_["price"].lambdas_[0], rel=0.05)
+
+
+def test_incremental_run_writes_the_same_files_as_the_in_memory_run(config, raw_splits, tmp_path):
+    in_memory = DataProcessor(config)
+    in_memory.run()
+
+    config["data_processing"]["incremental_fit"].update(enabled=True, chunk_rows=4000)
+    config["data_processing"]["proc_train_file"] = str(tmp_path / "incremental" / "train.csv")
+    config["data_processing"]["proc_test_file"] = str(tmp_path / "incremental" / "test.csv")
+    incremental = DataProcessor(config)
+    incremental.run()
+
+    assert filecmp.cmp(in_memory.proc_train_path, incremental.proc_train_path, shallow=False)
+    assert filecmp.cmp(in_memory.proc_test_path, incremental.proc_test_path, shallow=False)
+    assert not incremental.transform_buffers_dir.exists()
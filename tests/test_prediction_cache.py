@@ -0,0 +1,44 @@
+import sys
+
+import pytest
+
+from utils.inference_utils import SMOKE_BOOKING, parse_booking_form, records_to_frame
+from utils.prediction_cache import PredictionCache, RedisBackend, booking_key
+
+
+def test_padded_strings_are_scored_and_cached_as_the_clean_value():
+    padded = dict(SMOKE_BOOKING, market_segment_type="Online ", room_type_reserved=" Room_Type 1")
+
+    scored = records_to_frame([padded], []).to_dict("records")[0]
+
+    assert scored["market_segment_type"] == "Online"
+    assert scored["room_type_reserved"] == "Room_Type 1"
+    assert booking_key(scored) == booking_key(SMOKE_BOOKING)
+
+
+def test_form_values_are_stripped_before_scoring():
+    form = {col: f" {value} " for col, value in SMOKE_BOOKING.items()}
+
+    assert parse_booking_form(form) == SMOKE_BOOKING
+
+
+def test_key_keeps_any_difference_the_model_would_see():
+    # Records that reach the key are already normalized, so it must not merge anything further
+    assert booking_key(dict(SMOKE_BOOKING, market_segment_type="Online ")) != booking_key(SMOKE_BOOKING)
+
+
+def test_entries_are_scoped_to_the_bundle_version():
+    cache = PredictionCache(max_entries=10, ttl_s=60)
+    cache.set_version("v1")
+    key = booking_key(SMOKE_BOOKING)
+    cache.put_many("v1", [(key, (0, 0.32))])
+
+    assert cache.get_many("v1", [key]) == [(0, 0.32)]
+    cache.set_version("v2")
+    assert cache.get_many("v2", [key]) == [None]
+
+
+def test_redis_backend_without_the_package_says_how_to_fix_it(monkeypatch):
+    monkeypatch.setitem(sys.modules, "redis", None)
+    with pytest.raises(ImportError, match="pip install redis"):
+        RedisBackend("redis://localhost:6379/0")
@@ -0,0 +1,64 @@
+import os
+import warnings
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.base import clone
+from sklearn.compose import ColumnTransformer
+
+from conftest import REPO_ROOT
+from utils.custom_exception import CustomException
+from utils.feature_plan import check_plan_parity, compile_processor
+from utils.processing_utils import SkewHandler
+
+
+def test_processor_pickled_before_partial_fit_still_loads():
+    # The committed proc_01.pkl predates SkewHandler's reservoir_size / random_state parameters
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        processor = joblib.load(os.path.join(REPO_ROOT, "artifacts", "processors", "proc_01.pkl"))
+    skew = processor.named_transformers_["numeric"]
+
+    assert "SkewHandler(" in repr(skew)
+    assert skew.get_params()["reservoir_size"] == 100_000
+    assert clone(skew).random_state == 42
+
+    train = pd.read_csv(os.path.join(REPO_ROOT, "data", "raw", "train_Hotel_Reservations.csv"), nrows=50)
+    assert processor.transform(train.drop(columns=["Booking_ID", "booking_status"])).shape[0] == 50
+
+
+def _skewed_frame():
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({"price": -rng.lognormal(0, 0.8, size=5000) + 10, "lead_time": rng.lognormal(3, 1, size=5000)})
+
+
+def test_yeo_johnson_uses_parameters_stored_at_fit_time():
+    X = _skewed_frame()
+    skew = SkewHandler().fit(X)
+    assert skew.transform_method_["price"] == "yeo-johnson"
+
+    # Same output as PowerTransformer's public transform, from the stored (lambda, mean, scale) alone
+    expected = skew.power_transformers_["price"].transform(X[["price"]])[:, 0]
+    np.testing.assert_allclose(skew.transform(X)["price"], expected, rtol=1e-12, atol=1e-12)
+    lmbda, mean, scale = skew.yeo_johnson_params_["price"]
+    assert lmbda == skew.power_transformers_["price"].lambdas_[0]
+
+    # Handlers pickled before the parameters were stored fall back to the PowerTransformer
+    legacy = SkewHandler().fit(X)
+    del legacy.yeo_johnson_params_
+    np.testing.assert_allclose(legacy.transform(X), skew.transform(X), rtol=1e-12, atol=1e-12)
+
+
+def test_feature_plan_compiles_a_yeo_johnson_column():
+    X = _skewed_frame()
+    processor = ColumnTransformer([("numeric", SkewHandler(), ["price", "lead_time"])]).fit(X)
+
+    plan = compile_processor(processor)
+    np.testing.assert_array_equal(plan.yeo_johnson_positions, [0])
+    assert check_plan_parity(plan, processor, X)
+
+    del processor.named_transformers_["numeric"].yeo_johnson_params_
+    with pytest.raises(CustomException, match="refit the processor"):
+        compile_processor(processor)
@@ -0,0 +1,193 @@
+import pytest
+
+from utils.custom_exception import CustomException
+from utils.s3_utils import ArtifactCache, LocalS3Client, download_ranged, fetch_s3_file, load_s3_file, md5_file
+
+BUCKET = "amzn-hotel-res-bucket"
+
+
+class CountingClient(LocalS3Client):
+    """LocalS3Client that counts the calls which transfer object bytes."""
+
+    def __init__(self, root):
+        super().__init__(root)
+        self.downloads = 0
+
+    def get_object(self, Bucket, Key, Range=None, IfMatch=None):
+        self.downloads += 1
+        return super().get_object(Bucket, Key, Range=Range, IfMatch=IfMatch)
+
+    def download_file(self, Bucket, Key, Filename, ExtraArgs=None, Callback=None, Config=None):
+        self.downloads += 1
+        return super().download_file(Bucket, Key, Filename, ExtraArgs=ExtraArgs, Callback=Callback, Config=Config)
+
+
+@pytest.fixture
+def s3(tmp_path):
+    return CountingClient(tmp_path / "s3")
+
+
+def _put(s3, key, data):
+    path = s3.root / BUCKET / key
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+
+
+def test_unchanged_etag_is_served_from_the_cache(s3, tmp_path):
+    _put(s3, "models/model.pkl", b"model v1" * 100)
+    cache = ArtifactCache(tmp_path / "cache", max_size_bytes=10**6)
+    local = tmp_path / "local" / "model.pkl"
+
+    load_s3_file(BUCKET, "models/model.pkl", local, cache=cache, s3=s3)
+    local.write_bytes(b"overwritten by a training run")
+    load_s3_file(BUCKET, "models/model.pkl", local, cache=cache, s3=s3)
+
+    assert s3.downloads == 1
+    assert local.read_bytes() == b"model v1" * 100
+
+
+def test_a_new_etag_invalidates_the_cached_copy(s3, tmp_path):
+    cache = ArtifactCache(tmp_path / "cache", max_size_bytes=10**6)
+    local = tmp_path / "local" / "model.pkl"
+
+    _put(s3, "models/model.pkl", b"model v1" * 100)
+    load_s3_file(BUCKET, "models/model.pkl", local, cache=cache, s3=s3)
+    _put(s3, "models/model.pkl", b"model v2" * 100)
+    load_s3_file(BUCKET, "models/model.pkl", local, cache=cache, s3=s3)
+
+    assert s3.downloads == 2
+    assert local.read_bytes() == b"model v2" * 100
+    assert cache.stats()["entries"] == 2
+
+
+def test_ranged_download_goes_through_the_cache(s3, tmp_path):
+    data = bytes(range(256)) * 40
+    _put(s3, "data/raw.csv", data)
+    cache = ArtifactCache(tmp_path / "cache", max_size_bytes=10**6)
+    local = tmp_path / "local" / "raw.csv"
+
+    load_s3_file(BUCKET, "data/raw.csv", local, cache=cache, s3=s3, part_size=1000)
+    assert local.read_bytes() == data
+    assert s3.downloads == 11
+
+    load_s3_file(BUCKET, "data/raw.csv", local, cache=cache, s3=s3, part_size=1000)
+    assert s3.downloads == 11
+
+
+def test_least_recently_used_entry_is_evicted_first(s3, tmp_path):
+    for name in ("a", "b", "c"):
+        _put(s3, f"artifacts/{name}.pkl", name.encode() * 1000)
+    # Room for two 1000-byte objects
+    cache = ArtifactCache(tmp_path / "cache", max_size_bytes=2500)
+
+    def load(name):
+        load_s3_file(BUCKET, f"artifacts/{name}.pkl", tmp_path / "local" / f"{name}.pkl", cache=cache, s3=s3)
+
+    load("a")
+    load("b")
+    load("a")  # a is now more recently used than b
+    load("c")
+
+    cached_keys = {entry["key"] for entry in cache._read_index().values()}
+    assert cached_keys == {"artifacts/a.pkl", "artifacts/c.pkl"}
+    assert cache.stats()["size_bytes"] <= 2500
+
+    downloads = s3.downloads
+    load("a")
+    assert s3.downloads == downloads
+    # Without an identical local copy to adopt, the evicted object has to be fetched again
+    (tmp_path / "local" / "b.pkl").unlink()
+    load("b")
+    assert s3.downloads == downloads + 1
+
+
+class FlakyClient(CountingClient):
+    """Fails every ranged GET from `fail_from` onwards, like a connection dropped mid-download."""
+
+    def __init__(self, root, fail_from):
+        super().__init__(root)
+        self.fail_from = fail_from
+
+    def get_object(self, Bucket, Key, Range=None, IfMatch=None):
+        if Range and int(Range.split("=")[1].split("-")[0]) >= self.fail_from:
+            raise IOError("connection reset")
+        return super().get_object(Bucket, Key, Range=Range, IfMatch=IfMatch)
+
+
+def test_interrupted_resumable_download_fetches_only_the_missing_parts(tmp_path):
+    data = bytes(range(256)) * 40
+    flaky = FlakyClient(tmp_path / "s3", fail_from=6000)
+    _put(flaky, "data/raw.csv", data)
+    etag = flaky.head_object(Bucket=BUCKET, Key="data/raw.csv")["ETag"].strip('"')
+    local = tmp_path / "raw.csv"
+
+    with pytest.raises(IOError):
+        download_ranged(flaky, BUCKET, "data/raw.csv", local, len(data), 1000, etag=etag, retries=0, resume=True)
+    assert not local.exists()
+
+    s3 = CountingClient(tmp_path / "s3")
+    download_ranged(s3, BUCKET, "data/raw.csv", local, len(data), 1000, etag=etag, resume=True)
+    assert local.read_bytes() == data
+    assert s3.downloads == 5
+    assert not (tmp_path / "raw.csv.part.json").exists()
+
+
+def test_download_not_matching_its_etag_is_never_put_in_place(s3, tmp_path):
+    data = b"x" * 5000
+    _put(s3, "data/raw.csv", data)
+    local = tmp_path / "raw.csv"
+
+    with pytest.raises(IOError, match="ETag"):
+        download_ranged(s3, BUCKET, "data/raw.csv", local, len(data), 1000, etag="0" * 32)
+    assert not local.exists()
+    assert not (tmp_path / "raw.csv.part").exists()
+
+
+class ReplacedAfterHeadClient(CountingClient):
+    """Overwrites the object right after the first HEAD, like a training run uploading mid-load."""
+
+    def __init__(self, root, replacement):
+        super().__init__(root)
+        self.replacement = replacement
+
+    def head_object(self, Bucket, Key):
+        head = super().head_object(Bucket, Key)
+        if self.replacement is not None:
+            _put(self, Key, self.replacement)
+            self.replacement = None
+        return head
+
+
+@pytest.mark.parametrize("part_size", [None, 1000])
+def test_object_replaced_after_head_is_not_stored_under_the_old_etag(tmp_path, part_size):
+    s3 = ReplacedAfterHeadClient(tmp_path / "s3", replacement=b"model v2" * 1000)
+    _put(s3, "models/model.pkl", b"model v1" * 1000)
+    cache = ArtifactCache(tmp_path / "cache", max_size_bytes=10**6)
+    local = tmp_path / "local" / "model.pkl"
+
+    with pytest.raises(CustomException):
+        fetch_s3_file(BUCKET, "models/model.pkl", local, cache=cache, s3=s3, part_size=part_size)
+    assert cache.stats()["entries"] == 0
+
+    # The next load sees the new object and reports the ETag of the bytes it returned
+    path, etag = fetch_s3_file(BUCKET, "models/model.pkl", local, cache=cache, s3=s3, part_size=part_size)
+    assert path.read_bytes() == b"model v2" * 1000
+    assert etag == md5_file(path)
+
+
+def test_object_smaller_than_a_part_is_fetched_with_a_conditional_get(s3, tmp_path):
+    _put(s3, "artifacts/selected_features.pkl", b"features" * 100)
+    local = tmp_path / "local" / "selected_features.pkl"
+
+    path, etag = fetch_s3_file(BUCKET, "artifacts/selected_features.pkl", local, s3=s3, part_size=1000)
+
+    assert path.read_bytes() == b"features" * 100
+    assert etag == md5_file(path)
+    assert s3.downloads == 1
+    assert not (tmp_path / "local" / "selected_features.pkl.part").exists()
+
+
+def test_local_client_rejects_download_args_boto3_rejects(s3, tmp_path):
+    _put(s3, "models/model.pkl", b"model v1")
+    with pytest.raises(ValueError, match="Invalid extra_args key 'IfMatch'"):
+        s3.download_file(BUCKET, "models/model.pkl", str(tmp_path / "model.pkl"), ExtraArgs={"IfMatch": '"abc"'})
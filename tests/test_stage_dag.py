@@ -0,0 +1,125 @@
+import ast
+import os
+
+import pytest
+
+from conftest import REPO_ROOT
+from utils.stage_dag import Stage, StageCache, run_stages
+
+
+@pytest.fixture
+def workdir(tmp_path):
+    (tmp_path / "input.txt").write_text("rows")
+    (tmp_path / "stage_code.py").write_text("VERSION = 1\n")
+    return tmp_path
+
+
+def _stages(workdir, runs):
+    def produce():
+        runs.append("produce")
+        (workdir / "out.txt").write_text((workdir / "input.txt").read_text().upper())
+
+    def consume():
+        runs.append("consume")
+        (workdir / "final.txt").write_text((workdir / "out.txt").read_text() + "!")
+
+    return [
+        Stage(
+            "produce",
+            produce,
+            inputs=[workdir / "input.txt"],
+            outputs=[workdir / "out.txt"],
+            config_sections=["produce"],
+            code=[workdir / "stage_code.py"],
+        ),
+        Stage("consume", consume, inputs=[workdir / "out.txt"], outputs=[workdir / "final.txt"], deps=["produce"]),
+    ]
+
+
+def _run(workdir, config, force=()):
+    runs = []
+    report = run_stages(_stages(workdir, runs), config, cache=StageCache(str(workdir / "cache")), force=force)
+    return runs, [row["status"] for row in report]
+
+
+def test_unchanged_rerun_is_served_from_the_cache(workdir):
+    config = {"produce": {"threshold": 1}}
+    assert _run(workdir, config) == (["produce", "consume"], ["ran", "ran"])
+    assert _run(workdir, config) == ([], ["hit", "hit"])
+
+
+@pytest.mark.parametrize(
+    "change",
+    [
+        lambda workdir, config: (workdir / "input.txt").write_text("more rows"),
+        lambda workdir, config: config["produce"].update(threshold=2),
+        lambda workdir, config: (workdir / "stage_code.py").write_text("VERSION = 2\n"),
+    ],
+    ids=["input", "config", "code"],
+)
+def test_changed_input_config_or_code_reruns_the_stage(workdir, change):
+    config = {"produce": {"threshold": 1}}
+    _run(workdir, config)
+
+    change(workdir, config)
+    runs, statuses = _run(workdir, config)
+
+    assert runs[0] == "produce"
+    if (workdir / "out.txt").read_text() == "ROWS":
+        # Same output as before, so the downstream stage is still a hit
+        assert statuses == ["ran", "hit"]
+    else:
+        assert statuses == ["ran", "ran"]
+
+
+def test_deleted_outputs_are_restored_without_rerunning(workdir):
+    config = {"produce": {"threshold": 1}}
+    _run(workdir, config)
+    (workdir / "out.txt").unlink()
+    (workdir / "final.txt").write_text("tampered")
+
+    assert _run(workdir, config) == ([], ["hit", "hit"])
+    assert (workdir / "out.txt").read_text() == "ROWS"
+    assert (workdir / "final.txt").read_text() == "ROWS!"
+
+
+def test_forced_stage_runs_despite_a_cache_hit(workdir):
+    config = {"produce": {"threshold": 1}}
+    _run(workdir, config)
+    assert _run(workdir, config, force=["consume"]) == (["consume"], ["hit", "forced"])
+
+
+def _project_imports(path, seen=None):
+    """Every utils / src module reachable from `path` through project imports, as repo-relative file paths."""
+    seen = set() if seen is None else seen
+    with open(os.path.join(REPO_ROOT, path)) as f:
+        tree = ast.parse(f.read())
+    for node in ast.walk(tree):
+        names = [node.module] if isinstance(node, ast.ImportFrom) and node.module else []
+        if isinstance(node, ast.Import):
+            names = [alias.name for alias in node.names]
+        for name in names:
+            module_path = name.replace(".", "/") + ".py"
+            if name.startswith(("utils.", "src.")) and module_path not in seen:
+                seen.add(module_path)
+                _project_imports(module_path, seen)
+    return seen
+
+
+def _declared_stage_code():
+    # Read statically: importing pipeline.training_pipeline would point loguru at logs/app.log
+    with open(os.path.join(REPO_ROOT, "pipeline", "training_pipeline.py")) as f:
+        tree = ast.parse(f.read())
+    for call in ast.walk(tree):
+        if isinstance(call, ast.Call) and getattr(call.func, "id", None) == "Stage":
+            code = next(kw.value for kw in call.keywords if kw.arg == "code")
+            yield call.args[0].value, [element.value for element in code.elts]
+
+
+def test_stage_code_lists_cover_every_project_module_they_import():
+    stages = dict(_declared_stage_code())
+    assert set(stages) == {"ingestion", "processing", "training"}
+    for name, code in stages.items():
+        # custom_exception only formats errors; it never changes what a stage produces
+        imported = _project_imports(code[0]) - {"utils/custom_exception.py"}
+        assert imported <= set(code), f"{name} is missing {sorted(imported - set(code))}"
@@ -0,0 +1,81 @@
+import sys
+import time
+import joblib
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from loguru import logger
+
+from utils.custom_exception import CustomException
+from utils.s3_utils import fetch_s3_file, get_s3_client
+
+
+ArtifactSpec = namedtuple("ArtifactSpec", ["name", "key", "local_path"])
+
+
+def serving_artifact_specs(config):
+    training_config = config["training"]
+    return [
+        ArtifactSpec("processor", training_config["processor_key"], Path("artifacts/processors/proc_01.pkl")),
+        ArtifactSpec(
+            "selected_features",
+            training_config["selected_features_key"],
+            Path("artifacts/processors/selected_features.pkl"),
+        ),
+        ArtifactSpec("model", training_config["model_key"], Path(training_config["model_output_path"])),
+    ]
+
+
+def load_artifacts(bucket_name, specs, cache=None, part_size=None, max_part_workers=8):
+    """Fetch and unpickle every artifact concurrently.
+
+    Each artifact is downloaded and loaded in its own thread, so the small
+    pickles are deserialised while the large model is still downloading and
+    startup time is bounded by the slowest artifact rather than the sum.
+    Returns (artifacts by name, ETag of each artifact as fetched, per-artifact timings).
+    """
+    try:
+        s3 = get_s3_client()
+        started = time.perf_counter()
+
+        def fetch_and_load(spec):
+            t0 = time.perf_counter()
+            local_path, etag = fetch_s3_file(
+                bucket_name, spec.key, spec.local_path,
+                cache=cache, s3=s3, part_size=part_size, max_part_workers=max_part_workers,
+            )
+            t1 = time.perf_counter()
+            artifact = joblib.load(local_path)
+            t2 = time.perf_counter()
+            timing = {
+                "fetch_s": round(t1 - t0, 4),
+                "load_s": round(t2 - t1, 4),
+                "total_s": round(t2 - t0, 4),
+                "size_bytes": Path(local_path).stat().st_size,
+            }
+            return spec.name, artifact, etag, timing
+
+        with ThreadPoolExecutor(max_workers=len(specs)) as pool:
+            results = list(pool.map(fetch_and_load, specs))
+
+        artifacts = {name: artifact for name, artifact, _, _ in results}
+        versions = {name: etag for name, _, etag, _ in results}
+        timings = {name: timing for name, _, _, timing in results}
+        timings["wall_s"] = round(time.perf_counter() - started, 4)
+
+        for name, _, _, timing in results:
+            logger.info(
+                f"{name}: fetch {timing['fetch_s']:.3f}s, load {timing['load_s']:.3f}s, "
+                f"{timing['size_bytes'] / (1024 * 1024):.2f} MB"
+            )
+        logger.success(
+            f"Loaded {len(specs)} artifacts in {timings['wall_s']:.3f}s "
+            f"(sequential would be ~{sum(t['total_s'] for _, _, _, t in results):.3f}s)"
+        )
+        return artifacts, versions, timings
+
+    except CustomException:
+        raise
+    except Exception as e:
+        logger.exception("Error while loading artifacts")
+        raise CustomException(e, sys)
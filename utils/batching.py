@@ -0,0 +1,117 @@
+import asyncio
+import sys
+from time import perf_counter_ns
+from loguru import logger
+
+from utils.custom_exception import CustomException
+from utils.metrics import REGISTRY, BATCH_SIZE_BUCKETS, stage_timer
+
+
+MICRO_BATCH_ROWS = REGISTRY.histogram("hotel_micro_batch_rows", "Rows per coalesced micro-batch", BATCH_SIZE_BUCKETS)
+QUEUE_WAIT_TIMER = stage_timer("queue_wait")
+
+
+class MicroBatcher:
+    """Coalesce concurrent prediction requests into one vectorized call.
+
+    Requests are queued; the worker takes the first waiting request and keeps
+    collecting until `max_batch_size` rows are gathered or `max_wait_ms` has
+    passed, runs `predict_fn` once in a thread, then resolves each caller's
+    future with its own slice of the results.
+    """
+
+    def __init__(self, predict_fn, max_batch_size=64, max_wait_ms=2.0):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait_s = max_wait_ms / 1000.0
+        self._queue = None
+        self._worker = None
+
+        self.batches = 0
+        self.rows = 0
+
+    async def start(self):
+        self._queue = asyncio.Queue()
+        self._worker = asyncio.create_task(self._run())
+        logger.info(f"Micro-batching up to {self.max_batch_size} rows or {self.max_wait_s * 1000:.1f} ms")
+
+    async def stop(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+    async def predict(self, records):
+        """Queue a list of booking dicts and wait for (predictions, probabilities, version)."""
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((records, future, perf_counter_ns()))
+        return await future
+
+    async def _collect(self):
+        records, future, queued_at = await self._queue.get()
+        batch = [(records, future, queued_at)]
+        n_rows = len(records)
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_wait_s
+
+        while n_rows < self.max_batch_size:
+            try:
+                item = self._queue.get_nowait()
+            except asyncio.QueueEmpty:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            batch.append(item)
+            n_rows += len(item[0])
+
+        return batch, n_rows
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch, n_rows = await self._collect()
+            dequeued_at = perf_counter_ns()
+            for _, _, queued_at in batch:
+                QUEUE_WAIT_TIMER.observe_raw(dequeued_at - queued_at)
+            MICRO_BATCH_ROWS.observe_raw(n_rows)
+
+            all_records = [record for records, _, _ in batch for record in records]
+
+            try:
+                # Off the event loop, so new requests keep queueing while this batch is scored
+                predictions, probabilities, version = await loop.run_in_executor(
+                    None, self.predict_fn, all_records
+                )
+            except Exception as e:
+                logger.exception(f"Batch of {n_rows} rows failed")
+                error = e if isinstance(e, CustomException) else CustomException(e, sys)
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(error)
+                continue
+
+            self.batches += 1
+            self.rows += n_rows
+
+            start = 0
+            for records, future, _ in batch:
+                end = start + len(records)
+                if not future.done():
+                    future.set_result((predictions[start:end], probabilities[start:end], version))
+                start = end
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "rows": self.rows,
+            "mean_batch_size": round(self.rows / self.batches, 2) if self.batches else None,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+        }
@@ -30,4 +30,12 @@ class CustomException(Exception):
     
     def get_detailed_message(self):
         """Get full traceback for logging."""
-        return f"{str(self)}\n\nFull traceback:\n{self.full_traceback}"
\ No newline at end of file
+        return f"{str(self)}\n\nFull traceback:\n{self.full_traceback}"
+
+class InputValidationError(ValueError):
+    """Raised when request payloads fail validation; `errors` maps field -> reason."""
+
+    def __init__(self, errors):
+        self.errors = errors
+        details = "; ".join(f"{field}: {reason}" for field, reason in errors.items())
+        super().__init__(f"Invalid input - {details}")
@@ -0,0 +1,305 @@
+import sys
+import joblib
+import numpy as np
+from pathlib import Path
+from loguru import logger
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder
+from scipy import stats
+
+from utils.custom_exception import CustomException
+from utils.general_utils import load_config
+from utils.processing_utils import RareCategoryGrouper, TopNEncoder, SkewHandler
+
+
+class FeaturePlan:
+    """Flat, pandas-free replay of a fitted preprocessing ColumnTransformer.
+
+    Categorical branches become dict lookups from raw value to output column,
+    numeric branches become index arrays plus log1p / Yeo-Johnson parameters.
+    """
+
+    def __init__(
+        self,
+        n_outputs,
+        categorical_lookups,
+        numeric_columns,
+        numeric_offsets,
+        log_positions,
+        yeo_johnson_positions,
+        yeo_johnson_lambdas,
+        yeo_johnson_means,
+        yeo_johnson_scales,
+    ):
+        self.n_outputs = int(n_outputs)
+        self.categorical_lookups = [(col, dict(table)) for col, table in categorical_lookups]
+        self.numeric_columns = tuple(numeric_columns)
+        self.numeric_offsets = np.asarray(numeric_offsets, dtype=np.intp)
+        self.log_positions = np.asarray(log_positions, dtype=np.intp)
+        self.yeo_johnson_positions = np.asarray(yeo_johnson_positions, dtype=np.intp)
+        self.yeo_johnson_lambdas = np.asarray(yeo_johnson_lambdas, dtype=np.float64)
+        # NaN mean / scale mark a PowerTransformer fitted with standardize=False
+        self.yeo_johnson_means = np.asarray(yeo_johnson_means, dtype=np.float64)
+        self.yeo_johnson_scales = np.asarray(yeo_johnson_scales, dtype=np.float64)
+
+    @property
+    def required_columns(self):
+        columns = [col for col, _ in self.categorical_lookups] + list(self.numeric_columns)
+        return list(dict.fromkeys(columns))
+
+    def _apply_numeric(self, values):
+        # values is (n_numeric,) or (n_rows, n_numeric) and is modified in place
+        if self.log_positions.size:
+            values[..., self.log_positions] = np.log1p(values[..., self.log_positions])
+
+        for i, pos in enumerate(self.yeo_johnson_positions):
+            column = stats.yeojohnson(values[..., pos], self.yeo_johnson_lambdas[i])
+            if not np.isnan(self.yeo_johnson_means[i]):
+                column = column - self.yeo_johnson_means[i]
+                column = column / self.yeo_johnson_scales[i]
+            values[..., pos] = column
+
+        return values
+
+    def transform_one(self, record):
+        """Transform a single booking (dict or record-array row) into a 1-D float vector."""
+        out = np.zeros(self.n_outputs, dtype=np.float64)
+
+        for col, table in self.categorical_lookups:
+            idx = table.get(record[col], -1)
+            if idx >= 0:
+                out[idx] = 1.0
+
+        if self.numeric_columns:
+            values = np.array([record[col] for col in self.numeric_columns], dtype=np.float64)
+            out[self.numeric_offsets] = self._apply_numeric(values)
+
+        return out
+
+    def transform(self, columns):
+        """Transform a column mapping (dict of arrays, DataFrame or structured array) into a 2-D array."""
+        if self.numeric_columns:
+            n_rows = len(columns[self.numeric_columns[0]])
+        else:
+            n_rows = len(columns[self.categorical_lookups[0][0]])
+
+        out = np.zeros((n_rows, self.n_outputs), dtype=np.float64)
+        rows = np.arange(n_rows)
+
+        for col, table in self.categorical_lookups:
+            idx = np.fromiter((table.get(v, -1) for v in columns[col]), dtype=np.intp, count=n_rows)
+            hit = idx >= 0
+            out[rows[hit], idx[hit]] = 1.0
+
+        if self.numeric_columns:
+            values = np.column_stack(
+                [np.asarray(columns[col], dtype=np.float64) for col in self.numeric_columns]
+            )
+            out[:, self.numeric_offsets] = self._apply_numeric(values)
+
+        return out
+
+    def transform_records(self, records):
+        return np.vstack([self.transform_one(record) for record in records])
+
+    def prune(self, selected_indices):
+        """Return a plan that only computes `selected_indices`, emitted in that order.
+
+        Lookup entries, numeric columns and transform parameters feeding other
+        outputs are dropped, so dead branches cost nothing at inference.
+        """
+        position = {int(idx): new for new, idx in enumerate(selected_indices)}
+
+        lookups = []
+        for col, table in self.categorical_lookups:
+            kept = {value: position[idx] for value, idx in table.items() if idx in position}
+            if kept:
+                lookups.append((col, kept))
+
+        keep = [k for k, offset in enumerate(self.numeric_offsets) if int(offset) in position]
+        remap = {old: new for new, old in enumerate(keep)}
+
+        log_positions = [remap[k] for k in self.log_positions if k in remap]
+        yj = [(i, remap[k]) for i, k in enumerate(self.yeo_johnson_positions) if k in remap]
+
+        return FeaturePlan(
+            n_outputs=len(position),
+            categorical_lookups=lookups,
+            numeric_columns=[self.numeric_columns[k] for k in keep],
+            numeric_offsets=[position[int(self.numeric_offsets[k])] for k in keep],
+            log_positions=log_positions,
+            yeo_johnson_positions=[pos for _, pos in yj],
+            yeo_johnson_lambdas=[self.yeo_johnson_lambdas[i] for i, _ in yj],
+            yeo_johnson_means=[self.yeo_johnson_means[i] for i, _ in yj],
+            yeo_johnson_scales=[self.yeo_johnson_scales[i] for i, _ in yj],
+        )
+
+    def save(self, path):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        joblib.dump(self, path)
+        logger.success(f"Saved feature plan to {path}")
+        return path
+
+    @staticmethod
+    def load(path):
+        return joblib.load(path)
+
+
+def _compile_one_hot(grouper, encoder, columns, offset):
+    lookups = []
+    for i, col in enumerate(columns):
+        categories = list(encoder.categories_[i])
+        drop_idx = None
+        if encoder.drop_idx_ is not None and encoder.drop_idx_[i] is not None:
+            drop_idx = int(encoder.drop_idx_[i])
+
+        table = {}
+        for j, cat in enumerate(categories):
+            if j == drop_idx:
+                table[cat] = -1
+            else:
+                table[cat] = offset + j - (1 if drop_idx is not None and j > drop_idx else 0)
+
+        if grouper is not None:
+            other = f"Other_{col}"
+            for rare_cat in grouper.category_mappings_.get(col, []):
+                table[rare_cat] = table.get(other, -1)
+
+        width = len(categories) - (0 if drop_idx is None else 1)
+        lookups.append((col, {k: v for k, v in table.items() if v >= 0}))
+        offset += width
+
+    return lookups
+
+
+def _compile_top_n(encoder, columns, offset):
+    table = {cat: offset + k for k, cat in enumerate(encoder.top_categories_)}
+    return [(columns[0], table)]
+
+
+def _compile_skew(handler, columns, offset):
+    plan = {
+        "columns": list(columns),
+        "offsets": [offset + k for k in range(len(columns))],
+        "log": [],
+        "yj": [],
+        "lambdas": [],
+        "means": [],
+        "scales": [],
+    }
+    for k, col in enumerate(columns):
+        method = handler.transform_method_.get(col, "none")
+        if method == "log":
+            plan["log"].append(k)
+        elif method == "yeo-johnson":
+            params = getattr(handler, "yeo_johnson_params_", {}).get(col)
+            if params is None:
+                raise ValueError(
+                    f"SkewHandler column '{col}' was fitted before Yeo-Johnson parameters were stored; refit the processor to compile it"
+                )
+            lmbda, mean, scale = params
+            plan["yj"].append(k)
+            plan["lambdas"].append(lmbda)
+            plan["means"].append(mean)
+            plan["scales"].append(scale)
+    return plan
+
+
+def compile_processor(processor):
+    """Compile a fitted ColumnTransformer from DataProcessor._build_preprocessor into a FeaturePlan."""
+    try:
+        logger.info("Compiling fitted preprocessor into a feature plan")
+
+        categorical_lookups = []
+        numeric = {"columns": [], "offsets": [], "log": [], "yj": [], "lambdas": [], "means": [], "scales": []}
+
+        for name, trans, columns in processor.transformers_:
+            if trans == "drop":
+                continue
+
+            out_slice = processor.output_indices_[name]
+            offset = out_slice.start
+
+            if isinstance(trans, Pipeline):
+                steps = [step for _, step in trans.steps]
+                if len(steps) == 2 and isinstance(steps[0], RareCategoryGrouper) and isinstance(steps[1], OneHotEncoder):
+                    categorical_lookups += _compile_one_hot(steps[0], steps[1], columns, offset)
+                    continue
+                if len(steps) == 1 and isinstance(steps[0], OneHotEncoder):
+                    categorical_lookups += _compile_one_hot(None, steps[0], columns, offset)
+                    continue
+            elif isinstance(trans, OneHotEncoder):
+                categorical_lookups += _compile_one_hot(None, trans, columns, offset)
+                continue
+            elif isinstance(trans, TopNEncoder):
+                categorical_lookups += _compile_top_n(trans, columns, offset)
+                continue
+            elif isinstance(trans, SkewHandler):
+                skew_plan = _compile_skew(trans, columns, offset)
+                base = len(numeric["columns"])
+                numeric["columns"] += skew_plan["columns"]
+                numeric["offsets"] += skew_plan["offsets"]
+                numeric["log"] += [base + k for k in skew_plan["log"]]
+                numeric["yj"] += [base + k for k in skew_plan["yj"]]
+                for key in ("lambdas", "means", "scales"):
+                    numeric[key] += skew_plan[key]
+                continue
+
+            raise ValueError(f"Cannot compile transformer '{name}' of type {type(trans).__name__}")
+
+        n_outputs = max(s.stop for s in processor.output_indices_.values())
+
+        plan = FeaturePlan(
+            n_outputs=n_outputs,
+            categorical_lookups=categorical_lookups,
+            numeric_columns=numeric["columns"],
+            numeric_offsets=numeric["offsets"],
+            log_positions=numeric["log"],
+            yeo_johnson_positions=numeric["yj"],
+            yeo_johnson_lambdas=numeric["lambdas"],
+            yeo_johnson_means=numeric["means"],
+            yeo_johnson_scales=numeric["scales"],
+        )
+        logger.success(f"Compiled feature plan with {n_outputs} outputs")
+        return plan
+
+    except Exception as e:
+        logger.exception("Error while compiling preprocessor")
+        raise CustomException(e, sys)
+
+
+def build_inference_plan(processor, selected_indices):
+    """Compile the processor and prune it down to the columns kept by feature selection."""
+    try:
+        full_plan = compile_processor(processor)
+        plan = full_plan.prune(selected_indices)
+        logger.info(
+            f"Pruned feature plan from {full_plan.n_outputs} to {plan.n_outputs} outputs, "
+            f"inputs needed: {plan.required_columns}"
+        )
+        return plan
+
+    except CustomException:
+        raise
+    except Exception as e:
+        logger.exception("Error while building inference plan")
+        raise CustomException(e, sys)
+
+
+def check_plan_parity(plan, processor, features, selected_indices=None):
+    """Return True when the plan reproduces processor.transform on `features` bit-for-bit."""
+    expected = np.asarray(processor.transform(features), dtype=np.float64)
+    if selected_indices is not None:
+        expected = expected[:, list(selected_indices)]
+    compiled = plan.transform(features)
+    return expected.shape == compiled.shape and np.array_equal(expected, compiled)
+
+
+if __name__ == "__main__":
+    config = load_config("config.yaml")
+    artifacts_dir = Path(config["data_processing"]["proc_artifacts_dir"])
+
+    processor = joblib.load(artifacts_dir / "proc_01.pkl")
+    plan = compile_processor(processor)
+    plan.save(artifacts_dir / "feature_plan.pkl")
@@ -0,0 +1,94 @@
+import os
+import json
+import hashlib
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+from sklearn.ensemble import RandomForestClassifier
+
+
+def _importances(X, y, engine, seed, n_estimators, max_depth, n_jobs):
+    if engine == "random_forest":
+        model = RandomForestClassifier(n_estimators=n_estimators, max_depth=max_depth, random_state=seed, n_jobs=n_jobs)
+        return model.fit(X, y).feature_importances_
+    if engine == "lightgbm_gain":
+        from lightgbm import LGBMClassifier
+
+        model = LGBMClassifier(
+            n_estimators=n_estimators, max_depth=max_depth or -1, importance_type="gain",
+            subsample=0.8, subsample_freq=1, colsample_bytree=0.8, random_state=seed, n_jobs=n_jobs, verbose=-1,
+        )
+        importances = model.fit(X, y).feature_importances_.astype("float64")
+        return importances / importances.sum() if importances.sum() else importances
+    raise ValueError(f"Unknown feature selection engine: {engine}")
+
+
+def rank_features(X, y, k, engine="random_forest", seeds=(42,), max_rows=None, n_estimators=100, max_depth=None, n_jobs=None):
+    """Importance per column, averaged over one model per seed, and how stable the top `k` is across seeds.
+
+    With `max_rows`, each seed ranks on its own random sample of that many
+    rows. Stability is the smallest Jaccard overlap between
+    any two seeds' top-k sets (1.0 with a single seed).
+    """
+    per_seed = []
+    for seed in seeds:
+        if max_rows and len(X) > max_rows:
+            rows = np.sort(np.random.default_rng(seed).choice(len(X), size=max_rows, replace=False))
+            X_seed, y_seed = X.iloc[rows], y.iloc[rows]
+        else:
+            X_seed, y_seed = X, y
+        per_seed.append(_importances(X_seed, y_seed, engine, seed, n_estimators, max_depth, n_jobs))
+
+    tops = [set(np.argsort(-importances, kind="stable")[:k]) for importances in per_seed]
+    stability = min((len(a & b) / len(a | b) for a, b in combinations(tops, 2)), default=1.0)
+    return np.mean(per_seed, axis=0), stability
+
+
+class FeatureRankingCache:
+    """Feature importances stored as JSON under a hash of the training data and the selection settings."""
+
+    def __init__(self, cache_dir="artifacts/.cache/feature_selection", enabled=True):
+        self.cache_dir = cache_dir
+        self.enabled = enabled
+
+    @classmethod
+    def from_config(cls, config):
+        selection_config = config.get("data_processing", {}).get("feature_selection", {})
+        return cls(
+            cache_dir=selection_config.get("cache_dir", "artifacts/.cache/feature_selection"),
+            enabled=selection_config.get("cache", True),
+        )
+
+    @staticmethod
+    def key(X, y, settings):
+        digest = hashlib.sha256()
+        digest.update(json.dumps([str(col) for col in X.columns]).encode())
+        digest.update(pd.util.hash_pandas_object(X, index=False).to_numpy().tobytes())
+        digest.update(pd.util.hash_pandas_object(y, index=False).to_numpy().tobytes())
+        digest.update(json.dumps(settings, sort_keys=True).encode())
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key):
+        if not self.enabled or not os.path.exists(self._path(key)):
+            return None
+        try:
+            with open(self._path(key)) as f:
+                entry = json.load(f)
+            return np.array(entry["importances"]), entry["stability"]
+        except (OSError, ValueError, KeyError):
+            logger.warning(f"Ignoring unreadable feature ranking cache entry {key[:12]}")
+            return None
+
+    def put(self, key, importances, stability):
+        if not self.enabled:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = f"{self._path(key)}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"importances": [float(value) for value in importances], "stability": stability}, f)
+        os.replace(tmp_path, self._path(key))
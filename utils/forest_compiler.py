@@ -0,0 +1,177 @@
+import sys
+import joblib
+import numpy as np
+from pathlib import Path
+from loguru import logger
+from sklearn.tree import DecisionTreeClassifier
+
+from utils.custom_exception import CustomException
+from utils.general_utils import load_config
+
+
+class CompiledForest:
+    """All trees of a fitted forest classifier packed into contiguous node arrays.
+
+    Leaves point to themselves, so every tree can be advanced in lock-step
+    without branching on whether a path has already terminated.
+    """
+
+    def __init__(self, feature, threshold, left, right, is_leaf, value, roots, max_depth, classes, n_features,
+                 small_batch_size=64, chunk_size=4096):
+        self.feature = np.asarray(feature, dtype=np.intp)
+        self.threshold = np.asarray(threshold, dtype=np.float64)
+        self.left = np.asarray(left, dtype=np.intp)
+        self.right = np.asarray(right, dtype=np.intp)
+        self.is_leaf = np.asarray(is_leaf, dtype=bool)
+        # children[2 * node + went_right] gives the next node in a single gather
+        self.children = np.column_stack([self.left, self.right]).ravel()
+        self.value = np.asarray(value, dtype=np.float64)
+        self.roots = np.asarray(roots, dtype=np.intp)
+        self.max_depth = int(max_depth)
+        self.classes_ = np.asarray(classes)
+        self.n_features_in_ = int(n_features)
+        self.small_batch_size = small_batch_size
+        self.chunk_size = chunk_size
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    def _leaves_small(self, X):
+        # Flattened (row, tree) paths; only paths still inside the tree are advanced each step
+        n_rows = X.shape[0]
+        node = np.tile(self.roots, n_rows)
+        row = np.repeat(np.arange(n_rows), self.n_trees)
+        active = np.flatnonzero(~self.is_leaf[node])
+
+        while active.size:
+            current = node[active]
+            go_right = ~(X[row[active], self.feature[current]] <= self.threshold[current])
+            node[active] = self.children[2 * current + go_right]
+            active = active[~self.is_leaf[node[active]]]
+
+        return node.reshape(n_rows, self.n_trees)
+
+    def _leaves_dense(self, X):
+        n_rows = X.shape[0]
+        node = np.broadcast_to(self.roots, (n_rows, self.n_trees)).copy()
+        rows = np.arange(n_rows)[:, None]
+
+        for _ in range(self.max_depth):
+            go_right = ~(X[rows, self.feature[node]] <= self.threshold[node])
+            node = self.children[2 * node + go_right]
+
+        return node
+
+    def predict_proba(self, X):
+        # sklearn trees compare float32 features against float64 thresholds
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(f"Expected input of shape (n, {self.n_features_in_}), got {X.shape}")
+
+        if X.shape[0] <= self.small_batch_size:
+            leaves = self._leaves_small(X)
+        else:
+            leaves = np.vstack(
+                [self._leaves_dense(X[start:start + self.chunk_size])
+                 for start in range(0, X.shape[0], self.chunk_size)]
+            )
+
+        # cumsum adds trees one by one in estimator order, like sklearn's accumulation
+        proba = np.cumsum(self.value[leaves], axis=1)[:, -1]
+        proba /= self.n_trees
+        return proba
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+    def save(self, path):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        np.savez(
+            path,
+            feature=self.feature,
+            threshold=self.threshold,
+            left=self.left,
+            right=self.right,
+            is_leaf=self.is_leaf,
+            value=self.value,
+            roots=self.roots,
+            max_depth=self.max_depth,
+            classes=self.classes_,
+            n_features=self.n_features_in_,
+        )
+        logger.success(f"Saved compiled forest to {path}")
+        return path
+
+    @staticmethod
+    def load(path):
+        with np.load(path, allow_pickle=False) as data:
+            return CompiledForest(**{key: data[key] for key in data.files})
+
+
+def compile_forest(model):
+    """Pack a fitted RandomForestClassifier / ExtraTreesClassifier into a CompiledForest."""
+    try:
+        estimators = getattr(model, "estimators_", None)
+        if not estimators or not all(isinstance(est, DecisionTreeClassifier) for est in estimators):
+            raise ValueError(f"Cannot compile model of type {type(model).__name__}")
+        if getattr(model, "n_outputs_", 1) != 1:
+            raise ValueError("Only single-output forests can be compiled")
+
+        logger.info(f"Compiling {len(estimators)} trees into flat node arrays")
+
+        n_classes = len(model.classes_)
+        features, thresholds, lefts, rights, leaves, values, roots = [], [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+
+        for est in estimators:
+            tree = est.tree_
+            n_nodes = tree.node_count
+            is_leaf = tree.children_left == -1
+            own = np.arange(offset, offset + n_nodes)
+
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(np.where(is_leaf, 0.0, tree.threshold))
+            lefts.append(np.where(is_leaf, own, tree.children_left + offset))
+            rights.append(np.where(is_leaf, own, tree.children_right + offset))
+            leaves.append(is_leaf)
+
+            # Same per-leaf normalisation as DecisionTreeClassifier.predict_proba
+            proba = tree.value[:, 0, :n_classes].astype(np.float64)
+            normalizer = proba.sum(axis=1)[:, np.newaxis]
+            normalizer[normalizer == 0.0] = 1.0
+            values.append(proba / normalizer)
+
+            roots.append(offset)
+            max_depth = max(max_depth, tree.max_depth)
+            offset += n_nodes
+
+        forest = CompiledForest(
+            feature=np.concatenate(features),
+            threshold=np.concatenate(thresholds),
+            left=np.concatenate(lefts),
+            right=np.concatenate(rights),
+            is_leaf=np.concatenate(leaves),
+            value=np.concatenate(values),
+            roots=roots,
+            max_depth=max_depth,
+            classes=model.classes_,
+            n_features=model.n_features_in_,
+        )
+        logger.success(f"Compiled forest: {forest.n_trees} trees, {offset} nodes, max depth {max_depth}")
+        return forest
+
+    except Exception as e:
+        logger.exception("Error while compiling forest")
+        raise CustomException(e, sys)
+
+
+if __name__ == "__main__":
+    config = load_config("config.yaml")
+    model_path = Path(config["training"]["model_output_path"])
+
+    model = joblib.load(model_path)
+    forest = compile_forest(model)
+    forest.save(model_path.with_name(f"{model_path.stem}_compiled.npz"))
@@ -2,6 +2,7 @@ from loguru import logger
 import os, yaml, sys
 import pandas as pd, numpy as np
 from utils.custom_exception import CustomException
+from utils.storage_utils import read_dataset, default_nbytes
 
 def load_config(file_path): # To load configuration in every file easily
     try:
@@ -18,10 +19,22 @@ def load_config(file_path): # To load configuration in every file easily
         raise CustomException("Failed to read YAMl file" , sys)
     
 
-def load_data(path): 
+def build_dtype_plan(config): # Column -> "category" / "numeric" from the data_processing column lists
+    proc_config = config["data_processing"]
+    plan = {col: "numeric" for col in proc_config.get("numerical_columns", [])}
+    plan.update({col: "category" for col in proc_config.get("categorical_columns", [])})
+    return plan
+
+
+def load_data(path, columns=None, dtype_plan=None, engine=None): # CSV, Parquet or Feather by extension; `columns` reads only those
     try:
-        logger.info("Loading data")
-        return pd.read_csv(path)
+        logger.info(f"Loading data from {path}")
+        df = read_dataset(path, columns=columns, dtype_plan=dtype_plan, engine=engine)
+        if dtype_plan:
+            compact = df.memory_usage(deep=True).sum()
+            saved = default_nbytes(df) - compact
+            logger.info(f"Loaded {df.shape} in {compact / 2**20:.2f} MB, ~{saved / 2**20:.2f} MB saved by the dtype plan")
+        return df
     except Exception as e:
         logger.error(f"Error loading the data {e}")
         raise CustomException("Failed to load data" , sys)
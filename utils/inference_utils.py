@@ -0,0 +1,129 @@
+import sys
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from utils.custom_exception import CustomException, InputValidationError
+
+
+# Fields accepted by the web form and the JSON batch API, with the type each one is parsed to
+BOOKING_FIELDS = {
+    "lead_time": int,
+    "no_of_special_requests": int,
+    "avg_price_per_room": float,
+    "arrival_month": int,
+    "arrival_date": int,
+    "market_segment_type": str,
+    "no_of_week_nights": int,
+    "no_of_weekend_nights": int,
+    "type_of_meal_plan": str,
+    "room_type_reserved": str,
+}
+
+# Known-good booking used to smoke-test a freshly loaded model before it serves traffic
+SMOKE_BOOKING = {
+    "lead_time": 30,
+    "no_of_special_requests": 1,
+    "avg_price_per_room": 100.0,
+    "arrival_month": 6,
+    "arrival_date": 15,
+    "market_segment_type": "Online",
+    "no_of_week_nights": 2,
+    "no_of_weekend_nights": 1,
+    "type_of_meal_plan": "Meal Plan 1",
+    "room_type_reserved": "Room_Type 1",
+}
+
+
+def parse_booking_form(form):
+    """Cast the HTML form fields to their types; raises KeyError / ValueError like the form route expects.
+
+    Strings are stripped here, as in `records_to_frame`, so the cached key and the scored record are the same values.
+    """
+    return {
+        col: dtype(form[col]).strip() if dtype is str else dtype(form[col])
+        for col, dtype in BOOKING_FIELDS.items()
+    }
+
+
+def _validate_numeric(column, values, dtype, errors):
+    parsed = pd.to_numeric(values, errors="coerce")
+    invalid = parsed.isna() | ~np.isfinite(parsed.to_numpy(dtype=float, na_value=np.nan))
+
+    if dtype is int:
+        integral = parsed.fillna(0) % 1 == 0
+        invalid |= ~integral
+
+    if invalid.any():
+        rows = invalid[invalid].index.tolist()
+        errors[column] = f"expected {dtype.__name__} values, invalid at rows {rows[:10]}"
+        return None
+
+    return parsed.astype("int64" if dtype is int else "float64")
+
+
+def _validate_categorical(column, values, errors):
+    stripped = values.astype(str).str.strip()
+    missing = values.isna() | (stripped == "")
+    if missing.any():
+        rows = missing[missing].index.tolist()
+        errors[column] = f"expected non-empty strings, missing at rows {rows[:10]}"
+        return None
+
+    # "Online " and "Online" are the same category to the model and to the prediction cache
+    return stripped
+
+
+def records_to_frame(records, fill_cols, max_batch_size=None):
+    """Validate a list of booking dicts column by column and build the model input frame.
+
+    Columns in `fill_cols` that the bookings do not carry are added as zeros.
+    """
+    try:
+        if not isinstance(records, list) or len(records) == 0:
+            raise InputValidationError({"reservations": "expected a non-empty list of bookings"})
+
+        if max_batch_size is not None and len(records) > max_batch_size:
+            raise InputValidationError(
+                {"reservations": f"batch of {len(records)} exceeds the limit of {max_batch_size}"}
+            )
+
+        if not all(isinstance(record, dict) for record in records):
+            raise InputValidationError({"reservations": "every booking must be a JSON object"})
+
+        raw = pd.DataFrame.from_records(records)
+        errors = {}
+
+        missing_cols = [col for col in BOOKING_FIELDS if col not in raw.columns]
+        for col in missing_cols:
+            errors[col] = "missing from every booking"
+
+        features = {}
+        for col, dtype in BOOKING_FIELDS.items():
+            if col in missing_cols:
+                continue
+            if dtype is str:
+                values = _validate_categorical(col, raw[col], errors)
+            else:
+                values = _validate_numeric(col, raw[col], dtype, errors)
+            if values is not None:
+                features[col] = values
+
+        if errors:
+            raise InputValidationError(errors)
+
+        features = pd.DataFrame(features)
+
+        # Ensure the numeric columns still needed by the preprocessor exist
+        for col in fill_cols:
+            if col not in features.columns:
+                features[col] = 0
+
+        logger.debug(f"Validated batch of {len(features)} bookings")
+        return features
+
+    except InputValidationError:
+        raise
+    except Exception as e:
+        logger.exception("Error while validating booking batch")
+        raise CustomException(e, sys)
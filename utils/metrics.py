@@ -0,0 +1,228 @@
+import functools
+import threading
+import numpy as np
+from time import perf_counter_ns
+from loguru import logger
+
+
+# Upper bounds in seconds; the inference stages of a single booking sit in the 10µs-10ms range
+LATENCY_BUCKETS = (
+    0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 10.0,
+)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 10000)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+
+class Counter:
+    def __init__(self, registry, labels):
+        self._registry = registry
+        self.labels = labels
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        if not self._registry.enabled:
+            return
+        with self._lock:
+            self.value += amount
+
+    def samples(self, name):
+        yield f"{name}{_format_labels(self.labels)} {self.value}"
+
+
+class Histogram:
+    """Fixed-bucket histogram with a lock-free hot path.
+
+    Observing only appends the raw value to a list (atomic under the GIL);
+    values are bucketed in bulk with numpy once `flush_every` are pending or
+    when the registry is scraped.
+    """
+
+    def __init__(self, registry, labels, buckets, scale=1, flush_every=4096):
+        self._registry = registry
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        # Bounds pre-multiplied by `scale` so nanosecond timings are bucketed as recorded
+        self._bounds = np.asarray(self.buckets, dtype=float) * scale
+        self._scale = scale
+        self._flush_every = flush_every
+        self.counts = np.zeros(len(self.buckets) + 1, dtype=np.int64)
+        self.total = 0
+        self.count = 0
+
+        self._pending = []
+        # List swapped out by the last flush; appends that raced with the swap are picked up next time
+        self._retired = []
+        self._retired_seen = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        """Record `value` in the histogram's unit (seconds for timers)."""
+        self.observe_raw(value * self._scale)
+
+    def observe_raw(self, value):
+        if not self._registry.enabled:
+            return
+        pending = self._pending
+        pending.append(value)
+        if len(pending) >= self._flush_every:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            late = self._retired[self._retired_seen:]
+            current = self._pending
+            self._pending = []
+            n_current = len(current)
+            self._retired, self._retired_seen = current, n_current
+
+            values = np.asarray(late + current[:n_current], dtype=float)
+            if values.size == 0:
+                return
+            self.counts += np.bincount(np.searchsorted(self._bounds, values, side="left"), minlength=len(self.counts))
+            self.total += values.sum()
+            self.count += values.size
+
+    def time(self):
+        return _Timer(self)
+
+    def samples(self, name):
+        self.flush()
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += int(count)
+            yield f"{name}_bucket{_format_labels(self.labels + (('le', repr(float(bound))),))} {cumulative}"
+        yield f"{name}_bucket{_format_labels(self.labels + (('le', '+Inf'),))} {self.count}"
+        yield f"{name}_sum{_format_labels(self.labels)} {self.total / self._scale}"
+        yield f"{name}_count{_format_labels(self.labels)} {self.count}"
+
+
+class _Timer:
+    __slots__ = ("histogram", "start")
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe_raw(perf_counter_ns() - self.start)
+        return False
+
+
+class MetricsRegistry:
+    """Counters and histograms keyed by name and labels, rendered in the Prometheus text format."""
+
+    def __init__(self):
+        self.enabled = True
+        self._families = {}
+        self._callbacks = {}
+        self._lock = threading.Lock()
+
+    def _get(self, kind, name, help_text, labels, factory):
+        labels = tuple(sorted((labels or {}).items()))
+        with self._lock:
+            family = self._families.setdefault(name, {"kind": kind, "help": help_text, "children": {}})
+            if family["kind"] != kind:
+                raise ValueError(f"Metric {name} already registered as a {family['kind']}")
+            child = family["children"].get(labels)
+            if child is None:
+                child = family["children"][labels] = factory(labels)
+            return child
+
+    def counter(self, name, help_text, labels=None):
+        return self._get("counter", name, help_text, labels, lambda lbl: Counter(self, lbl))
+
+    def histogram(self, name, help_text, buckets, labels=None):
+        return self._get("histogram", name, help_text, labels, lambda lbl: Histogram(self, lbl, buckets))
+
+    def timer(self, name, help_text, labels=None, buckets=LATENCY_BUCKETS):
+        """Histogram of durations in seconds, fed with nanosecond clock deltas.
+
+        Hot paths call `observe_raw(perf_counter_ns() - start)` directly; `with timer.time():`
+        is the convenient form where an extra few hundred nanoseconds do not matter.
+        """
+        return self._get(
+            "histogram", name, help_text, labels, lambda lbl: Histogram(self, lbl, buckets, scale=1_000_000_000)
+        )
+
+    def callback(self, name, help_text, fn, kind="gauge"):
+        """Metric read at scrape time, for values another component already tracks."""
+        self._callbacks[name] = (kind, help_text, fn)
+
+    def render(self):
+        lines = []
+        with self._lock:
+            families = [(name, dict(family), list(family["children"].values())) for name, family in self._families.items()]
+
+        for name, family, children in families:
+            lines.append(f"# HELP {name} {family['help']}")
+            lines.append(f"# TYPE {name} {family['kind']}")
+            for child in children:
+                lines.extend(child.samples(name))
+
+        for name, (kind, help_text, fn) in list(self._callbacks.items()):
+            try:
+                value = fn()
+            except Exception:
+                logger.exception(f"Error reading gauge {name}")
+                continue
+            if value is None:
+                continue
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.append(f"{name} {value}")
+
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def configure_metrics(config):
+    REGISTRY.enabled = config.get("metrics", {}).get("enabled", True)
+    logger.info(f"Metrics collection {'enabled' if REGISTRY.enabled else 'disabled'}")
+
+
+def stage_timer(stage):
+    return REGISTRY.timer(
+        "hotel_inference_stage_duration_seconds", "Time spent in each inference stage", {"stage": stage}
+    )
+
+
+def request_timer(route):
+    return REGISTRY.timer("hotel_http_request_duration_seconds", "End-to-end request latency", {"route": route})
+
+
+def count_request(route, status):
+    REGISTRY.counter("hotel_http_requests_total", "Requests served", {"route": route, "status": str(status)}).inc()
+
+
+def instrumented(method):
+    """Time a transformer's fit / transform into hotel_transformer_duration_seconds."""
+    timers = {}
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        cls_name = type(self).__name__
+        timer = timers.get(cls_name)
+        if timer is None:
+            timer = timers[cls_name] = REGISTRY.timer(
+                "hotel_transformer_duration_seconds",
+                "Time spent in the custom preprocessing transformers",
+                {"transformer": cls_name, "method": method.__name__},
+            )
+        with timer.time():
+            return method(self, *args, **kwargs)
+
+    return wrapper
@@ -0,0 +1,113 @@
+from sklearn.ensemble import RandomForestClassifier, HistGradientBoostingClassifier
+
+
+class RandomForestBackend:
+    """The original model: a bagged forest of deep trees."""
+
+    name = "random_forest"
+    budget_param = "n_estimators"  # Scaled down on the cheap rungs of a multi-fidelity search
+
+    def suggest(self, trial):
+        return {
+            "n_estimators": trial.suggest_int("n_estimators", 100, 500),
+            "max_depth": trial.suggest_int("max_depth", 10, 50),
+            "min_samples_split": trial.suggest_int("min_samples_split", 2, 10),
+            "min_samples_leaf": trial.suggest_int("min_samples_leaf", 1, 5),
+            "bootstrap": trial.suggest_categorical(
+                "bootstrap", [True, False]
+            ),
+        }
+
+    def build(self, params, n_jobs=1):
+        return RandomForestClassifier(**params, random_state=42, n_jobs=n_jobs)
+
+    def for_serving(self, model):
+        # Scoring is one booking or a small batch; a thread pool per call costs more than it saves
+        return model.set_params(n_jobs=None)
+
+
+class LightGBMBackend:
+    """LightGBM's histogram-based, leaf-wise boosted trees."""
+
+    name = "lightgbm"
+    budget_param = "n_estimators"
+
+    def suggest(self, trial):
+        return {
+            "n_estimators": trial.suggest_int("n_estimators", 100, 1000),
+            "learning_rate": trial.suggest_float("learning_rate", 0.01, 0.3, log=True),
+            "num_leaves": trial.suggest_int("num_leaves", 15, 255, log=True),
+            "min_child_samples": trial.suggest_int("min_child_samples", 5, 100),
+            "subsample": trial.suggest_float("subsample", 0.5, 1.0),
+            "colsample_bytree": trial.suggest_float("colsample_bytree", 0.5, 1.0),
+            "reg_lambda": trial.suggest_float("reg_lambda", 1e-3, 10.0, log=True),
+        }
+
+    def build(self, params, n_jobs=1):
+        from lightgbm import LGBMClassifier
+
+        return LGBMClassifier(**params, subsample_freq=1, random_state=42, n_jobs=n_jobs, verbose=-1)
+
+    def for_serving(self, model):
+        return model.set_params(n_jobs=1)
+
+
+class XGBoostBackend:
+    """XGBoost with the histogram tree method."""
+
+    name = "xgboost"
+    budget_param = "n_estimators"
+
+    def suggest(self, trial):
+        return {
+            "n_estimators": trial.suggest_int("n_estimators", 100, 1000),
+            "learning_rate": trial.suggest_float("learning_rate", 0.01, 0.3, log=True),
+            "max_depth": trial.suggest_int("max_depth", 3, 12),
+            "min_child_weight": trial.suggest_float("min_child_weight", 1.0, 20.0, log=True),
+            "subsample": trial.suggest_float("subsample", 0.5, 1.0),
+            "colsample_bytree": trial.suggest_float("colsample_bytree", 0.5, 1.0),
+            "reg_lambda": trial.suggest_float("reg_lambda", 1e-3, 10.0, log=True),
+        }
+
+    def build(self, params, n_jobs=1):
+        from xgboost import XGBClassifier
+
+        return XGBClassifier(**params, tree_method="hist", random_state=42, n_jobs=n_jobs)
+
+    def for_serving(self, model):
+        return model.set_params(n_jobs=1)
+
+
+class HistGradientBoostingBackend:
+    """scikit-learn's HistGradientBoostingClassifier; its OpenMP threads are capped by the caller."""
+
+    name = "hist_gradient_boosting"
+    budget_param = "max_iter"
+
+    def suggest(self, trial):
+        return {
+            "max_iter": trial.suggest_int("max_iter", 100, 1000),
+            "learning_rate": trial.suggest_float("learning_rate", 0.01, 0.3, log=True),
+            "max_leaf_nodes": trial.suggest_int("max_leaf_nodes", 15, 255, log=True),
+            "min_samples_leaf": trial.suggest_int("min_samples_leaf", 5, 100),
+            "l2_regularization": trial.suggest_float("l2_regularization", 1e-3, 10.0, log=True),
+        }
+
+    def build(self, params, n_jobs=1):
+        # No internal validation split, so every budget trains on exactly the rows it is given
+        return HistGradientBoostingClassifier(**params, early_stopping=False, random_state=42)
+
+    def for_serving(self, model):
+        return model
+
+
+BACKENDS = {
+    backend.name: backend
+    for backend in (RandomForestBackend(), LightGBMBackend(), XGBoostBackend(), HistGradientBoostingBackend())
+}
+
+
+def get_backend(name):
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown model backend: {name} (expected one of {', '.join(BACKENDS)})")
+    return BACKENDS[name]
@@ -0,0 +1,68 @@
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+import numpy as np
+from loguru import logger
+
+from utils.custom_exception import CustomException
+
+
+# Set once per worker by the pool initializer, so the fitted preprocessor is pickled once per process, not per chunk
+_worker_state = {}
+
+
+def _init_worker(preprocessor, out_path):
+    _worker_state["preprocessor"] = preprocessor
+    _worker_state["out"] = np.lib.format.open_memmap(out_path, mode="r+")
+
+
+def _transform_chunk(frame, start):
+    # Written straight into the shared output file; only the row count travels back to the parent
+    out = _worker_state["out"]
+    out[start:start + len(frame)] = _worker_state["preprocessor"].transform(frame)
+    return len(frame)
+
+
+def transform_to_memmap(preprocessor, X, out_path, chunk_rows=100_000, max_workers=None):
+    """Transform `X` in row chunks across a process pool into a memory-mapped .npy file at `out_path`.
+
+    Each worker writes its chunk's rows at their offset in the file, so no
+    transformed block is pickled back and the parent never holds the output
+    in memory. Chunks in flight are bounded like the synthetic data writer's.
+    Returns the output opened read-only as a memmap.
+    """
+    try:
+        max_workers = max_workers or os.cpu_count()
+        # One row fixes the output width and dtype the workers fill in
+        probe = np.asarray(preprocessor.transform(X.iloc[:1]))
+        os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+        out = np.lib.format.open_memmap(out_path, mode="w+", dtype=probe.dtype, shape=(len(X), probe.shape[1]))
+        del out
+
+        n_chunks = -(-len(X) // chunk_rows)
+        logger.info(
+            f"Transforming {len(X):,} rows in {n_chunks} chunks of {chunk_rows:,} with {max_workers} workers -> {out_path}"
+        )
+
+        written = 0
+        with ProcessPoolExecutor(
+            max_workers=max_workers, initializer=_init_worker, initargs=(preprocessor, out_path)
+        ) as pool:
+            pending = set()
+            for start in range(0, len(X), chunk_rows):
+                pending.add(pool.submit(_transform_chunk, X.iloc[start:start + chunk_rows], start))
+
+                # Bound the number of input chunks queued for the workers
+                if len(pending) >= max_workers * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    written += sum(future.result() for future in done)
+
+            written += sum(future.result() for future in pending)
+
+        logger.success(f"Transformed {written:,} rows into {out_path}")
+        return np.load(out_path, mmap_mode="r")
+
+    except Exception as e:
+        logger.exception("Error during parallel transform")
+        raise CustomException(e, sys)
@@ -0,0 +1,224 @@
+import sys
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from loguru import logger
+
+from utils.custom_exception import CustomException
+from utils.inference_utils import BOOKING_FIELDS
+
+
+def booking_key(record):
+    """Feature tuple for a booking: fields in BOOKING_FIELDS order, cast to their types.
+
+    Built from the exact values that get scored; string normalization happens
+    once, upstream in records_to_frame / parse_booking_form.
+    """
+    return tuple(dtype(record[col]) for col, dtype in BOOKING_FIELDS.items())
+
+
+class LocalSharedBackend:
+    """In-memory stand-in for the shared backend, with the same get_many / set_many API as RedisBackend."""
+
+    def __init__(self):
+        self._store = {}
+        self._lock = threading.Lock()
+
+    def get_many(self, keys):
+        now = time.time()
+        with self._lock:
+            values = []
+            for key in keys:
+                entry = self._store.get(key)
+                if entry is not None and entry[1] <= now:
+                    del self._store[key]
+                    entry = None
+                values.append(entry[0] if entry is not None else None)
+            return values
+
+    def set_many(self, items, ttl_s):
+        expires_at = time.time() + ttl_s
+        with self._lock:
+            for key, value in items:
+                self._store[key] = (value, expires_at)
+
+
+class RedisBackend:
+    """Shared cache across workers and hosts; entries expire server-side after the TTL."""
+
+    def __init__(self, url):
+        try:
+            import redis
+        except ImportError as e:
+            raise ImportError(
+                'serving.prediction_cache.shared_backend is "redis" but the redis package is not installed; '
+                'run `pip install redis` or use shared_backend "local" / null'
+            ) from e
+
+        self.client = redis.Redis.from_url(url)
+
+    def get_many(self, keys):
+        if not keys:
+            return []
+        return [json.loads(raw) if raw is not None else None for raw in self.client.mget(keys)]
+
+    def set_many(self, items, ttl_s):
+        pipe = self.client.pipeline(transaction=False)
+        for key, value in items:
+            pipe.set(key, json.dumps(value), ex=int(ttl_s))
+        pipe.execute()
+
+
+class PredictionCache:
+    """LRU + TTL cache of (prediction, probability) per normalized booking.
+
+    Entries are scoped to the served bundle version: `set_version` drops every
+    local entry, lookups for any other version always miss, and shared-backend
+    keys embed the version, so a model or processor reload never serves stale scores.
+    """
+
+    def __init__(self, max_entries=100000, ttl_s=3600, shared_backend=None, key_prefix="hotel-pred"):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.shared_backend = shared_backend
+        self.key_prefix = key_prefix
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._version = None
+
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @classmethod
+    def from_config(cls, config):
+        cache_config = config.get("serving", {}).get("prediction_cache", {})
+        if not cache_config.get("enabled", False):
+            return None
+
+        backend_name = cache_config.get("shared_backend")
+        if backend_name == "redis":
+            shared_backend = RedisBackend(cache_config["redis_url"])
+        elif backend_name == "local":
+            shared_backend = LocalSharedBackend()
+        elif backend_name is None:
+            shared_backend = None
+        else:
+            raise ValueError(f"Unknown prediction cache backend: {backend_name}")
+
+        logger.info(
+            f"Prediction cache: {cache_config.get('max_entries', 100000)} entries, "
+            f"TTL {cache_config.get('ttl_s', 3600)}s, shared backend {backend_name}"
+        )
+        return cls(
+            max_entries=cache_config.get("max_entries", 100000),
+            ttl_s=cache_config.get("ttl_s", 3600),
+            shared_backend=shared_backend,
+        )
+
+    def _shared_key(self, version, key):
+        digest = hashlib.sha1(repr(key).encode()).hexdigest()
+        return f"{self.key_prefix}:{version}:{digest}"
+
+    def set_version(self, version):
+        """Scope the cache to a newly served bundle version, dropping every local entry."""
+        with self._lock:
+            if version == self._version:
+                return
+            if self._entries:
+                logger.info(f"Model version changed to {version}, dropping {len(self._entries)} cached predictions")
+                self.invalidations += 1
+            self._entries.clear()
+            self._version = version
+
+    def get_many(self, version, keys):
+        """Cached (prediction, probability) for each key, or None where it has to be scored."""
+        try:
+            now = time.time()
+            results = [None] * len(keys)
+            missing = []
+
+            with self._lock:
+                if version != self._version:
+                    # Request pinned to a bundle that is no longer served: score it, don't cache it
+                    self.misses += len(keys)
+                    return results
+                for i, key in enumerate(keys):
+                    entry = self._entries.get(key)
+                    if entry is not None and entry[1] <= now:
+                        del self._entries[key]
+                        self.expirations += 1
+                        entry = None
+                    if entry is None:
+                        missing.append(i)
+                        continue
+                    self._entries.move_to_end(key)
+                    results[i] = entry[0]
+                    self.hits += 1
+
+            if missing and self.shared_backend is not None:
+                shared = self.shared_backend.get_many([self._shared_key(version, keys[i]) for i in missing])
+                found = [(i, tuple(value)) for i, value in zip(missing, shared) if value is not None]
+                if found:
+                    self._put_local(version, [(keys[i], value) for i, value in found])
+                    for i, value in found:
+                        results[i] = value
+                    found_idx = {i for i, _ in found}
+                    missing = [i for i in missing if i not in found_idx]
+                    with self._lock:
+                        self.shared_hits += len(found)
+
+            with self._lock:
+                self.misses += len(missing)
+            return results
+
+        except Exception as e:
+            logger.exception("Error while reading the prediction cache")
+            raise CustomException(e, sys)
+
+    def _put_local(self, version, items):
+        expires_at = time.time() + self.ttl_s
+        with self._lock:
+            if version != self._version:
+                # A different bundle took over while this batch was scored
+                return
+            for key, value in items:
+                self._entries[key] = (value, expires_at)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def put_many(self, version, items):
+        """Store (key, (prediction, probability)) pairs scored by the bundle with this version."""
+        try:
+            self._put_local(version, items)
+            if self.shared_backend is not None:
+                self.shared_backend.set_many(
+                    [(self._shared_key(version, key), list(value)) for key, value in items], self.ttl_s
+                )
+        except Exception as e:
+            logger.exception("Error while writing the prediction cache")
+            raise CustomException(e, sys)
+
+    def stats(self):
+        lookups = self.hits + self.shared_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_s": self.ttl_s,
+            "hits": self.hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.hits + self.shared_hits) / lookups, 4) if lookups else None,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+            "version": self._version,
+        }
@@ -1,11 +1,47 @@
 from sklearn.base import BaseEstimator, TransformerMixin
-from sklearn.preprocessing import PowerTransformer
+from sklearn.preprocessing import PowerTransformer, StandardScaler
+from scipy import stats
 import pandas as pd
 import numpy as np
 import sys
 from loguru import logger
 
 from utils.custom_exception import CustomException
+from utils.metrics import instrumented
+
+
+def _factorize(values):
+    """Integer codes (-1 for missing) and the distinct values they index.
+
+    Categoricals already carry their codes; anything else is hashed once.
+    """
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return values.cat.codes.to_numpy(), values.cat.categories
+    codes, uniques = pd.factorize(values)
+    return codes, pd.Index(uniques)
+
+
+def _merge_counts(totals, counts):
+    """Add one chunk's value counts to the running totals, most frequent first.
+
+    Counts are re-keyed by plain values, so chunks whose categoricals carry
+    different categories still line up.
+    """
+    counts = pd.Series(counts.to_numpy(dtype="int64"), index=pd.Index(counts.index.to_numpy(dtype=object)))
+    if totals is not None:
+        counts = totals.add(counts, fill_value=0).astype("int64")
+    return counts.sort_values(ascending=False, kind="stable")
+
+
+def _skew_from_moments(n, m2, m3):
+    # Same estimator and floating-point guards as pandas' Series.skew
+    if n < 3:
+        return np.nan
+    m2 = 0.0 if abs(m2) < 1e-14 else m2
+    m3 = 0.0 if abs(m3) < 1e-14 else m3
+    if m2 == 0:
+        return 0.0
+    return float(n * (n - 1) ** 0.5 / (n - 2) * (m3 / m2 ** 1.5))
 
 
 class RareCategoryGrouper(BaseEstimator, TransformerMixin):
@@ -13,6 +49,7 @@ class RareCategoryGrouper(BaseEstimator, TransformerMixin):
         self.threshold = threshold
         self.category_mappings_ = {}
     
+    @instrumented
     def fit(self, X, y=None):
         try:
             logger.info(f"Fitting RareCategoryGrouper with threshold={self.threshold}")
@@ -27,17 +64,48 @@ class RareCategoryGrouper(BaseEstimator, TransformerMixin):
             logger.exception("Error in RareCategoryGrouper.fit")
             raise CustomException(e, sys)
 
+    @instrumented
+    def partial_fit(self, X, y=None):
+        """Fit one chunk at a time: counts are summed across calls, so the rare sets match a full fit exactly."""
+        try:
+            totals = getattr(self, "category_counts_", None) or {}
+            for col in X.columns:
+                totals[col] = _merge_counts(totals.get(col), X[col].value_counts())
+                counts = totals[col]
+                self.category_mappings_[col] = counts[counts < self.threshold].index.tolist()
+            self.category_counts_ = totals
+            logger.opt(lazy=True).debug(
+                "RareCategoryGrouper.partial_fit: rare categories {}", lambda: self.category_mappings_
+            )
+            return self
+
+        except Exception as e:
+            logger.exception("Error in RareCategoryGrouper.partial_fit")
+            raise CustomException(e, sys)
+
+    @instrumented
     def transform(self, X):
         try:
-            logger.info("Transforming data with RareCategoryGrouper")
-            X_copy = X.copy()
+            logger.opt(lazy=True).debug(
+                "RareCategoryGrouper: grouping {} into 'Other_<col>'",
+                lambda: {col: len(rare_cats) for col, rare_cats in self.category_mappings_.items()},
+            )
+            X_out = X.copy(deep=False)
             for col, rare_cats in self.category_mappings_.items():
-                X_copy[col] = X_copy[col].where(
-                    ~X_copy[col].isin(rare_cats),
-                    f'Other_{col}'
+                values = X[col]
+                if not isinstance(values.dtype, pd.CategoricalDtype):
+                    # Strings: isin / where already run as single hash-table passes, cheaper than factorizing
+                    X_out[col] = values.where(~values.isin(rare_cats), f'Other_{col}')
+                    continue
+
+                # Categoricals: map each category once, then a single take over the codes;
+                # code -1 (missing) picks the trailing NaN. The result is object, as 'Other_' is not a category.
+                codes, categories = _factorize(values)
+                lookup = np.append(
+                    np.where(categories.isin(rare_cats), f'Other_{col}', categories.to_numpy(dtype=object)), np.nan
                 )
-                logger.debug(f"{col}: replaced {len(rare_cats)} rare categories with 'Other_{col}'")
-            return X_copy
+                X_out[col] = pd.Series(lookup[codes], index=X.index, dtype=object)
+            return X_out
         
         except Exception as e:
             logger.exception("Error in RareCategoryGrouper.transform")
@@ -51,6 +119,7 @@ class TopNEncoder(BaseEstimator, TransformerMixin):
         self.top_categories_ = None
         self.feature_names_ = None
     
+    @instrumented
     def fit(self, X, y=None):
         try:
             logger.info(f"Fitting TopNEncoder with top {self.n} categories")
@@ -58,29 +127,52 @@ class TopNEncoder(BaseEstimator, TransformerMixin):
                 X = X.iloc[:, 0]
             
             self.top_categories_ = X.value_counts().head(self.n).index.tolist()
-            self.feature_names_ = [
-                f"{self.prefix}_{cat.replace(' ', '_').lower()}"
-                for cat in self.top_categories_
-            ]
+            self.feature_names_ = self._feature_names()
             logger.debug(f"Top categories: {self.top_categories_}")
             return self
         
         except Exception as e:
             logger.exception("Error in TopNEncoder.fit")
             raise CustomException(e, sys)
+
+    @instrumented
+    def partial_fit(self, X, y=None):
+        """Fit one chunk at a time from summed counts. Categories tied on count may rank differently than in fit()."""
+        try:
+            if isinstance(X, pd.DataFrame):
+                X = X.iloc[:, 0]
+
+            self.category_counts_ = _merge_counts(getattr(self, "category_counts_", None), X.value_counts())
+            self.top_categories_ = self.category_counts_.head(self.n).index.tolist()
+            self.feature_names_ = self._feature_names()
+            logger.opt(lazy=True).debug("TopNEncoder.partial_fit: top categories {}", lambda: self.top_categories_)
+            return self
+
+        except Exception as e:
+            logger.exception("Error in TopNEncoder.partial_fit")
+            raise CustomException(e, sys)
+
+    def _feature_names(self):
+        return [
+            f"{self.prefix}_{cat.replace(' ', '_').lower()}"
+            for cat in self.top_categories_
+        ]
     
+    @instrumented
     def transform(self, X):
         try:
-            logger.info("Transforming data with TopNEncoder")
+            logger.opt(lazy=True).debug("TopNEncoder: encoding {}", lambda: dict(zip(self.top_categories_, self.feature_names_)))
             if isinstance(X, pd.DataFrame):
                 X = X.iloc[:, 0]
-            
-            result = pd.DataFrame(index=X.index)
-            for cat, feat_name in zip(self.top_categories_, self.feature_names_):
-                result[feat_name] = (X == cat).astype(int)
-                logger.debug(f"Encoded category '{cat}' into column '{feat_name}'")
-            
-            return result
+
+            # One broadcast comparison of the codes against the top categories' codes. Categories absent
+            # from X get -2, so they match neither a value nor a missing (-1) code. The (top_n, rows)
+            # result transposed is already the column block pandas stores, so nothing is copied.
+            codes, uniques = _factorize(X)
+            top_codes = uniques.get_indexer(self.top_categories_)
+            top_codes[top_codes < 0] = -2
+            encoded = np.equal.outer(top_codes.astype(codes.dtype), codes).astype(int)
+            return pd.DataFrame(encoded.T, index=X.index, columns=self.feature_names_, copy=False)
         
         except Exception as e:
             logger.exception("Error in TopNEncoder.transform")
@@ -88,12 +180,39 @@ class TopNEncoder(BaseEstimator, TransformerMixin):
 
 
 class SkewHandler(BaseEstimator, TransformerMixin):
-    def __init__(self, skew_threshold=1.0):
+    def __init__(self, skew_threshold=1.0, reservoir_size=100_000, random_state=42):
         self.skew_threshold = skew_threshold
+        self.reservoir_size = reservoir_size  # Rows partial_fit keeps to estimate Yeo-Johnson lambdas
+        self.random_state = random_state
         self.skewness_ = {}
         self.transform_method_ = {}  # Track which transform per column
         self.power_transformers_ = {}  # Store fitted PowerTransformers
+        self.yeo_johnson_params_ = {}  # (lambda, mean, scale) per Yeo-Johnson column, applied by transform
+
+    def __setstate__(self, state):
+        # Processors pickled before partial_fit existed (such as the proc_01.pkl already in S3) lack its parameters
+        state.setdefault("reservoir_size", 100_000)
+        state.setdefault("random_state", 42)
+        super().__setstate__(state)
+
+    def _fit_yeo_johnson(self, col, values):
+        # The lambda comes from PowerTransformer. Its standardisation is refitted as a public StandardScaler on
+        # the same Yeo-Johnson output, so transform and the feature plan never read PowerTransformer internals
+        values = np.asarray(values, dtype="float64")
+        pt = PowerTransformer(method='yeo-johnson').fit(pd.DataFrame({col: values}))
+        lmbda = float(pt.lambdas_[0])
+        scaler = StandardScaler().fit(stats.yeojohnson(values, lmbda).reshape(-1, 1))
+        self.power_transformers_[col] = pt
+        self.yeo_johnson_params_[col] = (lmbda, float(scaler.mean_[0]), float(scaler.scale_[0]))
+
+    def _method_for(self, col_skew):
+        if col_skew > self.skew_threshold:
+            return 'log'
+        if col_skew < -self.skew_threshold:
+            return 'yeo-johnson'
+        return 'none'
     
+    @instrumented
     def fit(self, X, y=None):
         try:
             logger.info(f"Fitting SkewHandler with skew_threshold={self.skew_threshold}")
@@ -103,15 +222,9 @@ class SkewHandler(BaseEstimator, TransformerMixin):
                 col_skew = X_copy[col].skew()
                 self.skewness_[col] = col_skew
                 
-                if col_skew > self.skew_threshold:
-                    self.transform_method_[col] = 'log'
-                elif col_skew < -self.skew_threshold:
-                    self.transform_method_[col] = 'yeo-johnson'
-                    pt = PowerTransformer(method='yeo-johnson')
-                    pt.fit(X_copy[[col]])
-                    self.power_transformers_[col] = pt
-                else:
-                    self.transform_method_[col] = 'none'
+                self.transform_method_[col] = self._method_for(col_skew)
+                if self.transform_method_[col] == 'yeo-johnson':
+                    self._fit_yeo_johnson(col, X_copy[col])
                 
                 logger.debug(f"{col}: skew={col_skew:.3f}, method={self.transform_method_[col]}")
             
@@ -120,22 +233,122 @@ class SkewHandler(BaseEstimator, TransformerMixin):
         except Exception as e:
             logger.exception("Error in SkewHandler.fit")
             raise CustomException(e, sys)
+
+    @instrumented
+    def partial_fit(self, X, y=None):
+        """Fit one chunk at a time.
+
+        Skewness comes from count / mean / second / third central moments merged
+        across chunks (exact up to float rounding). Yeo-Johnson lambdas are fitted
+        on a uniform reservoir of `reservoir_size` rows, which is the full data,
+        and so matches fit(), until more rows than that have been seen.
+        """
+        try:
+            if not hasattr(self, "moments_"):
+                self.moments_ = {}
+                self.reservoir_ = {}
+                self.rows_seen_ = 0
+                self.rng_ = np.random.default_rng(self.random_state)
+
+            values = X.to_numpy(dtype="float64")
+            for j, col in enumerate(X.columns):
+                x = values[:, j]
+                x = x[~np.isnan(x)]
+                if len(x):
+                    d = x - x.mean()
+                    chunk = (len(x), x.mean(), np.dot(d, d), np.dot(d * d, d))
+                    self.moments_[col] = self._merge_moments(self.moments_.get(col), chunk)
+
+            self._update_reservoir(X)
+
+            for col in X.columns:
+                n, _, m2, m3 = self.moments_.get(col, (0, 0.0, 0.0, 0.0))
+                col_skew = _skew_from_moments(n, m2, m3)
+                self.skewness_[col] = col_skew
+                self.transform_method_[col] = self._method_for(col_skew)
+                if self.transform_method_[col] == 'yeo-johnson':
+                    self._fit_yeo_johnson(col, self.reservoir_[col])
+                else:
+                    self.power_transformers_.pop(col, None)
+                    self.yeo_johnson_params_.pop(col, None)
+
+            logger.opt(lazy=True).debug(
+                "SkewHandler.partial_fit: {} rows seen, methods {}", lambda: self.rows_seen_, lambda: self.transform_method_
+            )
+            return self
+
+        except Exception as e:
+            logger.exception("Error in SkewHandler.partial_fit")
+            raise CustomException(e, sys)
+
+    @staticmethod
+    def _merge_moments(a, b):
+        # Pairwise update of (n, mean, M2, M3) (Chan et al. / Pébay)
+        if a is None:
+            return b
+        na, mean_a, m2a, m3a = a
+        nb, mean_b, m2b, m3b = b
+        n = na + nb
+        delta = mean_b - mean_a
+        mean = mean_a + delta * nb / n
+        m2 = m2a + m2b + delta ** 2 * na * nb / n
+        m3 = m3a + m3b + delta ** 3 * na * nb * (na - nb) / n ** 2 + 3 * delta * (na * m2b - nb * m2a) / n
+        return n, mean, m2, m3
+
+    def _update_reservoir(self, X):
+        # Algorithm R over whole rows, vectorised per chunk: the first reservoir_size rows fill it in order,
+        # row t after that replaces a random slot with probability reservoir_size / (t + 1)
+        seen, m, k = self.rows_seen_, len(X), self.reservoir_size
+        fill = max(0, min(k - seen, m))
+        slots = np.empty(m, dtype=np.int64)
+        slots[:fill] = seen + np.arange(fill)
+        slots[fill:] = self.rng_.integers(0, seen + np.arange(fill, m) + 1)
+        rows = np.flatnonzero(slots < k)
+        slots = slots[rows]
+        # Several rows can draw the same slot; the last one wins, as in a row-by-row pass
+        last = np.unique(slots[::-1], return_index=True)[1]
+        slots, rows = slots[::-1][last], rows[::-1][last]
+
+        size = min(k, seen + m)
+        for col in X.columns:
+            values = X[col].to_numpy()
+            current = self.reservoir_.get(col, np.empty(0, dtype=values.dtype))
+            reservoir = np.empty(size, dtype=np.result_type(current.dtype, values.dtype))
+            reservoir[:len(current)] = current
+            reservoir[slots] = values[rows]
+            self.reservoir_[col] = reservoir
+        self.rows_seen_ = seen + m
     
+    @instrumented
     def transform(self, X):
         try:
-            logger.info("Transforming data with SkewHandler")
-            X_copy = X.copy()
-            
-            for col in X_copy.columns:
+            logger.opt(lazy=True).debug(
+                "SkewHandler: {}", lambda: {col: self.transform_method_.get(col, 'none') for col in X.columns}
+            )
+            columns = {}
+            for col in X.columns:
                 method = self.transform_method_.get(col, 'none')
+                if method == 'none':
+                    columns[col] = X[col]
+                    continue
+
+                # float64 first (log1p keeps small int dtypes, int8 -> float16), then transform that copy in place
+                values = X[col].to_numpy(dtype="float64", copy=True)
                 if method == 'log':
-                    X_copy[col] = np.log1p(X_copy[col])
-                elif method == 'yeo-johnson':
-                    pt = self.power_transformers_[col]
-                    X_copy[col] = pt.transform(X_copy[[col]]).ravel()
-                logger.debug(f"{col}: applied {method} transform")
-            
-            return X_copy
+                    columns[col] = np.log1p(values, out=values)
+                elif col in getattr(self, "yeo_johnson_params_", {}):
+                    # PowerTransformer.transform without its per-call validation: Yeo-Johnson, then standardise
+                    lmbda, mean, scale = self.yeo_johnson_params_[col]
+                    values = stats.yeojohnson(values, lmbda)
+                    values -= mean
+                    values /= scale
+                    columns[col] = values
+                else:
+                    # Fitted before the parameters were stored: PowerTransformer's own public transform
+                    columns[col] = self.power_transformers_[col].transform(X[[col]])[:, 0]
+
+            # Built in one go: assigning columns into a copy one by one dominated the old cost
+            return pd.DataFrame(columns, index=X.index, copy=False)
         
         except Exception as e:
             logger.exception("Error in SkewHandler.transform")
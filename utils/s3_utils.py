@@ -1,6 +1,14 @@
 import boto3
+from boto3.s3.transfer import S3Transfer
 import sys
 import os
+import json
+import time
+import shutil
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
 from pathlib import Path
 from loguru import logger
 from utils.custom_exception import CustomException
@@ -9,45 +17,447 @@ from utils.custom_exception import CustomException
 class S3Progress:
     def __init__(self):
         self._seen_so_far = 0
+        self._lock = threading.Lock()
 
     def __call__(self, bytes_amount):
-        self._seen_so_far += bytes_amount
-        mb = self._seen_so_far / (1024 * 1024)
+        with self._lock:
+            self._seen_so_far += bytes_amount
+            mb = self._seen_so_far / (1024 * 1024)
         logger.info(f"Downloaded {mb:.2f} MB")
 
 
-def load_s3_file(bucket_name, s3_key, local_file_path):
+def md5_file(path, block_size=1024 * 1024):
+    digest = hashlib.md5()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class LocalS3Client:
+    """Offline stand-in for the boto3 S3 client, serving objects from <root>/<bucket>/<key>.
+
+    Implements the subset of the client API used by this project; ETags are the
+    object's MD5, like single-part uploads on S3.
+    """
+
+    def __init__(self, root):
+        self.root = Path(root)
+        # (path, size, mtime) -> MD5, so ranged GETs on a large object do not rehash it every time
+        self._etags = {}
+
+    def _path(self, bucket, key):
+        return self.root / bucket / key
+
+    def head_object(self, Bucket, Key):
+        path = self._path(Bucket, Key)
+        if not path.is_file():
+            raise FileNotFoundError(f"s3://{Bucket}/{Key} does not exist under {self.root}")
+        stat = path.stat()
+        cache_key = (str(path), stat.st_size, stat.st_mtime_ns)
+        if cache_key not in self._etags:
+            self._etags[cache_key] = md5_file(path)
+        return {"ETag": f'"{self._etags[cache_key]}"', "ContentLength": stat.st_size}
+
+    def _check_if_match(self, Bucket, Key, if_match):
+        head = self.head_object(Bucket, Key)
+        if if_match is not None and if_match.strip('"') != head["ETag"].strip('"'):
+            # What S3 answers with 412 Precondition Failed
+            raise IOError(f"s3://{Bucket}/{Key} no longer has ETag {if_match}")
+        return head
+
+    def get_object(self, Bucket, Key, Range=None, IfMatch=None):
+        head = self._check_if_match(Bucket, Key, IfMatch)
+        with open(self._path(Bucket, Key), "rb") as f:
+            if Range:
+                start, end = Range.replace("bytes=", "").split("-")
+                f.seek(int(start))
+                data = f.read(int(end) - int(start) + 1)
+            else:
+                data = f.read()
+        return {"Body": BytesIO(data), "ContentLength": len(data), "ETag": head["ETag"]}
+
+    def download_file(self, Bucket, Key, Filename, ExtraArgs=None, Callback=None, Config=None):
+        # Same validation as boto3's transfer manager, so code relying on unsupported arguments fails offline too
+        invalid = set(ExtraArgs or {}) - set(S3Transfer.ALLOWED_DOWNLOAD_ARGS)
+        if invalid:
+            raise ValueError(
+                f"Invalid extra_args key '{sorted(invalid)[0]}', must be one of: {', '.join(S3Transfer.ALLOWED_DOWNLOAD_ARGS)}"
+            )
+        self.head_object(Bucket, Key)
+        source = self._path(Bucket, Key)
+        shutil.copyfile(source, Filename)
+        if Callback is not None:
+            Callback(source.stat().st_size)
+
+    def upload_file(self, Filename, Bucket, Key):
+        target = self._path(Bucket, Key)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(Filename, target)
+
+
+def get_s3_client():
+    # LOCAL_S3_ROOT points every S3 call at a local directory, e.g. for offline runs and tests
+    local_root = os.getenv("LOCAL_S3_ROOT")
+    if local_root:
+        return LocalS3Client(local_root)
+    return boto3.client("s3")
+
+
+class ArtifactCache:
+    """Size-bounded LRU cache of S3 objects, addressed by bucket / key / ETag.
+
+    Blobs live under <cache_dir>/blobs and are written via a temp file plus
+    atomic rename, so a crashed download never leaves a half-written entry.
+    <cache_dir>/index.json records key, ETag, size and last access per blob.
+    """
+
+    def __init__(self, cache_dir, max_size_bytes):
+        self.cache_dir = Path(cache_dir)
+        self.blob_dir = self.cache_dir / "blobs"
+        self.tmp_dir = self.cache_dir / "tmp"
+        self.index_path = self.cache_dir / "index.json"
+        self.max_size_bytes = max_size_bytes
+        self._lock = threading.Lock()
+
+        self.blob_dir.mkdir(parents=True, exist_ok=True)
+        self.tmp_dir.mkdir(parents=True, exist_ok=True)
+
+    @classmethod
+    def from_config(cls, config):
+        cache_config = config.get("artifact_cache", {})
+        if not cache_config.get("enabled", False):
+            return None
+        return cls(
+            cache_config.get("cache_dir", "artifacts/.cache"),
+            int(cache_config.get("max_size_mb", 2048) * 1024 * 1024),
+        )
+
+    @staticmethod
+    def entry_id(bucket, key, etag):
+        return hashlib.sha256(f"{bucket}/{key}/{etag}".encode()).hexdigest()
+
+    def _read_index(self):
+        if not self.index_path.exists():
+            return {}
+        try:
+            with open(self.index_path) as f:
+                return json.load(f)
+        except json.JSONDecodeError:
+            logger.warning(f"Artifact cache index {self.index_path} is corrupt, starting a new one")
+            return {}
+
+    def _write_index(self, index):
+        tmp_path = self.tmp_dir / f"index.{os.getpid()}.{threading.get_ident()}.json"
+        with open(tmp_path, "w") as f:
+            json.dump(index, f, indent=2)
+        os.replace(tmp_path, self.index_path)
+
+    def get(self, bucket, key, etag):
+        entry_id = self.entry_id(bucket, key, etag)
+        with self._lock:
+            index = self._read_index()
+            entry = index.get(entry_id)
+            blob = self.blob_dir / entry_id
+            if entry is None or not blob.exists():
+                return None
+            entry["last_access"] = time.time()
+            self._evict(index, keep=entry_id)
+            self._write_index(index)
+            return blob
+
+    def _store(self, bucket, key, etag, write_fn):
+        entry_id = self.entry_id(bucket, key, etag)
+        tmp_path = self.tmp_dir / f"{entry_id}.{os.getpid()}.{threading.get_ident()}.part"
+        try:
+            write_fn(tmp_path)
+            if not tmp_path.exists() or tmp_path.stat().st_size == 0:
+                raise CustomException("Downloaded file is empty or missing", sys)
+            blob = self.blob_dir / entry_id
+            os.replace(tmp_path, blob)
+        finally:
+            if tmp_path.exists():
+                tmp_path.unlink()
+
+        with self._lock:
+            index = self._read_index()
+            index[entry_id] = {
+                "bucket": bucket,
+                "key": key,
+                "etag": etag,
+                "size": blob.stat().st_size,
+                "last_access": time.time(),
+            }
+            self._evict(index, keep=entry_id)
+            self._write_index(index)
+        return blob
+
+    def fetch(self, bucket, key, etag, download_fn):
+        logger.info(f"Cache miss for s3://{bucket}/{key} (ETag {etag}), downloading")
+        return self._store(bucket, key, etag, download_fn)
+
+    def adopt(self, bucket, key, etag, path):
+        logger.info(f"Adopting {path} into the artifact cache for s3://{bucket}/{key}")
+        return self._store(bucket, key, etag, lambda tmp_path: shutil.copyfile(path, tmp_path))
+
+    def _evict(self, index, keep):
+        total = sum(entry["size"] for entry in index.values())
+        by_age = sorted(index.items(), key=lambda item: item[1]["last_access"])
+        for entry_id, entry in by_age:
+            if total <= self.max_size_bytes:
+                break
+            if entry_id == keep:
+                continue
+            blob = self.blob_dir / entry_id
+            if blob.exists():
+                blob.unlink()
+            total -= entry["size"]
+            del index[entry_id]
+            logger.info(f"Evicted s3://{entry['bucket']}/{entry['key']} (ETag {entry['etag']}) from artifact cache")
+
+    def stats(self):
+        with self._lock:
+            index = self._read_index()
+        return {
+            "entries": len(index),
+            "size_bytes": sum(entry["size"] for entry in index.values()),
+            "max_size_bytes": self.max_size_bytes,
+        }
+
+
+def _materialize(blob, local_file_path):
+    # Copy rather than hard-link: training rewrites artifacts in place and must not touch the cache
+    tmp_path = local_file_path.with_name(f".{local_file_path.name}.{os.getpid()}.tmp")
+    shutil.copyfile(blob, tmp_path)
+    os.replace(tmp_path, local_file_path)
+
+
+def _write_manifest(path, manifest):
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, path)
+
+
+def _load_manifest(manifest_path, part_path, etag, size, part_size, ranges):
+    """Parts of an earlier, interrupted download of the same object whose bytes still match their MD5."""
+    if not manifest_path.exists() or not part_path.exists() or part_path.stat().st_size != size:
+        return {}
+    try:
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+    except json.JSONDecodeError:
+        return {}
+    if (manifest.get("etag"), manifest.get("size"), manifest.get("part_size")) != (etag, size, part_size):
+        logger.info("Object changed since the interrupted download, starting over")
+        return {}
+
+    done = {}
+    with open(part_path, "rb") as f:
+        for idx, digest in manifest.get("parts", {}).items():
+            start, end = ranges[int(idx)]
+            f.seek(start)
+            if hashlib.md5(f.read(end - start + 1)).hexdigest() == digest:
+                done[int(idx)] = digest
+            else:
+                logger.warning(f"Part {idx} failed its checksum, downloading it again")
+    return done
+
+
+def _check_etag(etag, part_path, digests):
+    # Single-part ETags are the object's MD5; multipart ETags are the MD5 of the part MD5s plus "-<parts>",
+    # which only matches when our parts line up with the upload's. Anything else cannot be checked here.
+    if "-" not in etag:
+        actual = md5_file(part_path)
+    elif etag.endswith(f"-{len(digests)}"):
+        actual = hashlib.md5(b"".join(bytes.fromhex(digest) for digest in digests)).hexdigest() + f"-{len(digests)}"
+    else:
+        logger.debug(f"ETag {etag} cannot be recomputed from {len(digests)} parts, skipping the check")
+        return
+    if actual != etag:
+        raise IOError(f"Downloaded object does not match its ETag: {actual} != {etag}")
+
+
+def download_ranged(
+    s3, bucket_name, s3_key, local_file_path, size, part_size,
+    max_workers=8, etag=None, retries=3, verify_etag=True, resume=False, callback=None,
+):
+    """Download an object with concurrent ranged GETs into <file>.part, renamed into place once complete.
+
+    Every part is retried up to `retries` times and its MD5 recorded. With
+    an `etag`, every GET is conditional on it (If-Match), so all parts come
+    from that version of the object. With `verify_etag`, the finished file is checked against it
+    where the ETag can be recomputed, so `local_file_path` never holds a
+    partial or corrupt download. With `resume`, <file>.part.json records the
+    object's ETag, size and part size plus every part's MD5, and a rerun for
+    the same object re-verifies those parts on disk and fetches only the
+    missing or corrupt ones.
+    """
+    local_file_path = Path(local_file_path)
+    part_path = local_file_path.with_name(f"{local_file_path.name}.part")
+    manifest_path = local_file_path.with_name(f"{local_file_path.name}.part.json")
+    ranges = [(start, min(start + part_size, size) - 1) for start in range(0, size, part_size)] or [(0, -1)]
+
+    done = _load_manifest(manifest_path, part_path, etag, size, part_size, ranges) if resume else {}
+    if not done:
+        with open(part_path, "wb") as f:
+            f.truncate(size)
+    manifest = {"etag": etag, "size": size, "part_size": part_size, "parts": {str(idx): d for idx, d in done.items()}}
+    if resume:
+        _write_manifest(manifest_path, manifest)
+
+    pending = [idx for idx in range(len(ranges)) if idx not in done]
+    logger.info(
+        f"Downloading s3://{bucket_name}/{s3_key}: {len(pending)} of {len(ranges)} parts of "
+        f"{part_size / (1024 * 1024):.1f} MB with {max_workers} threads"
+        + (f", resuming {len(done)} verified parts" if done else "")
+    )
+    lock = threading.Lock()
+    if_match = {"IfMatch": f'"{etag}"'} if etag else {}
+
+    def fetch_part(idx):
+        start, end = ranges[idx]
+        for attempt in range(retries + 1):
+            try:
+                if end < start:
+                    data = b""
+                else:
+                    data = s3.get_object(
+                        Bucket=bucket_name, Key=s3_key, Range=f"bytes={start}-{end}", **if_match
+                    )["Body"].read()
+                if len(data) != end - start + 1:
+                    raise IOError(f"Short read for bytes {start}-{end}: got {len(data)} bytes")
+                break
+            except Exception as e:
+                if attempt == retries:
+                    raise
+                logger.warning(f"Part {idx} failed ({e}), retry {attempt + 1}/{retries}")
+                time.sleep(0.5 * 2 ** attempt)
+
+        digest = hashlib.md5(data).hexdigest()
+        with open(part_path, "r+b") as f:
+            f.seek(start)
+            f.write(data)
+        with lock:
+            manifest["parts"][str(idx)] = digest
+            if resume:
+                _write_manifest(manifest_path, manifest)
+        if callback is not None:
+            callback(len(data))
+
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            # list() re-raises the first failed part; a resumable download's manifest keeps every part that completed
+            list(pool.map(fetch_part, pending))
+
+        if verify_etag and etag:
+            _check_etag(etag, part_path, [manifest["parts"][str(idx)] for idx in range(len(ranges))])
+    except Exception:
+        if not resume:
+            part_path.unlink(missing_ok=True)
+        raise
+
+    os.replace(part_path, local_file_path)
+    manifest_path.unlink(missing_ok=True)
+    return local_file_path
+
+
+def _download_object(s3, bucket_name, s3_key, local_file_path, size, part_size, max_part_workers, etag=None):
+    if part_size and size and size > part_size:
+        download_ranged(
+            s3, bucket_name, s3_key, local_file_path, size, part_size,
+            max_workers=max_part_workers, etag=etag, callback=S3Progress(),
+        )
+    else:
+        _download_single(s3, bucket_name, s3_key, local_file_path, etag=etag, callback=S3Progress())
+
+
+def _download_single(s3, bucket_name, s3_key, local_file_path, etag=None, callback=None, chunk_size=1024 * 1024):
+    # One GET streamed into <file>.part. download_file cannot take If-Match, so an object replaced
+    # after its HEAD would be written under the old ETag; the conditional GET fails instead
+    local_file_path = Path(local_file_path)
+    part_path = local_file_path.with_name(f"{local_file_path.name}.part")
+    kwargs = {"IfMatch": f'"{etag}"'} if etag else {}
+    try:
+        body = s3.get_object(Bucket=bucket_name, Key=s3_key, **kwargs)["Body"]
+        with open(part_path, "wb") as f:
+            for chunk in iter(lambda: body.read(chunk_size), b""):
+                f.write(chunk)
+                if callback is not None:
+                    callback(len(chunk))
+    except Exception:
+        part_path.unlink(missing_ok=True)
+        raise
+    os.replace(part_path, local_file_path)
+    return local_file_path
+
+
+def load_s3_file(bucket_name, s3_key, local_file_path, cache=None, s3=None, part_size=None, max_part_workers=8):
+    local_file_path, _ = fetch_s3_file(
+        bucket_name, s3_key, local_file_path, cache=cache, s3=s3, part_size=part_size, max_part_workers=max_part_workers
+    )
+    return local_file_path
+
+
+def fetch_s3_file(bucket_name, s3_key, local_file_path, cache=None, s3=None, part_size=None, max_part_workers=8):
+    """load_s3_file that also returns the ETag of the bytes it put at `local_file_path`.
+
+    Downloads are conditional on the ETag from the HEAD request, so an object
+    replaced in between fails the GET instead of being stored under the old version.
+    """
     try:
         logger.info(f"Checking file in S3: s3://{bucket_name}/{s3_key}")
 
-        s3 = boto3.client("s3")
+        if s3 is None:
+            s3 = get_s3_client()
 
         try:
-            s3.head_object(Bucket=bucket_name, Key=s3_key)
+            head = s3.head_object(Bucket=bucket_name, Key=s3_key)
             logger.info("File found in S3")
         except Exception:
             raise CustomException(
                 f"File not found in S3 at key: {s3_key}", sys
             )
 
+        size = head.get("ContentLength", 0)
+        etag = head["ETag"].strip('"')
         local_file_path = Path(local_file_path)
         local_file_path.parent.mkdir(parents=True, exist_ok=True)
 
+        if cache is not None:
+            blob = cache.get(bucket_name, s3_key, etag)
+
+            if blob is not None:
+                logger.info(f"ETag {etag} unchanged, using cached copy of s3://{bucket_name}/{s3_key}")
+            elif (
+                "-" not in etag
+                and local_file_path.exists()
+                and md5_file(local_file_path) == etag
+            ):
+                # A single-part ETag is the object's MD5, so an identical local file needs no download
+                blob = cache.adopt(bucket_name, s3_key, etag, local_file_path)
+            else:
+                blob = cache.fetch(
+                    bucket_name, s3_key, etag,
+                    lambda tmp_path: _download_object(
+                        s3, bucket_name, s3_key, tmp_path, size, part_size, max_part_workers, etag=etag
+                    ),
+                )
+
+            _materialize(blob, local_file_path)
+            logger.success(f"File available at {local_file_path}")
+            return local_file_path, etag
+
         logger.info(f"Starting download to {local_file_path}")
 
-        s3.download_file(
-            bucket_name,
-            s3_key,
-            str(local_file_path),
-            Callback=S3Progress()
-        )
+        _download_object(s3, bucket_name, s3_key, local_file_path, size, part_size, max_part_workers, etag=etag)
 
         logger.success(f"File downloaded successfully to {local_file_path}")
 
         if not local_file_path.exists() or local_file_path.stat().st_size == 0:
             raise CustomException("Downloaded file is empty or missing", sys)
 
-        return local_file_path
+        return local_file_path, etag
 
     except CustomException:
         raise
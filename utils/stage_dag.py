@@ -0,0 +1,194 @@
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+
+from loguru import logger
+
+from utils.custom_exception import CustomException
+
+
+class Stage:
+    """One pipeline step and everything its result depends on.
+
+    A stage re-runs only when the fingerprint of its declared inputs (file
+    contents, config sections, source files and `extra` values such as a
+    remote ETag) has no recorded result, or a recorded output can no longer
+    be restored. `outputs` are the files it produces.
+    """
+
+    def __init__(self, name, run, inputs=(), outputs=(), config_sections=(), code=(), extra=None, deps=()):
+        self.name = name
+        self.run = run
+        self.inputs = [str(path) for path in inputs]
+        self.outputs = [str(path) for path in outputs]
+        self.config_sections = list(config_sections)
+        self.code = [str(path) for path in code]
+        self.extra = extra or {}
+        self.deps = list(deps)
+
+
+def _sha256_file(path, chunk_size=8 * 1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class StageCache:
+    """Content-addressed store of stage outputs plus a manifest of input fingerprint -> output digests.
+
+    Output files are copied into blobs/<sha256>, so a later run whose inputs
+    match any earlier run (not just the last one) restores that run's
+    outputs instead of recomputing them. File digests are memoised by
+    (size, mtime), so unchanged multi-GB datasets are not rehashed each run.
+    """
+
+    def __init__(self, cache_dir="artifacts/.cache/pipeline"):
+        self.cache_dir = cache_dir
+        self.blobs_dir = os.path.join(cache_dir, "blobs")
+        self.manifest_path = os.path.join(cache_dir, "manifest.json")
+        self.digests_path = os.path.join(cache_dir, "digests.json")
+        self.manifest = self._load(self.manifest_path)
+        self.digests = self._load(self.digests_path)
+
+    @staticmethod
+    def _load(path):
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        for path, data in ((self.manifest_path, self.manifest), (self.digests_path, self.digests)):
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(data, f, indent=1, sort_keys=True)
+            os.replace(tmp_path, path)
+
+    def file_digest(self, path):
+        """SHA-256 of a file's contents, or None when it does not exist."""
+        if not os.path.exists(path):
+            return None
+        stat = os.stat(path)
+        stamp = [stat.st_size, stat.st_mtime_ns]
+        memo = self.digests.get(os.path.abspath(path))
+        if memo and memo["stamp"] == stamp:
+            return memo["sha256"]
+        digest = _sha256_file(path)
+        self.digests[os.path.abspath(path)] = {"stamp": stamp, "sha256": digest}
+        return digest
+
+    def fingerprint(self, stage, config):
+        parts = {
+            "stage": stage.name,
+            "inputs": {path: self.file_digest(path) for path in stage.inputs},
+            "config": {section: config.get(section) for section in stage.config_sections},
+            "code": {path: self.file_digest(path) for path in stage.code},
+            "extra": {name: value() for name, value in stage.extra.items()},
+        }
+        return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+    def restore(self, stage, key):
+        """Put the outputs recorded for `key` in place; False when there is no complete record."""
+        record = self.manifest.get(stage.name, {}).get(key)
+        if record is None or set(record) != set(stage.outputs):
+            return False
+        for path, digest in record.items():
+            if self.file_digest(path) == digest:
+                continue
+            blob = os.path.join(self.blobs_dir, digest)
+            if not os.path.exists(blob):
+                return False
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            shutil.copyfile(blob, path)
+            logger.info(f"{stage.name}: restored {path} from the stage cache")
+        # Keep the digests memoised above for the next run
+        self._save()
+        return True
+
+    def store(self, stage, key):
+        record = {}
+        for path in stage.outputs:
+            digest = self.file_digest(path)
+            if digest is None:
+                raise FileNotFoundError(f"Stage '{stage.name}' did not produce its declared output {path}")
+            blob = os.path.join(self.blobs_dir, digest)
+            if not os.path.exists(blob):
+                os.makedirs(self.blobs_dir, exist_ok=True)
+                shutil.copyfile(path, f"{blob}.tmp")
+                os.replace(f"{blob}.tmp", blob)
+            record[path] = digest
+        self.manifest.setdefault(stage.name, {})[key] = record
+        self._save()
+
+
+def _ordered(stages):
+    # Depth-first topological order; declaration order breaks ties
+    by_name = {stage.name: stage for stage in stages}
+    ordered, visiting, done = [], set(), set()
+
+    def visit(stage):
+        if stage.name in done:
+            return
+        if stage.name in visiting:
+            raise ValueError(f"Pipeline stages form a cycle through '{stage.name}'")
+        visiting.add(stage.name)
+        for dep in stage.deps:
+            if dep not in by_name:
+                raise ValueError(f"Stage '{stage.name}' depends on unknown stage '{dep}'")
+            visit(by_name[dep])
+        visiting.discard(stage.name)
+        done.add(stage.name)
+        ordered.append(stage)
+
+    for stage in stages:
+        visit(stage)
+    return ordered
+
+
+def run_stages(stages, config, cache=None, force=()):
+    """Run `stages` in dependency order, skipping every stage whose fingerprinted inputs have a cached result.
+
+    Stages are fingerprinted just before they would run, so a stage whose
+    upstream re-ran but produced identical files is still a cache hit.
+    Returns one report row per stage: name, status (hit / ran / forced) and seconds.
+    """
+    report = []
+    try:
+        unknown = set(force) - {stage.name for stage in stages}
+        if unknown:
+            raise ValueError(f"Cannot force unknown stage(s): {', '.join(sorted(unknown))}")
+
+        for stage in _ordered(stages):
+            start = time.perf_counter()
+            key = cache.fingerprint(stage, config) if cache else None
+
+            if cache and stage.name not in force and cache.restore(stage, key):
+                status = "hit"
+            else:
+                status = "forced" if stage.name in force else "ran"
+                logger.info(f"Running stage '{stage.name}'")
+                stage.run()
+                if cache:
+                    cache.store(stage, key)
+
+            elapsed = time.perf_counter() - start
+            report.append({"stage": stage.name, "status": status, "seconds": round(elapsed, 3)})
+            logger.info(f"Stage '{stage.name}': {status} in {elapsed:.2f}s")
+
+        hits = sum(row["status"] == "hit" for row in report)
+        logger.success(
+            f"Pipeline finished: {hits}/{len(report)} stages from cache, "
+            + ", ".join(f"{row['stage']} {row['status']} {row['seconds']:.2f}s" for row in report)
+        )
+        return report
+
+    except Exception as e:
+        logger.exception("Pipeline stage failed")
+        raise CustomException(e, sys)
@@ -0,0 +1,236 @@
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+from loguru import logger
+
+from utils.custom_exception import CustomException
+
+
+CATEGORY = pa.dictionary(pa.int8(), pa.string())
+
+# Raw reservations as stored between ingestion and processing: small ints for counts,
+# float32 prices and dictionary-encoded categoricals
+RESERVATION_SCHEMA = pa.schema(
+    [
+        ("Booking_ID", pa.string()),
+        ("no_of_adults", pa.int8()),
+        ("no_of_children", pa.int8()),
+        ("no_of_weekend_nights", pa.int8()),
+        ("no_of_week_nights", pa.int8()),
+        ("type_of_meal_plan", CATEGORY),
+        ("required_car_parking_space", pa.int8()),
+        ("room_type_reserved", CATEGORY),
+        ("lead_time", pa.int16()),
+        ("arrival_year", pa.int16()),
+        ("arrival_month", pa.int8()),
+        ("arrival_date", pa.int8()),
+        ("market_segment_type", CATEGORY),
+        ("repeated_guest", pa.int8()),
+        ("no_of_previous_cancellations", pa.int8()),
+        ("no_of_previous_bookings_not_canceled", pa.int16()),
+        ("avg_price_per_room", pa.float32()),
+        ("no_of_special_requests", pa.int8()),
+        ("booking_status", CATEGORY),
+    ]
+)
+
+EXTENSIONS = {"csv": ".csv", "parquet": ".parquet", "feather": ".arrow"}
+
+
+def processed_schema(columns, target="booking_status"):
+    """Processed features as float32 (RandomForest casts X to float32 anyway) and an int8 target."""
+    return pa.schema([(str(col), pa.int8() if col == target else pa.float32()) for col in columns])
+
+
+def _raw_csv_types():
+    # Read categoricals as plain strings; the cast to RESERVATION_SCHEMA builds the dictionaries
+    return {field.name: pa.string() if field.type == CATEGORY else field.type for field in RESERVATION_SCHEMA}
+
+
+class DictionaryEncoder:
+    """Encode a stream of tables to `schema`, keeping one growing vocabulary per dictionary column.
+
+    Each batch's dictionary then extends the previous one, which Arrow IPC
+    files accept as a delta (they reject dictionary replacements), and train /
+    test writers sharing an encoder get the same category codes.
+    """
+
+    def __init__(self, schema):
+        self.schema = schema
+        self.vocab = {field.name: [] for field in schema if pa.types.is_dictionary(field.type)}
+
+    def encode(self, table):
+        columns = []
+        for field in self.schema:
+            column = table.column(field.name).combine_chunks()
+            if field.name in self.vocab:
+                vocab = self.vocab[field.name]
+                known = set(vocab)
+                vocab.extend(value for value in pc.unique(column).to_pylist() if value is not None and value not in known)
+                dictionary = pa.array(vocab, pa.string())
+                indices = pc.index_in(column.cast(pa.string()), value_set=dictionary).cast(field.type.index_type)
+                column = pa.DictionaryArray.from_arrays(indices, dictionary)
+            else:
+                column = column.cast(field.type)
+            columns.append(column)
+        return pa.Table.from_arrays(columns, schema=self.schema)
+
+
+class DatasetStorage:
+    """Reads and writes the datasets passed between pipeline stages.
+
+    `format` selects CSV, Parquet (compressed, dictionary-encoded, typed) or
+    Feather/Arrow IPC (uncompressed, so readers memory-map the buffers instead
+    of decoding them). Paths in config keep their .csv names; `path()` swaps
+    the extension for the configured format.
+    """
+
+    def __init__(self, file_format="csv", compression="zstd", memory_map=True, row_group_rows=1_000_000, csv_engine=None):
+        if file_format not in EXTENSIONS:
+            raise ValueError(f"Unknown storage format: {file_format}")
+        self.file_format = file_format
+        self.compression = compression
+        self.memory_map = memory_map
+        self.row_group_rows = row_group_rows
+        self.csv_engine = csv_engine
+
+    @classmethod
+    def from_config(cls, config):
+        storage_config = config.get("storage", {})
+        return cls(
+            file_format=storage_config.get("format", "csv"),
+            compression=storage_config.get("compression", "zstd"),
+            memory_map=storage_config.get("memory_map", True),
+            row_group_rows=storage_config.get("row_group_rows", 1_000_000),
+            csv_engine=storage_config.get("csv_engine"),
+        )
+
+    def path(self, path):
+        return str(Path(path).with_suffix(EXTENSIONS[self.file_format]))
+
+    def _to_table(self, df, schema):
+        df = df.rename(columns=str)
+        if schema is None:
+            return pa.Table.from_pandas(df, preserve_index=False)
+        # Fields the frame does not carry are left out; columns outside the schema are dropped
+        schema = pa.schema([field for field in schema if field.name in df.columns])
+        return pa.Table.from_pandas(df[schema.names], preserve_index=False).cast(schema)
+
+    def write(self, df, path, schema=None):
+        """Write `df` to `path` (already resolved with `path()`), cast to `schema` when given."""
+        try:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            if self.file_format == "csv":
+                df.to_csv(path, index=False)
+            elif self.file_format == "parquet":
+                pq.write_table(
+                    self._to_table(df, schema), path, compression=self.compression, row_group_size=self.row_group_rows
+                )
+            else:
+                feather.write_feather(self._to_table(df, schema), path, compression="uncompressed")
+            logger.success(f"Saved {len(df):,} rows to {path}")
+
+        except Exception as e:
+            logger.exception(f"Error writing dataset to {path}")
+            raise CustomException(e, sys)
+
+    def open_writer(self, path, schema):
+        """Incremental writer for chunked producers; returns an object with write_table(table) and close()."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        if self.file_format == "parquet":
+            return pq.ParquetWriter(path, schema, compression=self.compression)
+        if self.file_format == "feather":
+            return pa.ipc.new_file(path, schema, options=pa.ipc.IpcWriteOptions(emit_dictionary_deltas=True))
+        return pa_csv.CSVWriter(path, schema)
+
+    def raw_csv_reader(self, source, block_size=64 * 1024 * 1024):
+        """Stream a raw reservations CSV (path or binary file object) as Arrow record batches with the storage column types."""
+        return pa_csv.open_csv(
+            source,
+            read_options=pa_csv.ReadOptions(block_size=block_size),
+            convert_options=pa_csv.ConvertOptions(column_types=_raw_csv_types(), include_columns=RESERVATION_SCHEMA.names),
+        )
+
+
+def apply_dtype_plan(df, dtype_plan):
+    """Convert `category` columns to pandas categoricals and downcast `numeric` columns to their narrowest type."""
+    for col, kind in dtype_plan.items():
+        if col not in df.columns:
+            continue
+        if kind == "category":
+            if not isinstance(df[col].dtype, pd.CategoricalDtype):
+                df[col] = df[col].astype("category")
+        elif kind == "numeric" and df[col].dtype.kind in "iuf":
+            df[col] = pd.to_numeric(df[col], downcast="integer" if df[col].dtype.kind in "iu" else "float")
+    return df
+
+
+def default_nbytes(df):
+    """Estimated size of `df` under pandas' default dtypes (int64 / float64 / strings), to report what a dtype plan saved."""
+    total = df.index.memory_usage()
+    for col in df.columns:
+        series = df[col]
+        if isinstance(series.dtype, pd.CategoricalDtype) and series.cat.categories.dtype.kind not in "iuf":
+            # String data plus one 8-byte offset per row
+            lengths = np.array([len(str(category)) for category in series.cat.categories] + [0])
+            total += int(lengths[series.cat.codes.to_numpy()].sum()) + 8 * len(series)
+        elif isinstance(series.dtype, pd.CategoricalDtype) or series.dtype.kind in "iufb":
+            total += 8 * len(series)
+        else:
+            total += series.memory_usage(deep=True, index=False)
+    return int(total)
+
+
+def read_dataset(path, columns=None, memory_map=True, dtype_plan=None, engine=None):
+    """Load a CSV, Parquet or Feather dataset by extension, reading only `columns` when given.
+
+    Parquet dictionary columns come back as pandas categoricals; Feather files
+    are memory-mapped so untouched columns are never paged in. `dtype_plan`
+    ({column: "category" | "numeric"}) is applied to whatever is read.
+    """
+    suffix = Path(path).suffix
+    if suffix == ".parquet":
+        table = pq.read_table(path, columns=columns, memory_map=memory_map)
+    elif suffix in (".arrow", ".feather"):
+        table = feather.read_table(path, columns=columns, memory_map=memory_map)
+    else:
+        # pyarrow parses categoricals straight into dictionaries; the C parser would read
+        # numeric categoricals as strings ('0', '1'), so those are converted after parsing
+        categories = {col: "category" for col, kind in (dtype_plan or {}).items() if kind == "category"}
+        df = pd.read_csv(path, usecols=columns, engine=engine, dtype=categories if engine == "pyarrow" else None)
+        return apply_dtype_plan(df, dtype_plan) if dtype_plan else df
+
+    df = table.to_pandas(split_blocks=True, self_destruct=True)
+    return apply_dtype_plan(df, dtype_plan) if dtype_plan else df
+
+
+def iter_dataset(path, chunk_rows, columns=None, memory_map=True, dtype_plan=None):
+    """Yield a dataset as DataFrames of at most `chunk_rows` rows, for passes over data larger than memory.
+
+    Parquet is read batch by batch and Feather is memory-mapped and sliced, so
+    only the current chunk is materialised. CSV goes through pandas' chunked
+    C parser (the pyarrow engine cannot chunk).
+    """
+    suffix = Path(path).suffix
+    if suffix == ".parquet":
+        parquet_file = pq.ParquetFile(path, memory_map=memory_map)
+        batches = (pa.Table.from_batches([batch]) for batch in parquet_file.iter_batches(chunk_rows, columns=columns))
+    elif suffix in (".arrow", ".feather"):
+        table = feather.read_table(path, columns=columns, memory_map=memory_map)
+        batches = (table.slice(offset, chunk_rows) for offset in range(0, table.num_rows, chunk_rows))
+    else:
+        for df in pd.read_csv(path, usecols=columns, chunksize=chunk_rows):
+            yield apply_dtype_plan(df, dtype_plan) if dtype_plan else df
+        return
+
+    for batch in batches:
+        df = batch.to_pandas(split_blocks=True)
+        yield apply_dtype_plan(df, dtype_plan) if dtype_plan else df
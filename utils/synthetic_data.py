@@ -0,0 +1,267 @@
+import os
+import sys
+import shutil
+import calendar
+import glob
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from scipy.special import ndtr, ndtri
+from loguru import logger
+
+from utils.custom_exception import CustomException
+from utils.general_utils import load_config
+from utils.storage_utils import RESERVATION_SCHEMA
+
+
+# Numeric columns sampled jointly through the copula, so lead time, price, stay length,
+# arrival date and guest history keep their correlations inside each segment x status group
+COPULA_COLUMNS = [
+    "no_of_adults",
+    "no_of_children",
+    "no_of_weekend_nights",
+    "no_of_week_nights",
+    "required_car_parking_space",
+    "lead_time",
+    "arrival_year",
+    "arrival_month",
+    "arrival_date",
+    "repeated_guest",
+    "no_of_previous_cancellations",
+    "no_of_previous_bookings_not_canceled",
+    "avg_price_per_room",
+    "no_of_special_requests",
+]
+CONTINUOUS_COLUMNS = {"avg_price_per_room"}
+# Sampled from their frequencies within the segment x status group
+CONDITIONAL_CATEGORICALS = ["type_of_meal_plan", "room_type_reserved"]
+GROUP_COLUMNS = ["market_segment_type", "booking_status"]
+QUANTILE_POINTS = 1001
+# Groups smaller than this borrow the correlation matrix of the whole dataset
+MIN_GROUP_ROWS = 50
+
+
+def _normal_scores(values):
+    ranks = pd.Series(values).rank(method="average").to_numpy()
+    return ndtri((ranks - 0.5) / len(values))
+
+
+def _correlation(frame):
+    scores = np.column_stack([_normal_scores(frame[col].to_numpy()) for col in COPULA_COLUMNS])
+    with np.errstate(invalid="ignore", divide="ignore"):
+        # Columns that are constant within a group have no correlation; nan_to_num makes them independent
+        corr = np.nan_to_num(np.corrcoef(scores, rowvar=False))
+    np.fill_diagonal(corr, 1.0)
+
+    # Constant columns and rank ties can leave the matrix slightly indefinite; clip before Cholesky
+    eigvals, eigvecs = np.linalg.eigh(corr)
+    corr = eigvecs @ np.diag(np.clip(eigvals, 1e-6, None)) @ eigvecs.T
+    scale = np.sqrt(np.diag(corr))
+    return np.linalg.cholesky(corr / np.outer(scale, scale))
+
+
+class ReservationProfile:
+    """Per-group marginals and copula fitted on the real reservations, small enough to ship to worker processes."""
+
+    def __init__(self, columns, groups):
+        self.columns = columns
+        self.groups = groups
+
+    @classmethod
+    def fit(cls, df):
+        try:
+            logger.info(f"Fitting synthetic data profile on {len(df)} reservations")
+            grid = np.linspace(0, 1, QUANTILE_POINTS)
+            global_chol = _correlation(df)
+
+            groups = []
+            for key, group in df.groupby(GROUP_COLUMNS, sort=True):
+                quantiles = {
+                    col: np.quantile(
+                        group[col].to_numpy(dtype=float), grid,
+                        method="linear" if col in CONTINUOUS_COLUMNS else "inverted_cdf",
+                    )
+                    for col in COPULA_COLUMNS
+                }
+                categoricals = {
+                    col: group[col].value_counts(normalize=True) for col in CONDITIONAL_CATEGORICALS
+                }
+                groups.append(
+                    {
+                        "key": dict(zip(GROUP_COLUMNS, key)),
+                        "weight": len(group) / len(df),
+                        "chol": _correlation(group) if len(group) >= MIN_GROUP_ROWS else global_chol,
+                        "quantiles": quantiles,
+                        "categoricals": {
+                            col: (counts.index.to_numpy(dtype=object), counts.to_numpy()) for col, counts in categoricals.items()
+                        },
+                    }
+                )
+
+            logger.success(f"Profile covers {len(groups)} segment x status groups")
+            return cls(list(df.columns), groups)
+
+        except Exception as e:
+            logger.exception("Error while fitting the synthetic data profile")
+            raise CustomException(e, sys)
+
+    def sample(self, n_rows, rng, first_id=1, id_width=5):
+        """Draw `n_rows` reservations; Booking_IDs continue from `first_id` so chunks never collide."""
+        weights = np.array([group["weight"] for group in self.groups])
+        counts = rng.multinomial(n_rows, weights / weights.sum())
+
+        parts = []
+        for group, count in zip(self.groups, counts):
+            if count == 0:
+                continue
+            z = rng.standard_normal((count, len(COPULA_COLUMNS))) @ group["chol"].T
+            u = ndtr(z)
+
+            part = {}
+            for j, col in enumerate(COPULA_COLUMNS):
+                grid = group["quantiles"][col]
+                pos = u[:, j] * (QUANTILE_POINTS - 1)
+                if col in CONTINUOUS_COLUMNS:
+                    part[col] = np.round(np.interp(pos, np.arange(QUANTILE_POINTS), grid), 2)
+                else:
+                    part[col] = grid[np.minimum(pos.astype(np.int64), QUANTILE_POINTS - 1)].astype(np.int64)
+
+            for col, (values, probs) in group["categoricals"].items():
+                part[col] = values[rng.choice(len(values), size=count, p=probs)]
+            for col, value in group["key"].items():
+                part[col] = np.full(count, value, dtype=object)
+            parts.append(pd.DataFrame(part))
+
+        df = pd.concat(parts, ignore_index=True)
+        df = df.iloc[rng.permutation(len(df))].reset_index(drop=True)
+
+        # Keep arrival dates inside their month
+        days_in_month = np.array([
+            calendar.monthrange(int(year), int(month))[1]
+            for year, month in zip(df["arrival_year"], df["arrival_month"])
+        ])
+        df["arrival_date"] = np.clip(df["arrival_date"], 1, days_in_month)
+
+        df["Booking_ID"] = [f"INN{i:0{id_width}d}" for i in range(first_id, first_id + len(df))]
+        return df[self.columns]
+
+
+def _write_chunk(profile, seed, chunk_idx, n_rows, first_id, id_width, path, file_format):
+    # Seeded by (seed, chunk index), so output is identical whatever the worker count or completion order
+    rng = np.random.default_rng([seed, chunk_idx])
+    df = profile.sample(n_rows, rng, first_id=first_id, id_width=id_width)
+    if file_format == "parquet":
+        # Same typed, dictionary-encoded layout the pipeline stores between stages
+        table = pa.Table.from_pandas(df, preserve_index=False).cast(RESERVATION_SCHEMA)
+        pq.write_table(table, path, compression="zstd")
+    else:
+        df.to_csv(path, index=False, header=chunk_idx == 0)
+    return chunk_idx, len(df)
+
+
+class SyntheticReservationGenerator:
+    """Stream arbitrarily many realistic reservations to CSV or Parquet in fixed-size chunks.
+
+    Chunks are generated by a process pool and written as part files; only
+    `max_workers` chunks are in memory at once. CSV parts are concatenated
+    into one file, so the output drops into DataIngestion like the real CSV.
+    Parquet output stays a directory of part files, which pandas and pyarrow
+    read as one dataset.
+    """
+
+    def __init__(self, config):
+        self.gen_config = config.get("synthetic_data", {})
+        self.source_file = self.gen_config.get("source_file", "data/raw/Hotel_Reservations.csv")
+        self.chunk_rows = self.gen_config.get("chunk_rows", 500000)
+        self.max_workers = self.gen_config.get("max_workers") or os.cpu_count()
+        self.seed = self.gen_config.get("seed", 42)
+        self.profile = None
+
+    def fit(self):
+        self.profile = ReservationProfile.fit(pd.read_csv(self.source_file))
+        return self.profile
+
+    def generate(self, n_rows, output_path, file_format="csv"):
+        try:
+            if self.profile is None:
+                self.fit()
+
+            n_chunks = -(-n_rows // self.chunk_rows)
+            id_width = max(5, len(str(n_rows)))
+            parts_dir = output_path if file_format == "parquet" else f"{output_path}.parts"
+            os.makedirs(parts_dir, exist_ok=True)
+            for stale in glob.glob(os.path.join(parts_dir, "part-*")):
+                os.remove(stale)
+            logger.info(
+                f"Generating {n_rows:,} reservations in {n_chunks} chunks of {self.chunk_rows:,} "
+                f"with {self.max_workers} workers -> {output_path} ({file_format})"
+            )
+
+            part_paths = []
+            written = 0
+            with ProcessPoolExecutor(max_workers=self.max_workers) as pool:
+                pending = set()
+                for chunk_idx in range(n_chunks):
+                    first = chunk_idx * self.chunk_rows
+                    rows = min(self.chunk_rows, n_rows - first)
+                    part_path = os.path.join(parts_dir, f"part-{chunk_idx:05d}.{file_format}")
+                    part_paths.append(part_path)
+                    pending.add(pool.submit(
+                        _write_chunk, self.profile, self.seed, chunk_idx, rows, first + 1, id_width, part_path, file_format
+                    ))
+
+                    # Bound the number of chunks held in worker memory
+                    if len(pending) >= self.max_workers * 2:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        written += sum(future.result()[1] for future in done)
+
+                written += sum(future.result()[1] for future in pending)
+
+            if file_format == "csv":
+                os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+                with open(output_path, "wb") as out:
+                    for part_path in part_paths:
+                        with open(part_path, "rb") as part:
+                            shutil.copyfileobj(part, out, length=16 * 1024 * 1024)
+                shutil.rmtree(parts_dir)
+
+            logger.success(f"Wrote {written:,} synthetic reservations to {output_path}")
+            return output_path
+
+        except Exception as e:
+            logger.exception("Error while generating synthetic reservations")
+            raise CustomException(e, sys)
+
+
+def compare_to_source(source, synthetic):
+    """Side-by-side summary of the distributions the generator is meant to preserve."""
+    def summary(df):
+        canceled = df["booking_status"] == "Canceled"
+        by_segment = df.assign(canceled=canceled).groupby("market_segment_type")
+        return pd.DataFrame({
+            "share": by_segment.size() / len(df),
+            "cancel_rate": by_segment["canceled"].mean(),
+            "mean_price": by_segment["avg_price_per_room"].mean(),
+            "median_lead_time": by_segment["lead_time"].median(),
+            "lead_price_corr": by_segment[["lead_time", "avg_price_per_room"]].corr(method="spearman").xs(
+                "lead_time", level=1
+            )["avg_price_per_room"],
+        })
+
+    return summary(source).join(summary(synthetic), lsuffix="_real", rsuffix="_synthetic").round(3)
+
+
+if __name__ == "__main__":
+    config = load_config("config.yaml")
+    gen_config = config.get("synthetic_data", {})
+
+    generator = SyntheticReservationGenerator(config)
+    generator.fit()
+    output_path = generator.generate(
+        gen_config.get("n_rows", 10_000_000),
+        gen_config.get("output_path", "data/synthetic/Hotel_Reservations.csv"),
+        gen_config.get("format", "csv"),
+    )
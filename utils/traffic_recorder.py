@@ -0,0 +1,53 @@
+import os
+import json
+import random
+import threading
+from loguru import logger
+
+
+class TrafficRecorder:
+    """Append sampled prediction requests to a JSONL file for replay by benchmarks/load_test.py.
+
+    Each line is {"method", "path", "content_type": "form" | "json", "body"}.
+    """
+
+    def __init__(self, path, sample_rate=1.0, max_records=100000):
+        self.path = path
+        self.sample_rate = sample_rate
+        self.max_records = max_records
+        self.recorded = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        if os.path.exists(path):
+            with open(path) as f:
+                self.recorded = sum(1 for _ in f)
+
+    @classmethod
+    def from_config(cls, config):
+        recording_config = config.get("serving", {}).get("traffic_recording", {})
+        if not recording_config.get("enabled", False):
+            return None
+
+        recorder = cls(
+            recording_config.get("path", "benchmarks/requests.jsonl"),
+            sample_rate=recording_config.get("sample_rate", 1.0),
+            max_records=recording_config.get("max_records", 100000),
+        )
+        logger.info(f"Recording {recorder.sample_rate:.0%} of prediction requests to {recorder.path}")
+        return recorder
+
+    def record(self, path, content_type, body, method="POST"):
+        if self.recorded >= self.max_records or random.random() >= self.sample_rate:
+            return
+        try:
+            line = json.dumps({"method": method, "path": path, "content_type": content_type, "body": body})
+            with self._lock:
+                if self.recorded >= self.max_records:
+                    return
+                with open(self.path, "a") as f:
+                    f.write(line + "\n")
+                self.recorded += 1
+        except Exception:
+            # Recording is best-effort and must never fail the request being served
+            logger.exception("Error while recording request")
@@ -0,0 +1,129 @@
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import warnings
+
+import optuna
+from optuna.storages import JournalStorage, RDBStorage
+from optuna.storages.journal import JournalFileBackend
+from optuna.study import MaxTrialsCallback
+from optuna.trial import TrialState
+from loguru import logger
+
+from utils.custom_exception import CustomException
+
+
+# optuna 4.9 renamed the stale-trial retry hook; use whichever the installed version has
+try:
+    from optuna.storages import RetryHeartbeatStaleTrialCallback as _RetryStaleTrial
+    _STALE_TRIAL_HOOK = "heartbeat_stale_trial_callback"
+except ImportError:
+    from optuna.storages import RetryFailedTrialCallback as _RetryStaleTrial
+    _STALE_TRIAL_HOOK = "failed_trial_callback"
+
+
+def plan_parallelism(cpu_budget, cv_folds, n_trials, n_workers=None):
+    """Split `cpu_budget` cores between concurrent trials, CV folds per trial and trees per fold.
+
+    Trials are filled first (they never wait on each other), then folds, then
+    trees, so workers * fold_jobs * tree_jobs never exceeds the budget.
+    """
+    cpu_budget = max(1, cpu_budget)
+    if n_workers is None:
+        n_workers = cpu_budget // cv_folds
+    n_workers = max(1, min(n_workers, n_trials, cpu_budget))
+    per_worker = cpu_budget // n_workers
+    fold_jobs = max(1, min(cv_folds, per_worker))
+    tree_jobs = max(1, per_worker // fold_jobs)
+    return n_workers, fold_jobs, tree_jobs
+
+
+def open_storage(url):
+    """An RDB storage for database URLs (sqlite:///...), a journal file for plain paths."""
+    if "://" in url:
+        if url.startswith("sqlite:///"):
+            os.makedirs(os.path.dirname(url[len("sqlite:///"):]) or ".", exist_ok=True)
+        # Trials whose process died stop heartbeating; they are failed and retried once on the next run
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", optuna.exceptions.ExperimentalWarning)
+            return RDBStorage(
+                url,
+                heartbeat_interval=60,
+                grace_period=180,
+                **{_STALE_TRIAL_HOOK: _RetryStaleTrial(max_retry=1)},
+            )
+    os.makedirs(os.path.dirname(url) or ".", exist_ok=True)
+    return JournalStorage(JournalFileBackend(url))
+
+
+def build_pruner(name, max_resource, reduction_factor=3):
+    """Successive halving or Hyperband over `max_resource` reported steps (one per CV fold per budget)."""
+    if name == "successive_halving":
+        return optuna.pruners.SuccessiveHalvingPruner(min_resource=1, reduction_factor=reduction_factor)
+    if name == "hyperband":
+        return optuna.pruners.HyperbandPruner(
+            min_resource=1, max_resource=max_resource, reduction_factor=reduction_factor
+        )
+    raise ValueError(f"Unknown pruner: {name}")
+
+
+def _run_worker(storage_url, study_name, objective, n_trials, seed, pruner=None):
+    # Each worker opens the shared study itself; constant_liar keeps concurrent workers from proposing the same point
+    study = optuna.load_study(
+        study_name=study_name,
+        storage=open_storage(storage_url),
+        sampler=optuna.samplers.TPESampler(seed=seed, constant_liar=True),
+        pruner=pruner,
+    )
+    study.optimize(
+        objective,
+        n_trials=n_trials,
+        callbacks=[MaxTrialsCallback(n_trials, states=(TrialState.COMPLETE, TrialState.PRUNED))],
+    )
+
+
+def run_study(objective, storage_url, study_name, n_trials, n_workers=1, seed=42, pruner=None):
+    """Run `objective` until the persistent study holds `n_trials` finished trials, across `n_workers` processes.
+
+    The study is created on first use and resumed afterwards, so an
+    interrupted or repeated run only adds the missing trials. Trials already
+    running when the count is reached still finish, so a run can overshoot by
+    up to n_workers - 1. `objective` must be picklable (a module-level
+    function or a partial of one). The pruner is not stored with the study,
+    so every worker is handed it again.
+    """
+    try:
+        storage = open_storage(storage_url)
+        study = optuna.create_study(
+            study_name=study_name, storage=storage, direction="maximize", pruner=pruner, load_if_exists=True
+        )
+        finished = len(study.get_trials(deepcopy=False, states=(TrialState.COMPLETE, TrialState.PRUNED)))
+        remaining = n_trials - finished
+        if remaining <= 0:
+            logger.info(f"Study '{study_name}' already has {finished} finished trials, reusing its best")
+            return study
+
+        n_workers = max(1, min(n_workers, remaining))
+        # A resumed study gets fresh seeds, or its random start-up trials would repeat the first run's
+        seed += 10_000 * finished
+        logger.info(
+            f"Study '{study_name}' in {storage_url}: {finished} trials finished, "
+            f"running {remaining} more with {n_workers} worker(s)"
+        )
+        if n_workers == 1:
+            _run_worker(storage_url, study_name, objective, n_trials, seed, pruner)
+        else:
+            with ProcessPoolExecutor(max_workers=n_workers) as pool:
+                futures = [
+                    pool.submit(_run_worker, storage_url, study_name, objective, n_trials, seed + i, pruner)
+                    for i in range(n_workers)
+                ]
+                for future in futures:
+                    future.result()
+
+        return optuna.load_study(study_name=study_name, storage=storage)
+
+    except Exception as e:
+        logger.exception("Error during the Optuna study")
+        raise CustomException(e, sys)